@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Data-quality report benchmark
+
+Fills a temporary database with a synthetic migrated catalog (10M products
+by default, with sort indexes), times build_report and checks it against the
+budget below.
+
+Usage:
+    python benchmarks/bench_data_quality.py [--products 10000000] [--check]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from data_quality import build_report, format_summary
+from migrate_departments import create_sort_indexes
+
+# Budget for a full report at 10M products, in seconds. The ranged scans
+# split across cores, so this is the single-core figure
+BUDGET_SECONDS = 50
+
+DEPARTMENTS = ["Men", "Women"]
+
+def synthetic_rows(n_products, seed=41):
+    """Generate product rows with a small share of every data-quality problem"""
+    rng = random.Random(seed)
+    categories = [f"Category {i}" for i in range(30)]
+    brands = [f"Brand {i}" for i in range(2000)]
+    for product_id in range(1, n_products + 1):
+        department_id = rng.randint(1, len(DEPARTMENTS))
+        price = round(rng.uniform(1, 500), 2)
+        cost = round(price * rng.uniform(0.3, 0.7), 2)
+        if product_id % 10007 == 0:
+            cost = price + 1
+        yield (
+            product_id, cost, rng.choice(categories), f"Product {product_id}",
+            rng.choice(brands) if product_id % 97 else None, price,
+            DEPARTMENTS[department_id - 1], f"SKU{product_id}", rng.randint(1, 10), department_id
+        )
+
+def build_database(db_path, n_products):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    conn.executemany("INSERT INTO departments VALUES (?, ?)", enumerate(DEPARTMENTS, 1))
+    conn.execute("""
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY, cost REAL, category TEXT, name TEXT, brand TEXT,
+            retail_price REAL, department TEXT, sku TEXT, distribution_center_id INTEGER,
+            department_id INTEGER
+        )
+    """)
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", synthetic_rows(n_products))
+    conn.commit()
+    create_sort_indexes(conn)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data-quality report")
+    parser.add_argument("--products", type=int, default=10_000_000)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the time budget is exceeded")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "ecommerce.db")
+        start = time.perf_counter()
+        build_database(db_path, args.products)
+        print(f"Built {args.products:,} products in {time.perf_counter() - start:.1f}s")
+
+        report = build_report(db_path)
+        print(format_summary(report))
+        scaled_budget = BUDGET_SECONDS * args.products / 10_000_000
+        print(f"report took {report['elapsed_seconds']:.2f}s (budget {scaled_budget:.2f}s)")
+
+    if args.check and report["elapsed_seconds"] > scaled_budget:
+        print("Time budget exceeded")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
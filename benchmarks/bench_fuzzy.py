@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Fuzzy search latency benchmark
+
+Builds a TrigramIndex over a synthetic catalog (1M products by default),
+runs misspelt one- and two-word queries and checks the latency percentiles
+against the budget below.
+
+Usage:
+    python benchmarks/bench_fuzzy.py [--products 1000000] [--check]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fuzzy import TrigramIndex
+
+# Latency budget for a fuzzy query at 1M products, in milliseconds
+BUDGET_P50_MS = 20
+BUDGET_P95_MS = 150
+
+def synthetic_catalog(n_products, seed=41):
+    """Generate (id, name, brand, category) rows with a Zipf-distributed vocabulary"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    brands = [w.title() for w in rng.sample(words, 2000)]
+    categories = [w.title() for w in rng.sample(words, 30)]
+    for product_id in range(1, n_products + 1):
+        name = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 5))).title()
+        yield (product_id, name, rng.choice(brands), rng.choice(categories))
+
+def misspell(word, rng):
+    """Apply one random edit (substitution, deletion, insertion or doubling)"""
+    i = rng.randrange(len(word))
+    edit = rng.choice(["sub", "del", "ins", "dup"])
+    if edit == "sub":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if edit == "del":
+        return word[:i] + word[i + 1:]
+    if edit == "ins":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    return word[:i] + word[i] + word[i:]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy trigram search")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the latency budget is exceeded")
+    args = parser.parse_args()
+
+    catalog = list(synthetic_catalog(args.products))
+    index = TrigramIndex()
+    start = time.perf_counter()
+    index.build(catalog)
+    print(f"Indexed {args.products:,} products ({len(index):,} distinct words) in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    timings = []
+    hits = 0
+    for _ in range(args.queries):
+        product_id, name, brand, category = rng.choice(catalog)
+        words = name.lower().split()
+        query_words = [misspell(words[0], rng)]
+        if rng.random() < 0.5:
+            query_words.append(brand.lower())
+        start = time.perf_counter()
+        results = index.search(" ".join(query_words))
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += product_id in results
+
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  (budget p50 {BUDGET_P50_MS}, p95 {BUDGET_P95_MS})")
+    print(f"recall of the misspelt source product: {hits / len(timings):.1%}")
+
+    if args.check and (p50 > BUDGET_P50_MS or p95 > BUDGET_P95_MS):
+        print("Latency budget exceeded")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
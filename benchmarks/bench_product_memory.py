@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+In-process product cache memory benchmark
+
+Loads a synthetic catalog from SQLite into each in-memory representation and
+reports the memory it retains per product: plain dicts (dict(sqlite3.Row))
+and records.ProductRecord lists with shared strings.
+
+Usage:
+    python benchmarks/bench_product_memory.py [--products 1000000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from records import PRODUCT_FIELDS, product_records
+
+BATCH_SIZE = 10_000
+
+def create_catalog(n_products, seed=44):
+    """In-memory product_listing shaped like the real one"""
+    rng = random.Random(seed)
+    categories = ["Tops & Tees", "Jeans", "Outerwear & Coats", "Swim", "Accessories", "Sleep & Lounge"]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE product_listing ({', '.join(PRODUCT_FIELDS)})")
+    conn.executemany(
+        f"INSERT INTO product_listing VALUES ({', '.join('?' for _ in PRODUCT_FIELDS)})",
+        ((i, f"Product name number {i}", rng.choice(categories), f"Brand {rng.randrange(2000)}",
+          round(rng.uniform(5, 200), 2), round(rng.uniform(2, 100), 2), ("Men", "Women")[i % 2],
+          f"SKU{i:012d}", rng.randint(1, 10), i % 2 + 1, ("Men", "Women")[i % 2])
+         for i in range(1, n_products + 1))
+    )
+    return conn
+
+def load_dicts(cursor):
+    cache = []
+    while rows := cursor.fetchmany(BATCH_SIZE):
+        cache.extend(dict(row) for row in rows)
+    return cache
+
+def load_records(cursor):
+    cache = []
+    while rows := cursor.fetchmany(BATCH_SIZE):
+        cache.extend(product_records(rows))
+    return cache
+
+def measure(conn, label, load, n_products):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache = load(conn.execute("SELECT * FROM product_listing ORDER BY id"))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} {retained / n_products:7.0f} bytes/product   {retained / 1e6:8.1f} MB   load {elapsed:5.2f}s")
+    del cache
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory per product of in-process caches")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = create_catalog(args.products)
+    print(f"{args.products:,} products")
+    measure(conn, "dict", load_dicts, args.products)
+    measure(conn, "ProductRecord", load_records, args.products)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Lookup-by-id latency benchmark: catalog snapshot vs SQLite
+
+Builds a synthetic product_listing, compiles the memory-mapped catalog
+snapshot from it, and reports per-lookup latency for the pre-serialised JSON
+path, the decoded-record path and DatabaseManager.get_product_by_id.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--products 200000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from catalog_snapshot import CatalogSnapshot, build_snapshot, snapshot_path
+from database import DatabaseManager
+from product_listing import refresh_product_listing
+from queries import QueryStats
+
+def create_catalog(db_path, n_products, seed=43):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    conn.executemany("INSERT INTO departments (name) VALUES (?)", [("Men",), ("Women",)])
+    conn.execute("""
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY, name TEXT, category TEXT, brand TEXT, retail_price REAL, cost REAL,
+            department TEXT, sku TEXT, distribution_center_id INTEGER, department_id INTEGER
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"Product {i}", "Tops & Tees", f"Brand {i % 2000}", round(rng.uniform(5, 200), 2),
+          round(rng.uniform(2, 100), 2), ("Men", "Women")[i % 2], f"SKU{i:08d}", rng.randint(1, 10), i % 2 + 1)
+         for i in range(1, n_products + 1))
+    )
+    conn.commit()
+    refresh_product_listing(conn)
+    conn.close()
+
+def report(label, lookup, ids):
+    timings = []
+    for product_id in ids:
+        start = time.perf_counter()
+        lookup(product_id)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{label:<24} median {statistics.median(timings):7.1f} us   p99 {p99:7.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot lookups by id against SQLite")
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        create_catalog(db_path, args.products)
+        db = DatabaseManager(db_path, stats=QueryStats())
+
+        start = time.perf_counter()
+        build_snapshot(db)
+        size = os.path.getsize(snapshot_path(db_path))
+        print(f"Compiled {args.products:,} products ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+
+        snapshot = CatalogSnapshot(snapshot_path(db_path))
+        rng = random.Random(7)
+        ids = [rng.randint(1, args.products) for _ in range(args.lookups)]
+        report("snapshot JSON", snapshot.get_json, ids)
+        report("snapshot record", snapshot.get, ids)
+        report("sqlite get_product_by_id", db.get_product_by_id, ids)
+        snapshot.close()
+        db.close_connections()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Cold-start import benchmark
+
+Imports each entry point in a fresh interpreter with `python -X importtime`,
+reports the cumulative import time and the heaviest modules, and checks that
+serving code does not pull in heavy dependencies it never uses.
+
+Usage:
+    python benchmarks/bench_startup.py            # print report
+    python benchmarks/bench_startup.py --check    # exit 1 if a budget is exceeded
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+# Entry point name -> module imported in the fresh interpreter
+TARGETS = {
+    "api": "main",
+    "data_loader": "data_loader",
+    "migrate_departments": "migrate_departments",
+    "verify_products": "verify_products",
+}
+
+def measure_import(module, runs=5):
+    """Return (median cumulative import time in ms, set of imported top-level modules)"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT / "src"), str(ROOT), env.get("PYTHONPATH", "")])
+    totals = []
+    modules = set()
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+        total = 0
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if not name.startswith("  "):  # top-level entries only (nested ones are indented)
+                total += int(cumulative)
+            modules.add(name.strip().split(".")[0])
+        totals.append(total / 1000.0)
+    return statistics.median(totals), modules
+
+def load_budget():
+    with open(BUDGET_FILE) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of entry points")
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches per target")
+    parser.add_argument("--check", action="store_true", help="Fail if a budget in startup_budget.json is exceeded")
+    args = parser.parse_args()
+
+    budget = load_budget()
+    failures = []
+
+    print(f"{'target':<22}{'import ms':>12}{'budget ms':>12}  forbidden modules")
+    for target, module in TARGETS.items():
+        elapsed_ms, modules = measure_import(module, args.runs)
+        target_budget = budget.get(target, {})
+        max_ms = target_budget.get("max_ms")
+        forbidden = sorted(set(target_budget.get("forbidden", [])) & modules)
+        print(f"{target:<22}{elapsed_ms:>12.1f}{(max_ms or float('nan')):>12.1f}  {', '.join(forbidden) or '-'}")
+        if max_ms is not None and elapsed_ms > max_ms:
+            failures.append(f"{target}: {elapsed_ms:.1f} ms exceeds budget of {max_ms} ms")
+        if forbidden:
+            failures.append(f"{target}: imports {', '.join(forbidden)} at startup")
+
+    if failures:
+        print("\nBudget violations:")
+        for failure in failures:
+            print(f"  - {failure}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Autocomplete latency benchmark
+
+Builds a SuggestionIndex over a synthetic catalog and reports build time and
+per-query latency for prefixes of increasing length.
+
+Usage:
+    python benchmarks/bench_suggest.py [--products 1000000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from suggest import SuggestionIndex
+
+def synthetic_terms(n_products, seed=41):
+    """Generate (term, kind, weight) rows shaped like DatabaseManager.get_suggestion_terms"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(5000)]
+    brands = [w.title() for w in words[:2000]]
+    categories = [w.title() for w in words[2000:2030]]
+    for i in range(n_products):
+        yield (" ".join(rng.choices(words, k=3)).title() + f" {i}", "product", 1)
+    for brand in brands:
+        yield (brand, "brand", rng.randint(1, 500))
+    for category in categories:
+        yield (category, "category", rng.randint(100, 50000))
+    for department in ("Men", "Women"):
+        yield (department, "department", n_products // 2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the autocomplete prefix index")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    terms = list(synthetic_terms(args.products))
+    index = SuggestionIndex()
+    start = time.perf_counter()
+    index.build(terms)
+    print(f"Built index over {len(index):,} terms in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(7)
+    sample = [t[0].lower() for t in rng.sample(terms, min(args.queries, len(terms)))]
+    for length in (1, 2, 3, 4, 6, 10):
+        timings = []
+        for term in sample:
+            start = time.perf_counter()
+            index.suggest(term[:length], limit=10)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"prefix length {length:>2}: median {statistics.median(timings):7.1f} us   p99 {p99:7.1f} us")
+
+if __name__ == "__main__":
+    main()
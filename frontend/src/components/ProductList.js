@@ -10,6 +10,7 @@ const ProductList = () => {
   const [totalCount, setTotalCount] = useState(0);
   const [searchTerm, setSearchTerm] = useState('');
   const [isSearching, setIsSearching] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
   const pageSize = 12;
 
   const fetchProducts = async (page, search = null) => {
@@ -49,6 +50,19 @@ const ProductList = () => {
     }
   };
 
+  // Fetch autocomplete suggestions shortly after the user stops typing
+  useEffect(() => {
+    const prefix = searchTerm.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      setSuggestions(await productAPI.suggest(prefix));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   const handlePageChange = (newPage) => {
     if (searchTerm.trim()) {
       fetchProducts(newPage, searchTerm.trim());
@@ -86,7 +100,15 @@ const ProductList = () => {
             placeholder="Search products by name, category, or brand..."
             value={searchTerm}
             onChange={(e) => setSearchTerm(e.target.value)}
+            list="product-suggestions"
           />
+          <datalist id="product-suggestions">
+            {suggestions.map((suggestion) => (
+              <option key={`${suggestion.kind}-${suggestion.text}`} value={suggestion.text}>
+                {suggestion.kind}
+              </option>
+            ))}
+          </datalist>
           <button type="submit" className="btn btn-primary">
             Search
           </button>
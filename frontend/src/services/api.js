@@ -29,6 +29,9 @@ api.interceptors.response.use(
   }
 );
 
+// Fields rendered by ProductCard; list views request only these
+const CARD_FIELDS = 'id,name,category,brand,retail_price,department,department_name';
+
 export const productAPI = {
   // Get all products with pagination and optional search
   getProducts: async (page = 1, pageSize = 12, search = null) => {
@@ -36,6 +39,7 @@ export const productAPI = {
       const params = {
         page,
         page_size: pageSize,
+        fields: CARD_FIELDS,
       };
       
       if (search) {
@@ -69,6 +73,7 @@ export const productAPI = {
         search: searchTerm,
         page,
         page_size: pageSize,
+        fields: CARD_FIELDS,
       };
       
       const response = await api.get('/api/products/search', { params });
@@ -78,6 +83,16 @@ export const productAPI = {
     }
   },
 
+  // Autocomplete suggestions for the search box
+  suggest: async (prefix, limit = 8) => {
+    try {
+      const response = await api.get('/api/products/suggest', { params: { q: prefix, limit } });
+      return response.data.suggestions;
+    } catch (error) {
+      return [];
+    }
+  },
+
   // Get API information
   getAPIInfo: async () => {
     try {
@@ -10,13 +10,24 @@ Steps:
 2. Extract unique department names from products data
 3. Populate the departments table with unique departments
 4. Update the products table to reference departments via foreign key
-5. Update existing products API to include department information
+5. Create the indexes backing sorted product listings
+6. Rebuild the denormalised product_listing table the API reads from and
+   pre-render its hot pages
+7. Update existing products API to include department information
 """
 
+import os
 import sqlite3
-import pandas as pd
+import sys
 from pathlib import Path
 
+# Add src directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from db_swap import build_then_swap
+from page_cache import precompute_listing_pages
+from product_listing import drop_listing_triggers, refresh_product_listing
+
 def create_departments_table(conn):
     """Create the new departments table"""
     print("1. Creating departments table...")
@@ -121,58 +132,70 @@ def update_products_table(conn):
     
     conn.commit()
 
-def verify_migration(conn):
-    """Verify the migration was successful"""
-    print("5. Verifying migration...")
+# Indexes backing the sort options of the listing endpoints (see SORT_COLUMNS in
+# src/database.py). The global listing sorts on the bare column; department
+# listings filter on department_id first, so they need it as a leading column.
+SORT_INDEXES = {
+    "idx_products_name": "products(name)",
+    "idx_products_retail_price": "products(retail_price)",
+    "idx_products_brand": "products(brand)",
+    "idx_products_margin": "products((retail_price - cost))",
+    "idx_products_department_name": "products(department_id, name)",
+    "idx_products_department_retail_price": "products(department_id, retail_price)",
+    "idx_products_department_brand": "products(department_id, brand)",
+    "idx_products_department_margin": "products(department_id, (retail_price - cost))",
+}
+
+def create_sort_indexes(conn):
+    """Create the indexes used by sorted product listings"""
+    print("5. Creating sort indexes...")
     
     cursor = conn.cursor()
     
-    # Check departments table
-    cursor.execute("SELECT COUNT(*) FROM departments")
-    dept_count = cursor.fetchone()[0]
-    print(f"✅ Departments table has {dept_count} departments")
+    for index_name, definition in SORT_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}")
     
-    # Check products with department_id
-    cursor.execute("""
-        SELECT COUNT(*) 
-        FROM products 
-        WHERE department_id IS NOT NULL
-    """)
-    products_with_dept = cursor.fetchone()[0]
-    print(f"✅ {products_with_dept} products have department_id")
+    # Refresh planner statistics so the new indexes are chosen
+    cursor.execute("ANALYZE")
     
-    # Check for orphaned products (products with department but no department_id)
-    cursor.execute("""
-        SELECT COUNT(*) 
-        FROM products 
-        WHERE department IS NOT NULL 
-        AND department != '' 
-        AND department_id IS NULL
-    """)
-    orphaned_count = cursor.fetchone()[0]
+    conn.commit()
+    print(f"✅ {len(SORT_INDEXES)} sort indexes in place")
+
+def build_product_listing(conn, db_path):
+    """Rebuild the read table that product listings are served from"""
+    print("6. Building product_listing read table...")
+    
+    count = refresh_product_listing(conn)
+    print(f"✅ product_listing holds {count} products")
+    
+    pages = precompute_listing_pages(db_path)
+    print(f"✅ Pre-rendered {pages} listing pages")
+
+def verify_migration(db_path):
+    """Verify the migration was successful using the data-quality report"""
+    from data_quality import build_report
     
+    print("7. Verifying migration...")
+    
+    report = build_report(db_path)
+    departments = report["departments"]
+    print(f"✅ Departments table has {len(departments)} departments")
+    print(f"✅ {sum(departments.values())} products have department_id")
+    
+    # Products that kept a department name but got no department_id, or
+    # point at a department that does not exist
+    orphaned_count = report["orphans"].get("unmapped_department", 0) + report["orphans"].get("department_id", 0)
     if orphaned_count == 0:
         print("✅ No orphaned products found")
     else:
-        print(f"⚠️ Warning: {orphaned_count} products have department but no department_id")
-    
-    # Show sample data
-    print("\n📊 Sample Data:")
-    cursor.execute("""
-        SELECT p.id, p.name, p.department, d.name as dept_name, p.department_id
-        FROM products p
-        LEFT JOIN departments d ON p.department_id = d.id
-        WHERE p.department IS NOT NULL
-        LIMIT 5
-    """)
+        print(f"⚠️ Warning: {orphaned_count} products have no valid department_id")
     
-    sample_data = cursor.fetchall()
-    for row in sample_data:
-        print(f"  Product ID: {row[0]}, Name: {row[1][:30]}..., Old Dept: {row[2]}, New Dept: {row[3]}, Dept ID: {row[4]}")
+    for issue in report["issues"]:
+        print(f"⚠️ Data quality: {issue}")
 
 def cleanup_old_department_column(conn):
     """Remove the old department column after verification"""
-    print("6. Cleaning up old department column...")
+    print("8. Cleaning up old department column...")
     
     # Note: SQLite doesn't support DROP COLUMN directly
     # We would need to recreate the table, but for now we'll keep the old column
@@ -180,8 +203,13 @@ def cleanup_old_department_column(conn):
     print("ℹ️ Keeping old department column as backup (SQLite limitation)")
     print("ℹ️ You can manually remove it later if needed")
 
-def main():
-    """Main migration function"""
+def main(swap=False, snapshot=False):
+    """
+    Main migration function. With `swap`, the migration runs on a fresh copy
+    of the database that replaces the live file only once it has completed,
+    so the API never reads a half-migrated catalog. With `snapshot`, the
+    memory-mapped catalog snapshot is compiled afterwards.
+    """
     print("🚀 Starting Milestone 4: Refactor Departments Table")
     print("=" * 60)
     
@@ -193,6 +221,32 @@ def main():
         print("Please ensure the database exists and contains products data")
         return
     
+    if swap:
+        with build_then_swap(db_path) as build_path:
+            print(f"🔁 Building into {build_path}")
+            migrate(str(build_path))
+            if snapshot:
+                write_catalog_snapshot(str(build_path))
+        print(f"🔁 Promoted {build_path.name} to {db_path}")
+    else:
+        migrate(db_path)
+        if snapshot:
+            write_catalog_snapshot(db_path)
+
+def write_catalog_snapshot(db_path):
+    """Compile the memory-mapped catalog snapshot the API serves lookups by id from"""
+    from catalog_snapshot import build_snapshot, snapshot_path
+    from database import DatabaseManager
+    
+    db = DatabaseManager(db_path)
+    try:
+        count = build_snapshot(db)
+    finally:
+        db.close_connections()
+    print(f"✅ Wrote catalog snapshot {snapshot_path(db_path)} ({count} products)")
+
+def migrate(db_path):
+    """Run every migration step against one database file"""
     try:
         # Connect to database
         conn = sqlite3.connect(db_path)
@@ -211,16 +265,29 @@ def main():
             print("Migration completed (no departments to migrate)")
             return
         
+        # The listing is rebuilt in one pass below; row-level maintenance
+        # would otherwise fire for every product the migration updates.
+        # Dropped only once there is something to migrate, so an early
+        # return leaves the read model maintained
+        drop_listing_triggers(conn)
+        conn.commit()
+        
         # Step 3: Populate departments table
         populate_departments_table(conn, departments)
         
         # Step 4: Update products table
         update_products_table(conn)
         
-        # Step 5: Verify migration
-        verify_migration(conn)
+        # Step 5: Create sort indexes
+        create_sort_indexes(conn)
         
-        # Step 6: Cleanup (optional)
+        # Step 6: Rebuild the listing read table
+        build_product_listing(conn, db_path)
+        
+        # Step 7: Verify migration
+        verify_migration(db_path)
+        
+        # Step 8: Cleanup (optional)
         cleanup_old_department_column(conn)
         
         print("\n🎉 Migration completed successfully!")
@@ -238,4 +305,13 @@ def main():
             conn.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move departments into their own table")
+    parser.add_argument("--swap", action="store_true",
+                        help="Migrate a copy of the database and atomically promote it when done")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Also compile the memory-mapped catalog snapshot for lookups by id")
+    args = parser.parse_args()
+
+    main(swap=args.swap, snapshot=args.snapshot) 
\ No newline at end of file
@@ -1,14 +1,11 @@
-from sqlalchemy import create_engine, select, text
-from sqlalchemy.orm import sessionmaker
-from src.models import ProductResponse, DepartmentResponse
+from sqlalchemy import create_engine, text
 
 # Create database connection (adjust URL based on your database setup)
 DATABASE_URL = "sqlite:///./think41.db"  # Using local SQLite database
 engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
 
-# Create a session
-session = Session()
+# Open a connection (plain Core connection; the ORM is not needed for a read-only query)
+connection = engine.connect()
 
 # Execute the query
 query = text("""
@@ -28,7 +25,7 @@ query = text("""
 """)
 
 # Execute and print results
-results = session.execute(query).all()
+results = connection.execute(query).all()
 
 print("\nProduct Details with Departments:")
 print("-" * 80)
@@ -43,5 +40,5 @@ for row in results:
     print(f"Department: {row.department_name} (ID: {row.department_id})")
     print("-" * 80)
 
-# Close the session
-session.close()
+# Close the connection
+connection.close()
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from database import QueryTimeout, statement_timeout
+
+class AdmissionLimit:
+    """
+    Concurrency limit for one group of expensive endpoints. Admitted calls run
+    on the threadpool, so the event loop stays free for cheap requests.
+    Callers that would queue behind `max_queue` others, or that wait longer
+    than `queue_timeout` seconds for a slot, get a 503 with Retry-After.
+    Admitted statements are aborted after `statement_timeout` seconds.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 statement_timeout: Optional[float], retry_after: int = 1):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.statement_timeout = statement_timeout
+        self.retry_after = retry_after
+        # asyncio semaphores belong to one event loop; keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = {"admitted": 0, "waiting": 0, "rejected": 0, "timed_out": 0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    def _count(self, counter: str, delta: int = 1):
+        with self._lock:
+            self._counters[counter] += delta
+
+    def _shed(self, counter: str, detail: str) -> HTTPException:
+        self._count(counter)
+        return HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    def _call(self, func: Callable, args, kwargs):
+        with statement_timeout(self.statement_timeout):
+            return func(*args, **kwargs)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call under this limit, or raise a 503 HTTPException"""
+        semaphore = self._semaphore()
+        if not semaphore.locked():
+            await semaphore.acquire()  # a free slot is taken without yielding
+        elif self._counters["waiting"] >= self.max_queue:
+            raise self._shed("rejected", f"Too many concurrent {self.name} requests")
+        else:
+            self._count("waiting")
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._shed("rejected", f"Too many concurrent {self.name} requests")
+            finally:
+                self._count("waiting", -1)
+
+        self._count("admitted")
+        try:
+            return await run_in_threadpool(self._call, func, args, kwargs)
+        except QueryTimeout:
+            raise self._shed("timed_out", f"{self.name.capitalize()} query took too long")
+        finally:
+            semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "statement_timeout": self.statement_timeout,
+            **counters
+        }
+
+# Limits per endpoint group. Cheap lookups by id are not limited.
+ADMISSION_LIMITS = {
+    "search": AdmissionLimit("search", max_concurrent=2, max_queue=8, queue_timeout=2.0, statement_timeout=5.0),
+    "listing": AdmissionLimit("listing", max_concurrent=4, max_queue=16, queue_timeout=2.0, statement_timeout=5.0),
+}
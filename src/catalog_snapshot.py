@@ -0,0 +1,259 @@
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Compact read-only image of the catalog for lookups by id, mapped into memory
+# and shared by every worker process through the OS page cache:
+#
+#   header | id index | fixed-width records (id order) | string heap | JSON heap
+#
+# The id index is direct-mapped (slot per id in [min_id, min_id + id_range))
+# when ids are dense, or the sorted ids for a binary search otherwise. Each
+# record holds the numeric fields inline, (offset, length) references into the
+# string heap, and a reference to the product's pre-serialised response JSON.
+MAGIC = b"CATSNAP1"
+FORMAT_VERSION = 1
+FLAG_DENSE = 1
+HEADER = struct.Struct("<8sIIQQqQQQQQ")
+NULL_INT = -(2 ** 63)
+NULL_LENGTH = 0xFFFFFFFF
+DENSE_SLOTS_PER_PRODUCT = 4  # direct-mapped index while ids are at most this sparse
+
+# Record layout, in database.PRODUCT_COLUMNS order
+FIELD_KINDS = {
+    "id": "int",
+    "name": "str",
+    "category": "str",
+    "brand": "str",
+    "retail_price": "float",
+    "cost": "float",
+    "department": "str",
+    "sku": "str",
+    "distribution_center_id": "int",
+    "department_id": "int",
+    "department_name": "str",
+}
+_CODES = {"int": "q", "float": "d", "str": "QI"}
+RECORD = struct.Struct("<" + "".join(_CODES[kind] for kind in FIELD_KINDS.values()) + "QI")
+
+def snapshot_path(db_path) -> Path:
+    """Snapshot file of a database; follows the live symlink so each version has its own"""
+    return Path(os.path.realpath(db_path)).with_suffix(".snap")
+
+def _encode(rows: Iterable[tuple], heap: bytearray, json_heap: bytearray) -> List[bytes]:
+    from pydantic import ValidationError
+    from models import ProductResponse
+
+    names = list(FIELD_KINDS)
+    records = []
+    for row in rows:
+        values = []
+        for name, kind, value in zip(names, FIELD_KINDS.values(), row):
+            if kind == "int":
+                values.append(NULL_INT if value is None else value)
+            elif kind == "float":
+                values.append(math.nan if value is None else value)
+            elif value is None:
+                values.extend((0, NULL_LENGTH))
+            else:
+                encoded = str(value).encode()
+                values.extend((len(heap), len(encoded)))
+                heap += encoded
+        try:
+            body = ProductResponse(**dict(zip(names, row))).model_dump_json().encode()
+        except ValidationError:
+            body = b""  # not servable; lookups fall back to the database
+        values.extend((len(json_heap), len(body)))
+        json_heap += body
+        records.append(RECORD.pack(*values))
+    return records
+
+def build_snapshot(db, path=None, catalog_version: Optional[int] = None) -> int:
+    """
+    Compile the catalog served by `db` (a DatabaseManager) into a snapshot
+    file, replacing any previous one atomically. Returns the product count.
+    """
+    from database import PRODUCT_COLUMNS
+
+    assert list(FIELD_KINDS) == list(PRODUCT_COLUMNS), "snapshot layout is out of date"
+    path = Path(path) if path is not None else snapshot_path(db.db_path)
+    if catalog_version is None:
+        catalog_version = db.get_catalog_version()
+
+    heap, json_heap, records = bytearray(), bytearray(), []
+    for batch in db.stream_products(batch_size=5000):
+        records.extend(_encode(batch, heap, json_heap))
+    ids = [RECORD.unpack_from(record)[0] for record in records]
+
+    count = len(ids)
+    min_id = ids[0] if ids else 0
+    id_range = ids[-1] - min_id + 1 if ids else 0
+    if id_range <= DENSE_SLOTS_PER_PRODUCT * count + 1024:
+        flags = FLAG_DENSE
+        slots = [0] * id_range
+        for number, product_id in enumerate(ids, 1):
+            slots[product_id - min_id] = number
+        index = struct.pack(f"<{id_range}I", *slots)
+    else:
+        flags = 0
+        index = struct.pack(f"<{count}q", *ids)
+
+    index_offset = HEADER.size
+    records_offset = index_offset + len(index)
+    heap_offset = records_offset + RECORD.size * count
+    json_offset = heap_offset + len(heap)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, count, catalog_version, min_id, id_range,
+                         index_offset, records_offset, heap_offset, json_offset)
+
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(index)
+        f.writelines(records)
+        f.write(heap)
+        f.write(json_heap)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return count
+
+class CatalogSnapshot:
+    """Read-only view of a snapshot file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, format_version, self.flags, self.count, self.catalog_version, self.min_id, self.id_range,
+         self._index, self._records, self._heap, self._json) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a catalog snapshot (format {FORMAT_VERSION})")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+
+    def _record_number(self, product_id: int) -> Optional[int]:
+        if self.flags & FLAG_DENSE:
+            slot = product_id - self.min_id
+            if not 0 <= slot < self.id_range:
+                return None
+            number = struct.unpack_from("<I", self._map, self._index + 4 * slot)[0]
+            return number - 1 if number else None
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            found = struct.unpack_from("<q", self._map, self._index + 8 * middle)[0]
+            if found < product_id:
+                low = middle + 1
+            elif found > product_id:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _unpack(self, product_id: int) -> Optional[tuple]:
+        number = self._record_number(product_id)
+        if number is None:
+            return None
+        return RECORD.unpack_from(self._map, self._records + RECORD.size * number)
+
+    def __contains__(self, product_id: int) -> bool:
+        return self._record_number(product_id) is not None
+
+    def get_json(self, product_id: int) -> Optional[bytes]:
+        """Pre-serialised ProductResponse JSON, or None if the product is absent or not servable"""
+        values = self._unpack(product_id)
+        if values is None or not values[-1]:
+            return None
+        start = self._json + values[-2]
+        return self._map[start:start + values[-1]]
+
+    def get(self, product_id: int, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Decode a product's fields (all of them, or id plus `fields`)"""
+        values = self._unpack(product_id)
+        if values is None:
+            return None
+        product, position = {}, 0
+        for name, kind in FIELD_KINDS.items():
+            wanted = fields is None or name == "id" or name in fields
+            if kind == "str":
+                offset, length = values[position:position + 2]
+                position += 2
+                if wanted:
+                    if length == NULL_LENGTH:
+                        product[name] = None
+                    else:
+                        start = self._heap + offset
+                        product[name] = self._map[start:start + length].decode()
+            else:
+                value = values[position]
+                position += 1
+                if wanted:
+                    null = value == NULL_INT if kind == "int" else math.isnan(value)
+                    product[name] = None if null else value
+        return product
+
+def _file_stamp(path: Path):
+    """Token that changes whenever a file is written or replaced; None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+class SnapshotLoader:
+    """
+    Hands out the snapshot beside a database while it matches the catalog
+    version, re-checking whenever the database or snapshot file changes. A
+    stale or missing snapshot means lookups go to the database.
+    """
+
+    def __init__(self):
+        self.fingerprint = None
+        self.snapshot: Optional[CatalogSnapshot] = None
+
+    def current(self, db) -> Optional[CatalogSnapshot]:
+        fingerprint = (db.db_path, db.get_catalog_fingerprint(), _file_stamp(snapshot_path(db.db_path)))
+        if self.fingerprint != fingerprint:
+            # The old mapping is released once no request still holds it
+            self.snapshot = self._open(db)
+            self.fingerprint = fingerprint
+        return self.snapshot
+
+    def _open(self, db) -> Optional[CatalogSnapshot]:
+        path = snapshot_path(db.db_path)
+        if not path.exists():
+            return None
+        try:
+            snapshot = CatalogSnapshot(path)
+        except (OSError, ValueError):
+            return None
+        if snapshot.catalog_version != db.get_catalog_version():
+            return None
+        return snapshot
+
+def main():
+    """Compile the snapshot for a database from the command line"""
+    import argparse
+    import time
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Compile the memory-mapped catalog snapshot")
+    parser.add_argument("--db", default="database/ecommerce.db", help="SQLite database path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    db = DatabaseManager(args.db)
+    count = build_snapshot(db)
+    db.close_connections()
+    print(f"Wrote {count} products to {snapshot_path(args.db)} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
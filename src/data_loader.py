@@ -1,8 +1,56 @@
-import pandas as pd
+import json
 import sqlite3
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Columnar inputs are read with pyarrow, which keeps the file's column types.
+# pyarrow is optional: CSV ingestion and the API work without it.
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+PYARROW_MISSING = "Error: loading Parquet/Arrow files requires pyarrow; install it with: pip install pyarrow"
+
+def arrow_available() -> bool:
+    """Parquet/Arrow ingestion needs the optional pyarrow dependency"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def is_columnar_file(path):
+    """True for Parquet and Arrow IPC/Feather files"""
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES | ARROW_SUFFIXES
+
+def read_arrow_table(path):
+    """Read a Parquet or Arrow IPC/Feather file into a pyarrow Table"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if Path(path).suffix.lower() in PARQUET_SUFFIXES:
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+def sqlite_type(arrow_type):
+    """SQLite column type for a pyarrow type"""
+    import pyarrow.types as pat
+
+    if pat.is_integer(arrow_type) or pat.is_boolean(arrow_type):
+        return "INTEGER"
+    if pat.is_floating(arrow_type) or pat.is_decimal(arrow_type):
+        return "REAL"
+    if pat.is_timestamp(arrow_type) or pat.is_date(arrow_type):
+        return "TIMESTAMP"
+    return "TEXT"
+
+def report_throughput(rows, seconds):
+    """Print ingestion throughput"""
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"Ingested {rows:,} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+
 class EcommerceDataLoader:
     def __init__(self, data_dir="data", db_path="database/ecommerce.db"):
         self.data_dir = Path(data_dir)
@@ -11,6 +59,8 @@ class EcommerceDataLoader:
         
     def analyze_csv_structure(self, csv_path):
         """Analyze the structure of the CSV file to understand the data"""
+        import pandas as pd  # deferred: only ingestion needs pandas
+
         try:
             df = pd.read_csv(csv_path)
             print(f"CSV Structure Analysis:")
@@ -58,7 +108,10 @@ class EcommerceDataLoader:
     
     def load_csv_to_database(self, csv_path):
         """Load CSV data into the database"""
+        import pandas as pd
+
         try:
+            start = time.perf_counter()
             df = pd.read_csv(csv_path)
             conn = sqlite3.connect(self.db_path)
             
@@ -66,6 +119,8 @@ class EcommerceDataLoader:
             df.to_sql('products', conn, if_exists='replace', index=False)
             
             print(f"Successfully loaded {len(df)} records into the database")
+            report_throughput(len(df), time.perf_counter() - start)
+            self.refresh_product_listing()
             return True
         except Exception as e:
             print(f"Error loading data: {e}")
@@ -73,32 +128,192 @@ class EcommerceDataLoader:
         finally:
             conn.close()
     
-    def verify_data_loaded(self):
-        """Verify that data was loaded correctly by querying the database"""
+    def load_csv_to_database_parallel(self, csv_path, workers=None):
+        """
+        Parse and validate the CSV in a process pool, one line-aligned chunk per
+        task, and commit the valid rows from this process as the single writer
+        """
+        from parallel_ingest import known_departments, known_distribution_centers, load_csv_parallel
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # Get total count
-            count_result = conn.execute("SELECT COUNT(*) FROM products").fetchone()
-            total_count = count_result[0] if count_result else 0
+            start = time.perf_counter()
+            written, rejected = load_csv_parallel(
+                csv_path, self.db_path, workers,
+                departments=known_departments(self.db_path),
+                distribution_centers=known_distribution_centers(self.data_dir / "distribution_centers.csv")
+            )
             
-            # Get sample data
-            sample_data = conn.execute("SELECT * FROM products LIMIT 5").fetchall()
+            print(f"Successfully loaded {written} records into the database")
+            for reason, count in rejected.items():
+                if count:
+                    print(f"  Rejected {count} rows: {reason}")
+            report_throughput(written + sum(rejected.values()), time.perf_counter() - start)
+            self.refresh_product_listing()
+            return True
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return False
+    
+    def analyze_columnar_structure(self, path):
+        """Describe a Parquet/Arrow file from its schema, without reading the data"""
+        import pyarrow.parquet as pq
+
+        try:
+            if Path(path).suffix.lower() in PARQUET_SUFFIXES:
+                parquet_file = pq.ParquetFile(path)
+                schema = parquet_file.schema_arrow
+                num_rows = parquet_file.metadata.num_rows
+            else:
+                table = read_arrow_table(path)
+                schema, num_rows = table.schema, table.num_rows
+            print(f"Columnar Structure Analysis:")
+            print(f"Rows: {num_rows}")
+            print(f"Columns:")
+            for field in schema:
+                print(f"  {field.name}: {field.type}")
+            return schema
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            return None
+    
+    def _insert_arrow_table(self, conn, table, columns):
+        """Insert a pyarrow Table into products, batch by batch"""
+        placeholders = ", ".join("?" for _ in columns)
+        quoted = ", ".join(f'"{name}"' for name in columns)
+        insert_sql = f"INSERT INTO products ({quoted}) VALUES ({placeholders})"
+        for batch in table.select(columns).to_batches(max_chunksize=65536):
+            conn.executemany(insert_sql, zip(*(column.to_pylist() for column in batch.columns)))
+        return table.num_rows
+    
+    def _replace_products_table(self, conn, schema):
+        """Recreate products with the typed columns of an Arrow schema"""
+        columns = ", ".join(f'"{field.name}" {sqlite_type(field.type)}' for field in schema)
+        conn.execute("DROP TABLE IF EXISTS products")
+        conn.execute(f"CREATE TABLE products ({columns})")
+    
+    def load_columnar_to_database(self, path):
+        """Load a Parquet or Arrow file into the database using its column types"""
+        return self.load_files_to_database([path], workers=1)
+    
+    def load_files_to_database(self, paths, workers=4):
+        """
+        Load several Parquet/Arrow files into products. Files are decoded in a
+        thread pool (pyarrow releases the GIL) while this thread is the single
+        SQLite writer; at most `workers` decoded files are held at once.
+        """
+        paths = [Path(path) for path in paths]
+        if not paths:
+            print("Error: no input files to load")
+            return False
+        if not arrow_available():
+            print(PYARROW_MISSING)
+            return False
+
+        start = time.perf_counter()
+        total_rows = 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                remaining = iter(paths)
+                for path in remaining:
+                    pending.append(pool.submit(read_arrow_table, path))
+                    if len(pending) >= workers:
+                        break
+
+                columns = None
+                while pending:
+                    table = pending.popleft().result()
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        pending.append(pool.submit(read_arrow_table, next_path))
+                    if columns is None:
+                        self._replace_products_table(conn, table.schema)
+                        columns = table.schema.names
+                    total_rows += self._insert_arrow_table(conn, table, columns)
+            conn.commit()
+
+            print(f"Successfully loaded {total_rows} records from {len(paths)} file(s) into the database")
+            report_throughput(total_rows, time.perf_counter() - start)
+            self.refresh_product_listing()
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error loading data: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def refresh_product_listing(self):
+        """Rebuild the product_listing read table from the freshly loaded products and pre-render its hot pages"""
+        from page_cache import precompute_listing_pages
+        from product_listing import refresh_product_listing
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            count = refresh_product_listing(conn)
+            print(f"Refreshed product_listing read table ({count} products)")
+        finally:
+            conn.close()
+        pages = precompute_listing_pages(self.db_path)
+        print(f"Pre-rendered {pages} listing pages")
+    
+    def load_distribution_centers(self):
+        """Load distribution_centers.csv into the distribution_centers reference table, if it is there"""
+        from distribution_centers import load_distribution_centers
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                count = load_distribution_centers(conn, self.data_dir / "distribution_centers.csv")
+        except Exception as e:
+            print(f"Error loading distribution centers: {e}")
+            return False
+        finally:
+            conn.close()
+        if count is None:
+            print("No distribution_centers.csv found; skipping distribution centers")
+        else:
+            print(f"Loaded {count} distribution centers")
+        return True
+    
+    def build_catalog_snapshot(self):
+        """Compile the memory-mapped catalog snapshot the API serves lookups by id from"""
+        from catalog_snapshot import build_snapshot, snapshot_path
+        from database import DatabaseManager
+        from queries import QueryStats
+        
+        db = DatabaseManager(str(self.db_path), stats=QueryStats())
+        try:
+            count = build_snapshot(db)
+        finally:
+            db.close_connections()
+        print(f"Wrote catalog snapshot {snapshot_path(self.db_path)} ({count} products)")
+        return True
+    
+    def verify_data_loaded(self):
+        """Verify the load with the data-quality report and save it as JSON next to the database"""
+        from data_quality import build_report, format_summary
+        
+        try:
+            report = build_report(self.db_path, self.data_dir / "distribution_centers.csv")
+            print(format_summary(report))
             
-            print(f"Data verification:")
-            print(f"Total records in database: {total_count}")
-            print(f"Sample data:")
-            for row in sample_data:
-                print(f"  {row}")
+            report_path = self.db_path.parent / "quality_report.json"
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Data-quality report saved to {report_path}")
             
-            conn.close()
-            return total_count > 0
+            return report["row_count"] > 0
         except Exception as e:
             print(f"Error verifying data: {e}")
             return False
     
-    def run_complete_pipeline(self, csv_filename="products.csv"):
-        """Run the complete data loading pipeline"""
+    def run_complete_pipeline(self, csv_filename="products.csv", workers=None):
+        """
+        Run the complete data loading pipeline (CSV, Parquet or Arrow input).
+        Passing `workers` parses and validates CSV input in a process pool.
+        """
         csv_path = self.data_dir / csv_filename
         
         if not csv_path.exists():
@@ -106,17 +321,84 @@ class EcommerceDataLoader:
             print(f"Please place your {csv_filename} file in the {self.data_dir} directory")
             return False
         
-        print("Step 1: Analyzing CSV structure...")
-        df = self.analyze_csv_structure(csv_path)
-        if df is None:
+        if is_columnar_file(csv_path):
+            return self.run_columnar_pipeline([csv_path])
+        
+        if workers:
+            print(f"Step 1-3: Parsing and validating CSV with {workers} worker processes...")
+            if not self.load_csv_to_database_parallel(csv_path, workers):
+                return False
+        else:
+            print("Step 1: Analyzing CSV structure...")
+            df = self.analyze_csv_structure(csv_path)
+            if df is None:
+                return False
+            
+            print("\nStep 2: Creating database table...")
+            if not self.create_database_table(df):
+                return False
+            
+            print("\nStep 3: Loading CSV data into database...")
+            if not self.load_csv_to_database(csv_path):
+                return False
+        
+        print("\nStep 4: Loading distribution centers...")
+        if not self.load_distribution_centers():
+            return False
+        
+        print("\nStep 5: Verifying data was loaded correctly...")
+        if not self.verify_data_loaded():
+            return False
+        
+        print("\n✅ All steps completed successfully!")
+        return True
+
+    def run_with_swap(self, pipeline, *args, **kwargs):
+        """
+        Run a pipeline method against a fresh copy of the database and promote
+        it only if the pipeline succeeds, so the API never reads a partial load
+        """
+        from db_swap import discard, promote, start_build
+        
+        live_path = self.db_path
+        build_path = start_build(live_path)
+        print(f"Building into {build_path}")
+        self.db_path = build_path
+        try:
+            ok = pipeline(*args, **kwargs)
+        except BaseException:
+            discard(build_path)
+            raise
+        finally:
+            self.db_path = live_path
+        
+        if ok:
+            promote(build_path, live_path)
+            print(f"Promoted {build_path.name} to {live_path}")
+        else:
+            discard(build_path)
+            print(f"Build failed; {live_path} left unchanged")
+        return ok
+
+    def run_columnar_pipeline(self, paths, workers=4):
+        """Load Parquet/Arrow files: typed columns, no CSV parsing or dtype inference"""
+        if not paths:
+            print(f"Error: no Parquet/Arrow files found in {self.data_dir}")
+            return False
+        if not arrow_available():
+            print(PYARROW_MISSING)
             return False
         
-        print("\nStep 2: Creating database table...")
-        if not self.create_database_table(df):
+        print("Step 1: Reading columnar schema...")
+        if self.analyze_columnar_structure(paths[0]) is None:
             return False
         
-        print("\nStep 3: Loading CSV data into database...")
-        if not self.load_csv_to_database(csv_path):
+        print(f"\nStep 2: Loading {len(paths)} columnar file(s) into database...")
+        if not self.load_files_to_database(paths, workers):
+            return False
+        
+        print("\nStep 3: Loading distribution centers...")
+        if not self.load_distribution_centers():
             return False
         
         print("\nStep 4: Verifying data was loaded correctly...")
@@ -127,5 +409,31 @@ class EcommerceDataLoader:
         return True
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load product data into the SQLite database")
+    parser.add_argument("filename", nargs="?", default="products.csv",
+                        help="Input file in the data directory (.csv, .parquet, .arrow or .feather)")
+    parser.add_argument("--files", help="Glob of Parquet/Arrow files in the data directory to load in parallel")
+    parser.add_argument("--workers", type=int, default=4, help="Files decoded concurrently with --files")
+    parser.add_argument("--parallel", type=int, metavar="N",
+                        help="Parse and validate CSV input with N worker processes")
+    parser.add_argument("--swap", action="store_true",
+                        help="Load into a copy of the database and atomically promote it when done")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Also compile the memory-mapped catalog snapshot for lookups by id")
+    args = parser.parse_args()
+
     loader = EcommerceDataLoader()
-    loader.run_complete_pipeline() 
\ No newline at end of file
+
+    def pipeline():
+        if args.files:
+            ok = loader.run_columnar_pipeline(sorted(loader.data_dir.glob(args.files)), args.workers)
+        else:
+            ok = loader.run_complete_pipeline(args.filename, workers=args.parallel)
+        return ok and (not args.snapshot or loader.build_catalog_snapshot())
+
+    if args.swap:
+        loader.run_with_swap(pipeline)
+    else:
+        pipeline() 
\ No newline at end of file
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Data-quality report for the products table.
+
+Every check is folded into set-based SQL passes that SQLite evaluates in C:
+one aggregate scan over products computes null counts, price/cost anomalies,
+orphaned references and the moments of the price distributions together,
+and distinct counts for duplicate detection run beside it. The report is a
+plain dict, so it can be dumped as JSON after every ingest or migration.
+
+Usage:
+    python src/data_quality.py [--db database/ecommerce.db] [--json] [--strict]
+"""
+
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_DISTRIBUTION_CENTERS_CSV = Path(__file__).resolve().parent.parent / "data" / "distribution_centers.csv"
+
+# Numeric columns summarised in "distributions"; margin is derived
+DISTRIBUTION_COLUMNS = {
+    "retail_price": "retail_price",
+    "cost": "cost",
+    "margin": "retail_price - cost",
+}
+QUANTILES = (0.5, 0.9, 0.99)
+
+def load_distribution_center_ids(conn, csv_path) -> Optional[List[int]]:
+    """Known distribution center ids: the distribution_centers table if loaded, else the CSV"""
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM distribution_centers")]
+    except sqlite3.OperationalError:
+        pass
+    if csv_path and Path(csv_path).exists():
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            return [int(row["id"]) for row in csv.DictReader(f)]
+    return None
+
+def _columns(conn, table: str) -> Dict[str, Dict[str, Any]]:
+    return {row[1]: {"type": row[2], "pk": row[5]} for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _table_exists(conn, table: str) -> bool:
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(query, (table,)).fetchone() is not None
+
+def _leading_index_exists(conn, column: str) -> bool:
+    """True if some index on products starts with `column`"""
+    for index in conn.execute("PRAGMA index_list(products)"):
+        info = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        if info and info[0][2] == column:
+            return True
+    return False
+
+def _quantiles(conn, column: str, non_null: int) -> Dict[str, Optional[float]]:
+    """Exact quantiles by seeking into an index on the column"""
+    result = {}
+    for q in QUANTILES:
+        offset = min(non_null - 1, int(q * non_null))
+        row = conn.execute(
+            f"SELECT {column} FROM products WHERE {column} IS NOT NULL ORDER BY {column} LIMIT 1 OFFSET ?",
+            (offset,)
+        ).fetchone()
+        result[f"p{round(q * 100)}"] = row[0] if row else None
+    return result
+
+def _merge(kind: str, a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b if kind == "sum" else min(a, b) if kind == "min" else max(a, b)
+
+def _scan_range(db_path, query: str, bounds: Tuple[int, int]):
+    """Run the aggregate query over one rowid range on its own connection"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(query, bounds).fetchone()
+    finally:
+        conn.close()
+
+def _count_duplicates(db_path, column: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT("{column}") - COUNT(DISTINCT "{column}") FROM products').fetchone()[0]
+    finally:
+        conn.close()
+
+def _aggregates(columns, has_departments: bool, distribution_center_ids) -> List[Tuple[str, str, str]]:
+    """(key, SQL aggregate, merge kind) for every per-row check, kept cheap per row"""
+    has = columns.__contains__
+    aggregates = [("row_count", "COUNT(*)", "sum")]
+    aggregates += [(f"count:{column}", f'COUNT("{column}")', "sum") for column in columns]
+    if has("name"):
+        aggregates.append(("anomaly:blank_name", "SUM(TRIM(name) = '')", "sum"))
+    if has("retail_price"):
+        aggregates.append(("anomaly:negative_price", "SUM(retail_price < 0)", "sum"))
+        aggregates.append(("anomaly:zero_price", "SUM(retail_price = 0)", "sum"))
+    if has("cost"):
+        aggregates.append(("anomaly:negative_cost", "SUM(cost < 0)", "sum"))
+    if has("cost") and has("retail_price"):
+        aggregates.append(("anomaly:cost_above_price", "SUM(cost > retail_price)", "sum"))
+    if has("department_id") and has_departments:
+        # Uncorrelated subquery: SQLite materialises the ids once per scan
+        aggregates.append(("orphan:department_id", "SUM(department_id NOT IN (SELECT id FROM departments))", "sum"))
+    if has("department_id") and has("department"):
+        aggregates.append(("orphan:unmapped_department", "SUM(department != '' AND department_id IS NULL)", "sum"))
+    if has("distribution_center_id") and distribution_center_ids is not None:
+        if distribution_center_ids:
+            id_list = ", ".join(str(int(dc_id)) for dc_id in distribution_center_ids)
+            orphans = f"SUM(distribution_center_id NOT IN ({id_list}))"
+        else:
+            # No known centers: every reference is an orphan
+            orphans = "COUNT(distribution_center_id)"
+        aggregates.append(("orphan:distribution_center_id", orphans, "sum"))
+    for name, expr in DISTRIBUTION_COLUMNS.items():
+        if name == "margin" and not (has("retail_price") and has("cost")) or name != "margin" and not has(name):
+            continue
+        if name == "margin":
+            aggregates.append((f"dist:{name}:count", f"COUNT({expr})", "sum"))
+        aggregates.append((f"dist:{name}:min", f"MIN({expr})", "min"))
+        aggregates.append((f"dist:{name}:max", f"MAX({expr})", "max"))
+        aggregates.append((f"dist:{name}:sum", f"TOTAL({expr})", "sum"))
+        aggregates.append((f"dist:{name}:sumsq", f"TOTAL(({expr}) * ({expr}))", "sum"))
+    return aggregates
+
+def build_report(db_path, distribution_centers_csv=DEFAULT_DISTRIBUTION_CENTERS_CSV,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compute the data-quality report for the products table in `db_path`.
+    Distribution center references are checked against the
+    distribution_centers table, or the CSV when the table is not loaded.
+
+    The aggregate scan is split into rowid ranges run on `workers` threads
+    (default: one per CPU); sqlite3 releases the GIL while it steps, so the
+    ranges are scanned in parallel and their partial aggregates merged.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = _columns(conn, "products")
+        if not columns:
+            raise ValueError(f"No products table in {db_path}")
+        has = columns.__contains__
+        distribution_center_ids = load_distribution_center_ids(conn, distribution_centers_csv)
+        has_departments = _table_exists(conn, "departments")
+        first_rowid, last_rowid = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM products").fetchone()
+
+        aggregates = _aggregates(columns, has_departments, distribution_center_ids)
+        query = (f"SELECT {', '.join(expr for _, expr, _ in aggregates)} "
+                 "FROM products WHERE rowid BETWEEN ? AND ?")
+        first_rowid, last_rowid = first_rowid or 0, last_rowid or 0
+        step = (last_rowid - first_rowid) // workers + 1
+        ranges = [(lo, min(lo + step - 1, last_rowid)) for lo in range(first_rowid, last_rowid + 1, step)]
+
+        # Distinct counts cannot be merged across ranges, so they run as
+        # separate scans alongside the ranged ones
+        duplicate_columns = [column for column in ("id", "sku") if has(column) and not columns[column]["pk"]]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            duplicate_counts = {column: pool.submit(_count_duplicates, db_path, column) for column in duplicate_columns}
+            partials = list(pool.map(partial(_scan_range, db_path, query), ranges))
+            duplicates = {column: future.result() for column, future in duplicate_counts.items()}
+
+        values: Dict[str, Any] = {key: None for key, _, _ in aggregates}
+        for row in partials:
+            for (key, _, kind), value in zip(aggregates, row):
+                values[key] = _merge(kind, values[key], value)
+        row_count = values["row_count"] or 0
+
+        report: Dict[str, Any] = {
+            "table": "products",
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "row_count": row_count,
+            "null_rates": {},
+            "duplicates": duplicates,
+            "anomalies": {},
+            "orphans": {},
+            "distributions": {},
+            "departments": {},
+        }
+        for key, value in values.items():
+            kind, _, name = key.partition(":")
+            if kind == "count":
+                report["null_rates"][name] = (row_count - (value or 0)) / row_count if row_count else 0.0
+            elif kind == "anomaly":
+                report["anomalies"][name] = value or 0
+            elif kind == "orphan":
+                report["orphans"][name] = value or 0
+
+        for name in DISTRIBUTION_COLUMNS:
+            if f"dist:{name}:sum" not in values:
+                continue
+            count = values.get(f"dist:{name}:count", values.get(f"count:{name}")) or 0
+            stats: Dict[str, Any] = {"count": count, "min": values[f"dist:{name}:min"], "max": values[f"dist:{name}:max"]}
+            if count:
+                mean = values[f"dist:{name}:sum"] / count
+                variance = max(0.0, values[f"dist:{name}:sumsq"] / count - mean * mean)
+                stats.update(mean=mean, stddev=math.sqrt(variance))
+                if name in columns and _leading_index_exists(conn, name):
+                    stats.update(_quantiles(conn, name, count))
+            report["distributions"][name] = stats
+
+        # Product counts per department (index on department_id when migrated)
+        if has("department_id") and has_departments:
+            department_query = """
+            SELECT d.name, COUNT(p.department_id)
+            FROM departments d
+            LEFT JOIN products p ON p.department_id = d.id
+            GROUP BY d.id, d.name
+            ORDER BY d.name
+            """
+            report["departments"] = dict(conn.execute(department_query).fetchall())
+        elif has("department"):
+            department_query = "SELECT department, COUNT(*) FROM products GROUP BY department ORDER BY department"
+            report["departments"] = {name or "": count for name, count in conn.execute(department_query)}
+
+        report["issues"] = [
+            f"{section}.{name} = {count}"
+            for section in ("duplicates", "anomalies", "orphans")
+            for name, count in report[section].items() if count
+        ]
+        report["ok"] = row_count > 0 and not report["issues"]
+        report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return report
+    finally:
+        conn.close()
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """Human-readable summary of a report"""
+    lines = [f"Data quality report for {report['table']}: {report['row_count']:,} rows "
+             f"({report['elapsed_seconds']}s)"]
+    null_rates = {name: rate for name, rate in report["null_rates"].items() if rate}
+    if null_rates:
+        lines.append("Null rates: " + ", ".join(f"{name} {rate:.1%}" for name, rate in null_rates.items()))
+    for name, stats in report["distributions"].items():
+        if stats.get("count"):
+            extra = "".join(f", {key} {stats[key]:.2f}" for key in ("p50", "p90", "p99") if stats.get(key) is not None)
+            lines.append(f"{name}: min {stats['min']:.2f}, mean {stats['mean']:.2f}, "
+                         f"max {stats['max']:.2f}, stddev {stats['stddev']:.2f}{extra}")
+    if report["departments"]:
+        lines.append("Departments: " + ", ".join(f"{name} {count:,}" for name, count in report["departments"].items()))
+    if report["issues"]:
+        lines.append("⚠️ Issues: " + "; ".join(report["issues"]))
+    else:
+        lines.append("✅ No data-quality issues found")
+    return "\n".join(lines)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Data-quality report for the products table")
+    parser.add_argument("--db", default="database/ecommerce.db", help="SQLite database path")
+    parser.add_argument("--json", action="store_true", help="Print the machine-readable report")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any issue is found")
+    parser.add_argument("--workers", type=int, help="Threads scanning the table (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.db, workers=args.workers)
+    print(json.dumps(report, indent=2) if args.json else format_summary(report))
+    if args.strict and not report["ok"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,238 @@
+import os
+import queue
 import sqlite3
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from contextlib import contextmanager
 
+from product_listing import listing_exists
+from queries import QUERY_STATS, QueryStats, render
+from search_query import plan_query
+
+# Prepared statements kept per pooled connection. Sparse fieldsets and sort
+# options multiply the distinct statement texts, so this is above the default.
+STATEMENT_CACHE_SIZE = 512
+# Idle connections kept per database file
+POOL_SIZE = 8
+# SQLite virtual-machine instructions between statement deadline checks
+PROGRESS_STEPS = 1000
+
+# Monotonic deadline for statements run in the current context (see statement_timeout)
+_deadline: ContextVar[Optional[float]] = ContextVar("statement_deadline", default=None)
+
+class QueryTimeout(Exception):
+    """A statement ran past the deadline set by statement_timeout and was aborted"""
+
+class ReadModelMissing(RuntimeError):
+    """The database has no product_listing read model; ingest and migration build it"""
+
+@contextmanager
+def statement_timeout(seconds: Optional[float]):
+    """Abort statements run inside the block once `seconds` have elapsed (None: no limit)"""
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+# Sort keys accepted by the listing methods, mapped to SQL expressions. Each one
+# has a matching index (see product_listing.LISTING_INDEXES) and the
+# rowid tie-breaker is implicit in every SQLite index, so ORDER BY <expr>, p.id
+# walks an index instead of building a temp B-tree.
+SORT_COLUMNS = {
+    "id": "p.id",
+    "name": "p.name",
+    "price": "p.retail_price",
+    "brand": "p.brand",
+    "margin": "(p.retail_price - p.cost)",
+}
+
+# Served product fields, in response order, mapped to their SELECT expressions.
+# Listings read the denormalised product_listing table, so none needs a join.
+# records.ProductRecord slots follow this order.
+PRODUCT_COLUMNS = {
+    "id": "p.id",
+    "name": "p.name",
+    "category": "p.category",
+    "brand": "p.brand",
+    "retail_price": "p.retail_price",
+    "cost": "p.cost",
+    "department": "p.department",
+    "sku": "p.sku",
+    "distribution_center_id": "p.distribution_center_id",
+    "department_id": "p.department_id",
+    "department_name": "p.department_name",
+}
+
+def selected_fields(fields: Optional[List[str]] = None) -> List[str]:
+    """Names of the columns select_list() returns, in order"""
+    return [name for name in PRODUCT_COLUMNS if not fields or name == "id" or name in fields]
+
+def select_list(fields: Optional[List[str]] = None) -> str:
+    """Build the SELECT list for the requested product fields (id is always included)"""
+    unknown = [field for field in fields or [] if field not in PRODUCT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    return ", ".join(PRODUCT_COLUMNS[name] for name in selected_fields(fields))
+
+def order_by_clause(sort: str = "id", order: str = "asc") -> str:
+    """Build an ORDER BY clause from a whitelisted sort key and direction"""
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort field: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Unsupported sort order: {order}")
+    direction = order.upper()
+    if sort == "id":
+        return f"ORDER BY p.id {direction}"
+    return f"ORDER BY {SORT_COLUMNS[sort]} {direction}, p.id {direction}"
+
+def _drain(pool: queue.LifoQueue):
+    while True:
+        try:
+            pool.get_nowait().close()
+        except queue.Empty:
+            break
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "database/ecommerce.db"):
+    def __init__(self, db_path: str = "database/ecommerce.db", stats: Optional[QueryStats] = None):
         self.db_path = db_path
+        self.stats = stats if stats is not None else QUERY_STATS
+        self._listing_ready = set()  # database files known to have product_listing
+        self._pools: Dict[str, queue.LifoQueue] = {}
+        self._pools_lock = threading.Lock()
+    
+    def get_catalog_fingerprint(self):
+        """Cheap token that changes whenever the database file is written"""
+        fingerprint = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                stat = os.stat(path)
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+    
+    def _check_listing(self, path, conn):
+        """
+        Fail if a database file has no listing read model. Readers never build
+        it: that is a full rewrite of the live catalog, done at ingest
+        (data_loader), migration (migrate_departments) or API startup.
+        """
+        if path in self._listing_ready:
+            return
+        if not listing_exists(conn):
+            raise ReadModelMissing(
+                f"{path} has no product_listing read model; "
+                "restart the API, load it with data_loader.py or run migrate_departments.py"
+            )
+        self._listing_ready.add(path)
+    
+    def _pool(self, path) -> queue.LifoQueue:
+        """
+        Connection pool for one database file. A new file behind db_path (see
+        db_swap.promote) replaces the pools of older versions: their idle
+        connections are closed now, in-flight ones when they are released.
+        """
+        pool = self._pools.get(path)
+        if pool is not None:
+            return pool
+        with self._pools_lock:
+            stale = []
+            pool = self._pools.get(path)
+            if pool is None:
+                stale = list(self._pools.values())
+                pool = queue.LifoQueue(maxsize=POOL_SIZE)
+                self._pools = {path: pool}
+        for stale_pool in stale:
+            _drain(stale_pool)
+        return pool
+    
+    def _acquire(self):
+        """Take an idle pooled connection for the current database version, or open one"""
+        # db_path may be a symlink to the live version; pools follow its target
+        path = os.path.realpath(self.db_path)
+        try:
+            conn = self._pool(path).get_nowait()
+        except queue.Empty:
+            # Pooled connections may be handed to export worker threads
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+        return path, conn
+    
+    def _release(self, path, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        pool = self._pools.get(path)
+        if pool is None:
+            conn.close()  # superseded database version
+            return
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def close_connections(self):
+        """Close every idle pooled connection"""
+        for pool in list(self._pools.values()):
+            _drain(pool)
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+        """
+        Context manager for pooled database connections. Inside statement_timeout,
+        a progress handler aborts statements that run past the deadline.
+        """
+        path, conn = self._acquire()
+        deadline = _deadline.get()
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
         try:
+            self._check_listing(path, conn)
             yield conn
+        except sqlite3.OperationalError as e:
+            if deadline is not None and time.monotonic() > deadline:
+                raise QueryTimeout(str(e)) from e
+            raise
         finally:
-            conn.close()
+            if deadline is not None:
+                conn.set_progress_handler(None, 0)
+            self._release(path, conn)
     
-    def get_all_products(self, page: int = 1, page_size: int = 50) -> Dict[str, Any]:
-        """Get all products with pagination and department information"""
+    def _fetch(self, conn, name: str, params=(), one: bool = False, **sql_params):
+        """Run a named statement from the registry, recording its execution time"""
+        start = time.perf_counter()
+        cursor = conn.execute(render(name, **sql_params), params)
+        if one:
+            result = cursor.fetchone()
+            rows = 1 if result is not None else 0
+        else:
+            result = cursor.fetchall()
+            rows = len(result)
+        self.stats.record(name, time.perf_counter() - start, rows)
+        return result
+    
+    def get_query_stats(self) -> Dict[str, Dict[str, float]]:
+        """Execution counts and timings per named statement"""
+        return self.stats.snapshot()
+    
+    def get_all_products(self, page: int = 1, page_size: int = 50,
+                         sort: str = "id", order: str = "asc",
+                         fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get all products with pagination, sorting and department information"""
         offset = (page - 1) * page_size
+        order_by = order_by_clause(sort, order)
+        columns = select_list(fields)
         
         with self.get_connection() as conn:
             # Get total count
-            count_result = conn.execute("SELECT COUNT(*) FROM products").fetchone()
+            count_result = self._fetch(conn, "products.count", one=True)
             total_count = count_result[0] if count_result else 0
             
             # Get products for current page with department information
-            query = """
-            SELECT p.id, p.name, p.category, p.brand, p.retail_price, p.cost, 
-                   p.department, p.sku, p.distribution_center_id,
-                   d.id as department_id, d.name as department_name
-            FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            ORDER BY p.id 
-            LIMIT ? OFFSET ?
-            """
-            
-            cursor = conn.execute(query, (page_size, offset))
-            products = [dict(row) for row in cursor.fetchall()]
+            rows = self._fetch(conn, "products.page", (page_size, offset), columns=columns, order_by=order_by)
+            products = [dict(row) for row in rows]
             
             return {
                 "products": products,
@@ -47,54 +242,83 @@ class DatabaseManager:
                 "total_pages": (total_count + page_size - 1) // page_size
             }
     
-    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+    def get_product_by_id(self, product_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """Get a specific product by ID with department information"""
+        columns = select_list(fields)
         with self.get_connection() as conn:
-            query = """
-            SELECT p.id, p.name, p.category, p.brand, p.retail_price, p.cost, 
-                   p.department, p.sku, p.distribution_center_id,
-                   d.id as department_id, d.name as department_name
-            FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            WHERE p.id = ?
-            """
-            
-            cursor = conn.execute(query, (product_id,))
-            row = cursor.fetchone()
+            row = self._fetch(conn, "products.by_id", (product_id,), one=True, columns=columns)
             
             if row:
                 return dict(row)
             return None
     
-    def search_products(self, search_term: str, page: int = 1, page_size: int = 50) -> Dict[str, Any]:
-        """Search products by name, category, or brand with department information"""
+    def stream_products(self, department_id: Optional[int] = None, fields: Optional[List[str]] = None,
+                        batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Yield every product (optionally one department) in id order as batches
+        of tuples, from a single cursor. The connection may be advanced from a
+        worker thread, one batch at a time.
+        """
+        columns = select_list(fields)
+        if department_id is not None:
+            name, params = "products.stream_department", (department_id,)
+        else:
+            name, params = "products.stream", ()
+        
+        path, conn = self._acquire()
+        start = time.perf_counter()
+        rows = 0
+        try:
+            self._check_listing(path, conn)
+            cursor = conn.execute(render(name, columns=columns), params)
+            # Plain tuples: the encoders index columns by position
+            cursor.row_factory = None
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                rows += len(batch)
+                yield batch
+        finally:
+            self.stats.record(name, time.perf_counter() - start, rows)
+            self._release(path, conn)
+    
+    def get_products_by_ids(self, product_ids: List[int], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get products by ID with department information, in the order given"""
+        if not product_ids:
+            return []
+        columns = select_list(fields)
+        
+        with self.get_connection() as conn:
+            placeholders = ", ".join("?" for _ in product_ids)
+            result = self._fetch(conn, "products.by_ids", list(product_ids), columns=columns, placeholders=placeholders)
+            rows = {row["id"]: dict(row) for row in result}
+            return [rows[product_id] for product_id in product_ids if product_id in rows]
+    
+    def search_products(self, search_term: str, page: int = 1, page_size: int = 50,
+                        sort: str = "id", order: str = "asc",
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Search products with a search_query query (words, phrases, field
+        clauses, AND/OR/NOT) with department information. Raises
+        search_query.QuerySyntaxError for malformed queries.
+        """
         offset = (page - 1) * page_size
-        search_pattern = f"%{search_term}%"
+        order_by = order_by_clause(sort, order)
+        columns = select_list(fields)
         
         with self.get_connection() as conn:
+            text_index = self._fetch(conn, "listing.text_index", one=True) is not None
+            condition, params = plan_query(search_term, text_index)
+            
             # Get total count for search
-            count_query = """
-            SELECT COUNT(*) FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            WHERE p.name LIKE ? OR p.category LIKE ? OR p.brand LIKE ? OR d.name LIKE ?
-            """
-            count_result = conn.execute(count_query, (search_pattern, search_pattern, search_pattern, search_pattern)).fetchone()
+            count_result = self._fetch(conn, "products.search_count", params, one=True, condition=condition)
             total_count = count_result[0] if count_result else 0
             
             # Get search results with department information
-            query = """
-            SELECT p.id, p.name, p.category, p.brand, p.retail_price, p.cost, 
-                   p.department, p.sku, p.distribution_center_id,
-                   d.id as department_id, d.name as department_name
-            FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            WHERE p.name LIKE ? OR p.category LIKE ? OR p.brand LIKE ? OR d.name LIKE ?
-            ORDER BY p.id 
-            LIMIT ? OFFSET ?
-            """
-            
-            cursor = conn.execute(query, (search_pattern, search_pattern, search_pattern, search_pattern, page_size, offset))
-            products = [dict(row) for row in cursor.fetchall()]
+            rows = self._fetch(conn, "products.search_page", params + [page_size, offset],
+                               columns=columns, order_by=order_by, condition=condition)
+            products = [dict(row) for row in rows]
             
             return {
                 "products": products,
@@ -106,46 +330,33 @@ class DatabaseManager:
             }
     
     def get_departments(self) -> List[Dict[str, Any]]:
-        """Get all departments"""
+        """Get all departments with their maintained product counts, by name"""
         with self.get_connection() as conn:
-            query = """
-            SELECT id, name
-            FROM departments
-            ORDER BY name
-            """
-            
-            cursor = conn.execute(query)
-            departments = [dict(row) for row in cursor.fetchall()]
-            return departments
+            return [dict(row) for row in self._fetch(conn, "departments.list")]
     
-    def get_products_by_department(self, department_id: int, page: int = 1, page_size: int = 50) -> Dict[str, Any]:
-        """Get products by department ID with pagination"""
+    def get_department(self, department_id: int) -> Optional[Dict[str, Any]]:
+        """Get one department with its maintained product count"""
+        with self.get_connection() as conn:
+            row = self._fetch(conn, "departments.by_id", (department_id,), one=True)
+            return dict(row) if row else None
+    
+    def get_products_by_department(self, department_id: int, page: int = 1, page_size: int = 50,
+                                   sort: str = "id", order: str = "asc",
+                                   fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get products by department ID with pagination and sorting"""
         offset = (page - 1) * page_size
+        order_by = order_by_clause(sort, order)
+        columns = select_list(fields)
         
         with self.get_connection() as conn:
             # Get total count for department
-            count_query = """
-            SELECT COUNT(*) FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            WHERE d.id = ?
-            """
-            count_result = conn.execute(count_query, (department_id,)).fetchone()
+            count_result = self._fetch(conn, "departments.product_count", (department_id,), one=True)
             total_count = count_result[0] if count_result else 0
             
             # Get products for department
-            query = """
-            SELECT p.id, p.name, p.category, p.brand, p.retail_price, p.cost, 
-                   p.department, p.sku, p.distribution_center_id,
-                   d.id as department_id, d.name as department_name
-            FROM products p
-            LEFT JOIN departments d ON p.department_id = d.id
-            WHERE d.id = ?
-            ORDER BY p.id 
-            LIMIT ? OFFSET ?
-            """
-            
-            cursor = conn.execute(query, (department_id, page_size, offset))
-            products = [dict(row) for row in cursor.fetchall()]
+            rows = self._fetch(conn, "departments.products_page", (department_id, page_size, offset),
+                               columns=columns, order_by=order_by)
+            products = [dict(row) for row in rows]
             
             return {
                 "products": products,
@@ -154,4 +365,89 @@ class DatabaseManager:
                 "page_size": page_size,
                 "department_id": department_id,
                 "total_pages": (total_count + page_size - 1) // page_size
-            } 
\ No newline at end of file
+            }
+    
+    def get_suggestion_terms(self) -> List[tuple]:
+        """Get (term, kind, weight) rows for autocomplete, weighted by product count"""
+        with self.get_connection() as conn:
+            return [tuple(row) for row in self._fetch(conn, "suggest.terms")]
+    
+    def get_fuzzy_documents(self) -> List[tuple]:
+        """Get (id, name, brand, category) rows for the fuzzy search index"""
+        with self.get_connection() as conn:
+            return [tuple(row) for row in self._fetch(conn, "fuzzy.documents")]
+    
+    def get_catalog_version(self) -> int:
+        """Latest catalog version in the change log (0 for an empty catalog)"""
+        with self.get_connection() as conn:
+            return self._fetch(conn, "changes.latest", one=True)[0]
+    
+    def get_catalog_generation(self) -> str:
+        """
+        Id of the change log the catalog versions count in; a database rebuilt
+        from scratch gets a new one ("" if the read model predates it)
+        """
+        with self.get_connection() as conn:
+            if self._fetch(conn, "changes.generation_exists", one=True) is None:
+                return ""
+            row = self._fetch(conn, "changes.generation", one=True)
+            return row[0] if row else ""
+    
+    def get_present_product_ids(self, since: int = 0) -> Tuple[int, List[int]]:
+        """Latest catalog version, and ids inserted or updated after catalog version `since`"""
+        with self.get_connection() as conn:
+            latest_version = self._fetch(conn, "changes.latest", one=True)[0]
+            rows = self._fetch(conn, "changes.present_ids", (since,))
+        return latest_version, [row[0] for row in rows]
+    
+    def get_distribution_centers(self) -> List[Dict[str, Any]]:
+        """Every distribution center by id (none if the database predates the table)"""
+        with self.get_connection() as conn:
+            if self._fetch(conn, "distribution_centers.exists", one=True) is None:
+                return []
+            return [dict(row) for row in self._fetch(conn, "distribution_centers.list")]
+    
+    def get_changes(self, since: int = 0, limit: int = 500) -> Dict[str, Any]:
+        """Products changed after catalog version `since`, oldest change first"""
+        columns = select_list(None)
+        with self.get_connection() as conn:
+            latest_version = self._fetch(conn, "changes.latest", one=True)[0]
+            rows = self._fetch(conn, "changes.page", (since, limit + 1), columns=columns)
+        
+        changes = []
+        for row in rows[:limit]:
+            product = dict(row)
+            version, op, product_id = product.pop("version"), product.pop("op"), product.pop("product_id")
+            changes.append({
+                "version": version,
+                "op": op,
+                "product_id": product_id,
+                "product": product if op != "delete" and product["id"] is not None else None
+            })
+        
+        return {
+            "since": since,
+            "version": changes[-1]["version"] if changes else max(since, latest_version),
+            "latest_version": latest_version,
+            "has_more": len(rows) > limit,
+            "changes": changes
+        }
+
+# DatabaseManager implementation behind the API: "sqlite3" for the pool above,
+# "sqlalchemy" for sqlalchemy_backend (SQLAlchemy Core engines, or another database)
+BACKEND = "sqlite3"
+
+def create_database_manager(db_path: str = "database/ecommerce.db", backend: Optional[str] = None,
+                            **options) -> DatabaseManager:
+    """DatabaseManager of the configured backend; options go to its constructor"""
+    backend = backend or BACKEND
+    if backend == "sqlalchemy":
+        from sqlalchemy_backend import SQLAlchemyDatabaseManager
+        return SQLAlchemyDatabaseManager(db_path, **options)
+    if backend != "sqlite3":
+        raise ValueError(f"Unknown database backend: {backend}")
+    return DatabaseManager(db_path, **options)
+
+# The manager behind every API route, main's and the departments router's:
+# one connection pool, one set of query stats and one backend choice
+API_DB = create_database_manager()
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# Blue/green database files. Every build goes into a new versioned file next to
+# the live path (database/ecommerce.<version>.db); promoting it re-points the
+# live path, a symlink, in one atomic rename. SQLite resolves the symlink, so
+# journals belong to the versioned file and never mix between versions.
+# Readers already inside a statement finish on the file they opened.
+KEEP_VERSIONS = 2  # the live file plus the one it replaced
+
+def version_path(db_path, version: int) -> Path:
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.{version}{db_path.suffix}")
+
+def list_versions(db_path):
+    """Versioned files of a live path, oldest first"""
+    db_path = Path(db_path)
+    versions = []
+    for path in db_path.parent.glob(f"{db_path.stem}.*{db_path.suffix}"):
+        version = path.name[len(db_path.stem) + 1:len(path.name) - len(db_path.suffix)]
+        if version.isdigit():
+            versions.append((int(version), path))
+    return [path for _, path in sorted(versions)]
+
+def live_version(db_path) -> Path:
+    """File currently served at the live path"""
+    return Path(os.path.realpath(db_path))
+
+def start_build(db_path) -> Path:
+    """
+    New versioned file for a build, seeded with a consistent copy of the live
+    database (if there is one) through SQLite's online backup, which does not
+    block readers of the live file
+    """
+    build_path = version_path(db_path, time.time_ns())
+    target = sqlite3.connect(build_path)
+    try:
+        if Path(db_path).exists():
+            source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+    finally:
+        target.close()
+    return build_path
+
+def promote(build_path, db_path, keep: int = KEEP_VERSIONS):
+    """
+    Make a finished build the live database: refresh planner statistics,
+    flush it to disk, then atomically swap the live path to point at it.
+    Versions beyond `keep` are removed.
+    """
+    build_path, db_path = Path(build_path), Path(db_path)
+    conn = sqlite3.connect(build_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    _fsync(build_path)
+
+    link = db_path.with_name(f".{db_path.name}.swap")
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    os.symlink(build_path.name, link)
+    os.replace(link, db_path)
+    _fsync(db_path.parent)
+
+    for old_path in list_versions(db_path)[:-keep]:
+        if old_path != build_path:
+            _remove(old_path)
+
+def discard(build_path):
+    """Remove an unfinished build"""
+    _remove(Path(build_path))
+
+@contextmanager
+def build_then_swap(db_path) -> Iterator[Path]:
+    """
+    Yield a fresh build file for `db_path`; promote it if the block
+    completes, discard it if the block raises
+    """
+    build_path = start_build(db_path)
+    try:
+        yield build_path
+    except BaseException:
+        discard(build_path)
+        raise
+    promote(build_path, db_path)
+
+def _remove(path: Path):
+    """Remove a version and its sidecar files (journals, catalog snapshot, pre-rendered pages)"""
+    sidecars = [path.name, f"{path.name}-journal", f"{path.name}-wal", f"{path.name}-shm",
+                path.with_suffix(".snap").name, path.with_suffix(".pages").name]
+    for name in sidecars:
+        try:
+            (path.parent / name).unlink()
+        except FileNotFoundError:
+            pass
+
+def _fsync(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,152 +1,130 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
-from pydantic import BaseModel
-from database import DatabaseManager
+from database import API_DB
+from models import DepartmentResponse, DepartmentDetailResponse, ProductListResponse, ProductResponse, SortField, SortOrder
+from responses import FIELDS_DESCRIPTION, INCLUDE_DESCRIPTION, include_fields, parse_fields, parse_include
+from responses import product_list_response
+from page_cache import DEPARTMENT_SORT, PAGE_CACHE, PAGE_SIZE, department_key
+from admission import ADMISSION_LIMITS
+from result_cache import RESULT_CACHE, query_key, response_body
+from distribution_centers import DISTRIBUTION_CENTERS
 
+# The only home of the department routes; every query goes through the API's
+# shared DatabaseManager, which reads the department_counts and
+# product_listing read models.
 router = APIRouter()
-db = DatabaseManager()
+db = API_DB
 
-# Department response models
-class Department(BaseModel):
-    id: int
-    name: str
-    product_count: int
+def department_products_page(department_id: int, page: int, page_size: int, sort: str, order: str,
+                             fields, include):
+    """
+    Body of GET /departments/{department_id}/products, run on the threadpool
+    under the listing admission limit so cache lookups and reads never block
+    the event loop
+    """
+    if (fields is None and not include and sort == DEPARTMENT_SORT and order == "asc"
+            and page_size == PAGE_SIZE and page <= PAGE_CACHE.pages):
+        body = PAGE_CACHE.lookup(db, department_key(department_id, page))
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    centers = DISTRIBUTION_CENTERS.current(db) if include else None
+    key = query_key(f"departments/{department_id}/products", page=page, page_size=page_size,
+                    sort=sort, order=order, fields=fields, include=include or None,
+                    centers=centers.checksum if include else None)
+    version, body, _ = RESULT_CACHE.get(db, key)
+    if body is None:
+        result = db.get_products_by_department(department_id, page, page_size, sort, order, fields)
+        body = response_body(product_list_response(result, fields, centers))
+        RESULT_CACHE.put(db, version, key, body, result["total_count"])
 
-class DepartmentDetail(Department):
-    products: List[dict]
+    return Response(content=body, media_type="application/json")
 
-@router.get("/departments", response_model=List[Department])
+@router.get("/departments", response_model=List[DepartmentResponse])
 async def get_departments():
     """
-    Get list of all departments with product counts.
+    Get list of all departments with product counts, ordered by name.
     """
     try:
-        with db.get_connection() as conn:
-            # Get departments with product counts
-            query = """
-            SELECT 
-                d.id,
-                d.name,
-                COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            GROUP BY d.id, d.name
-            ORDER BY d.name
-            """
-            
-            cursor = conn.execute(query)
-            departments = []
-            for row in cursor.fetchall():
-                departments.append({
-                    "id": row[0],
-                    "name": row[1],
-                    "product_count": row[2]
-                })
-            
-            return departments
+        return [DepartmentResponse(**dept) for dept in db.get_departments()]
+
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
 
-@router.get("/departments/{department_id}", response_model=DepartmentDetail)
+@router.get("/departments/{department_id}", response_model=DepartmentDetailResponse)
 async def get_department(department_id: int):
     """
-    Get specific department details and its products.
+    Get specific department details, its product count and the first page of
+    its products by name; /departments/{department_id}/products pages through
+    the rest.
+
+    - **department_id**: The ID of the department
     """
     try:
-        with db.get_connection() as conn:
-            # Get department details
-            dept_query = """
-            SELECT 
-                d.id,
-                d.name,
-                COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            WHERE d.id = ?
-            GROUP BY d.id, d.name
-            """
-            
-            dept_result = conn.execute(dept_query, (department_id,)).fetchone()
-            if not dept_result:
-                raise HTTPException(status_code=404, detail="Department not found")
-                
-            # Get products for this department
-            products_query = """
-            SELECT 
-                p.id,
-                p.name,
-                p.category,
-                p.brand,
-                p.retail_price,
-                p.cost,
-                p.sku
-            FROM products p
-            WHERE p.department_id = ?
-            ORDER BY p.name
-            """
-            
-            cursor = conn.execute(products_query, (department_id,))
-            products = [dict(row) for row in cursor.fetchall()]
-            
-            return {
-                "id": dept_result[0],
-                "name": dept_result[1],
-                "product_count": dept_result[2],
-                "products": products
-            }
+        department = db.get_department(department_id)
+
+        if not department:
+            raise HTTPException(
+                status_code=404,
+                detail="Department not found"
+            )
+
+        result = db.get_products_by_department(department_id, page=1, page_size=PAGE_SIZE, sort=DEPARTMENT_SORT)
+
+        return DepartmentDetailResponse(
+            **department,
+            products=[ProductResponse(**product) for product in result["products"]]
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
 
-@router.get("/departments/{department_id}/products")
+@router.get("/departments/{department_id}/products", response_model=ProductListResponse)
 async def get_department_products(
     department_id: int,
-    page: int = 1,
-    page_size: int = 50
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=100, description="Number of products per page"),
+    sort: SortField = Query("name", description="Sort field: id, name, price, brand or margin"),
+    order: SortOrder = Query("asc", description="Sort direction: asc or desc"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION)
 ):
     """
-    Get products for a specific department with pagination.
+    Get products for a specific department with pagination and sorting.
+    Each sort walks one of the (department_id, <sort key>) listing indexes.
+
+    - **department_id**: The ID of the department
+    - **page**: Page number (default: 1)
+    - **page_size**: Number of products per page (default: 50, max: 100)
+    - **sort**: Sort field (default: name)
+    - **order**: Sort direction (default: asc)
+    - **fields**: Optional sparse fieldset; id is always included (default: all fields)
+    - **include**: Embed related data in each product: distribution_center (default: none)
+
+    Runs under the listing admission limit and gets a 503 with Retry-After
+    when it is saturated. The first pages of the default listing are served
+    pre-rendered; other pages are kept in the on-disk result cache until the
+    catalog changes.
     """
+    include = parse_include(include)
+    fields = include_fields(parse_fields(fields), include)
     try:
-        offset = (page - 1) * page_size
-        
-        with db.get_connection() as conn:
-            # Get total count
-            count_query = """
-            SELECT COUNT(*) 
-            FROM products p
-            WHERE p.department_id = ?
-            """
-            count_result = conn.execute(count_query, (department_id,)).fetchone()
-            total_count = count_result[0] if count_result else 0
-            
-            if total_count == 0:
-                return {"products": [], "total_count": 0, "page": page, "page_size": page_size}
-                
-            # Get paginated products
-            query = """
-            SELECT 
-                p.id,
-                p.name,
-                p.category,
-                p.brand,
-                p.retail_price,
-                p.cost,
-                p.sku
-            FROM products p
-            WHERE p.department_id = ?
-            ORDER BY p.name
-            LIMIT ? OFFSET ?
-            """
-            
-            cursor = conn.execute(query, (department_id, page_size, offset))
-            products = [dict(row) for row in cursor.fetchall()]
-            
-            return {
-                "products": products,
-                "total_count": total_count,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": (total_count + page_size - 1) // page_size
-            }
+        return await ADMISSION_LIMITS["listing"].run(
+            department_products_page, department_id, page, page_size, sort, order, fields, include
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
@@ -0,0 +1,70 @@
+import csv
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Distribution centers: a small reference table (one row per warehouse) loaded
+# from distribution_centers.csv at ingest. Product responses can embed the
+# center a product ships from; the API keeps every center in one in-memory
+# map per catalog version, so embedding is a dict lookup per product rather
+# than a query per product. Centers are not part of the product catalog
+# version, so cached responses that embed them are also keyed on a checksum of
+# the centers.
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS distribution_centers (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        latitude REAL,
+        longitude REAL
+    )
+"""
+
+def _coordinate(value: Optional[str]) -> Optional[float]:
+    return float(value) if value not in (None, "") else None
+
+def load_distribution_centers(conn, csv_path) -> Optional[int]:
+    """
+    Replace the distribution_centers table with the rows of the CSV, in the
+    caller's transaction. Returns the row count, or None if the CSV is missing.
+    """
+    if not Path(csv_path).exists():
+        return None
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [
+            (int(row["id"]), row["name"], _coordinate(row.get("latitude")), _coordinate(row.get("longitude")))
+            for row in csv.DictReader(f)
+        ]
+    conn.execute(CREATE_TABLE)
+    conn.execute("DELETE FROM distribution_centers")
+    conn.executemany("INSERT INTO distribution_centers (id, name, latitude, longitude) VALUES (?, ?, ?, ?)", rows)
+    return len(rows)
+
+class CenterMap(dict):
+    """Distribution centers by id; `checksum` changes whenever any of them does"""
+
+    def __init__(self, centers: Iterable[Dict[str, Any]] = ()):
+        super().__init__((center["id"], center) for center in centers)
+        self.checksum = hashlib.sha1(json.dumps(sorted(self.items())).encode()).hexdigest()[:16]
+
+class DistributionCenterMap:
+    """Every distribution center by id, reloaded whenever the database file changes"""
+
+    def __init__(self):
+        self.fingerprint = None
+        self.centers = CenterMap()
+        self._lock = threading.Lock()
+
+    def current(self, db) -> CenterMap:
+        fingerprint = (db.db_path, db.get_catalog_fingerprint())
+        if self.fingerprint != fingerprint:
+            with self._lock:
+                if self.fingerprint != fingerprint:
+                    self.centers = CenterMap(db.get_distribution_centers())
+                    self.fingerprint = fingerprint
+        return self.centers
+
+# Shared by the product and department routes
+DISTRIBUTION_CENTERS = DistributionCenterMap()
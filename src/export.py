@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, Iterator, List
+
+from starlette.concurrency import iterate_in_threadpool
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Rows per fetchmany() call; Parquet gets larger batches so each becomes a
+# reasonably sized row group
+BATCH_SIZES = {"ndjson": 1000, "csv": 1000, "parquet": 50000}
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow dependency"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def ndjson_chunks(columns: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode batches as newline-delimited JSON, one chunk per batch"""
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows).encode()
+
+def csv_chunks(columns: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode batches as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_chunks(columns: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode batches as a Parquet file, one row group per batch"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    types = {
+        "id": pa.int64(), "retail_price": pa.float64(), "cost": pa.float64(),
+        "distribution_center_id": pa.int64(), "department_id": pa.int64(),
+    }
+    schema = pa.schema([(name, types.get(name, pa.string())) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+ENCODERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
+
+async def stream_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Produce chunks in a worker thread, one at a time. The next batch is only
+    fetched and encoded once the previous chunk has been sent, so a slow
+    client holds back the cursor instead of filling memory.
+    """
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            if chunk:
+                yield chunk
+    finally:
+        chunks.close()
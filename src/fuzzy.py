@@ -0,0 +1,139 @@
+import re
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric words"""
+    return _WORD_RE.findall(text.lower()) if text else []
+
+def trigrams(word: str) -> set:
+    """Trigrams of a word padded like pg_trgm ("  w", " wo", ..., "rd ")"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two short words"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+class TrigramIndex:
+    """
+    Typo-tolerant search over product name, brand and category.
+
+    Two inverted indexes keep lookups proportional to the vocabulary rather
+    than to the catalog: trigram -> words, and word -> product ids. A query
+    word first collects candidate vocabulary words that share enough
+    trigrams with it, the candidates are re-ranked by edit distance, and only
+    the surviving words' postings are merged into product scores.
+    """
+
+    def __init__(self, min_trigram_similarity: float = 0.3, min_word_similarity: float = 0.6,
+                 max_candidates: int = 20):
+        self.min_trigram_similarity = min_trigram_similarity
+        self.min_word_similarity = min_word_similarity
+        self.max_candidates = max_candidates
+        self._words: List[str] = []
+        self._word_trigram_counts = array("H")
+        self._word_postings: List[array] = []
+        self._trigram_postings: Dict[str, array] = {}
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._words)
+
+    def build(self, documents: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]]):
+        """Index (product_id, name, brand, category) rows; call on a new index, not one being searched"""
+        word_ids: Dict[str, int] = {}
+        words: List[str] = []
+        postings: List[array] = []
+        for product_id, *fields in documents:
+            product_words = set()
+            for field in fields:
+                product_words.update(tokenize(field))
+            for word in product_words:
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = word_ids[word] = len(words)
+                    words.append(word)
+                    postings.append(array("q"))
+                postings[word_id].append(product_id)
+
+        trigram_postings = defaultdict(lambda: array("i"))
+        counts = array("H")
+        for word_id, word in enumerate(words):
+            grams = trigrams(word)
+            counts.append(len(grams))
+            for gram in grams:
+                trigram_postings[gram].append(word_id)
+
+        self._words = words
+        self._word_trigram_counts = counts
+        self._word_postings = postings
+        self._trigram_postings = dict(trigram_postings)
+
+    def similar_words(self, word: str) -> List[Tuple[str, float]]:
+        """Vocabulary words close to `word`, best first, as (word, similarity)"""
+        return [(self._words[word_id], similarity) for word_id, similarity in self._similar_word_ids(word)]
+
+    def _similar_word_ids(self, word: str) -> List[Tuple[int, float]]:
+        grams = trigrams(word)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for word_id in self._trigram_postings.get(gram, ()):
+                shared[word_id] += 1
+
+        # Candidate generation: trigram Jaccard similarity
+        candidates = []
+        for word_id, overlap in shared.items():
+            similarity = overlap / (len(grams) + self._word_trigram_counts[word_id] - overlap)
+            if similarity >= self.min_trigram_similarity:
+                candidates.append((similarity, word_id))
+        candidates.sort(reverse=True)
+
+        # Re-rank: normalised edit distance on the short list
+        ranked = []
+        for _, word_id in candidates[:self.max_candidates]:
+            candidate = self._words[word_id]
+            similarity = 1 - edit_distance(word, candidate) / max(len(word), len(candidate))
+            if similarity >= self.min_word_similarity:
+                ranked.append((word_id, similarity))
+        ranked.sort(key=lambda item: (-item[1], self._words[item[0]]))
+        return ranked
+
+    def search(self, query: str) -> List[int]:
+        """
+        Return product ids matching every word of the query approximately,
+        best match first (ties broken by id).
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for word in query_words:
+            # Lowest similarity first so closer words overwrite it; the dict
+            # operations run over whole posting lists without a Python loop
+            word_scores: Dict[int, float] = {}
+            for word_id, similarity in reversed(self._similar_word_ids(word)):
+                word_scores.update(dict.fromkeys(self._word_postings[word_id], similarity))
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {pid: scores[pid] + word_scores[pid] for pid in scores.keys() & word_scores.keys()}
+            if not scores:
+                return []
+
+        # Sort by id, then stably by descending score
+        ranked = sorted(scores)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return ranked
@@ -1,17 +1,45 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
-import uvicorn
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Literal, Optional
+import threading
+import time
 
-from models import ProductResponse, ProductListResponse, DepartmentResponse, DepartmentListResponse, ErrorResponse
-from database import DatabaseManager
+from models import ProductResponse, ProductListResponse, ErrorResponse, SuggestionListResponse, SortField, SortOrder
+from models import ChangeFeedResponse
+from models import embedded_product_model, sparse_product_model
+from database import API_DB, selected_fields
+from responses import FIELDS_DESCRIPTION, INCLUDE_DESCRIPTION, include_fields, parse_fields, parse_include
+from responses import product_list_response
+from suggest import LiveSuggestionIndex, SuggestionIndex
+from fuzzy import TrigramIndex
+from export import BATCH_SIZES, ENCODERS, EXPORT_FORMATS, parquet_available, stream_chunks
 from departments import router as departments_router
+from page_cache import PAGE_CACHE, PAGE_SIZE, products_key
+from admission import ADMISSION_LIMITS
+from catalog_snapshot import SnapshotLoader
+from result_cache import RESULT_CACHE, query_key, response_body
+from negative_cache import EMPTY_SEARCHES, PRODUCT_IDS
+from search_query import QuerySyntaxError
+from search_log import SEARCH_LOG
+from distribution_centers import DISTRIBUTION_CENTERS
+from product_listing import build_missing_listing
 
 # Initialize FastAPI app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Databases created before the listing read model get it here, once
+    if await run_in_threadpool(build_missing_listing, db.db_path):
+        print(f"Built the product_listing read model of {db.db_path}")
+    yield
+
 app = FastAPI(
     title="E-commerce Products API",
     description="API for accessing e-commerce product data with department information",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include routers
@@ -26,8 +54,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database manager
-db = DatabaseManager()
+# Database manager, shared with the departments router
+db = API_DB
+
+# Autocomplete index, synced with the catalog in the background whenever the
+# database file changes
+suggestion_index = LiveSuggestionIndex()
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Return the autocomplete index; the previous one while catalog changes are applied"""
+    return suggestion_index.current(db)
+
+# Typo-tolerant search index, rebuilt whenever the database file changes.
+# Fuzzy searches run on the threadpool, so a rebuild fills a new index and
+# publishes it with one assignment; searches keep the index they started with.
+fuzzy_index = TrigramIndex()
+fuzzy_index_lock = threading.Lock()
+
+def get_fuzzy_index() -> TrigramIndex:
+    """Return the fuzzy search index, rebuilding it if the catalog changed"""
+    global fuzzy_index
+    fingerprint = db.get_catalog_fingerprint()
+    if fuzzy_index.fingerprint != fingerprint:
+        with fuzzy_index_lock:
+            if fuzzy_index.fingerprint != fingerprint:
+                index = TrigramIndex()
+                index.build(db.get_fuzzy_documents())
+                index.fingerprint = fingerprint
+                fuzzy_index = index
+    return fuzzy_index
+
+# Memory-mapped catalog snapshot (see catalog_snapshot), used for lookups by id
+# while it matches the database
+catalog_snapshot = SnapshotLoader()
+
+def fuzzy_search_products(search_term: str, page: int, page_size: int, fields=None):
+    """Rank products with the trigram index, then fetch only the requested page"""
+    product_ids = get_fuzzy_index().search(search_term)
+    offset = (page - 1) * page_size
+    return {
+        "products": db.get_products_by_ids(product_ids[offset:offset + page_size], fields),
+        "total_count": len(product_ids),
+        "page": page,
+        "page_size": page_size,
+        "search_term": search_term
+    }
+
+# Handler bodies past parameter parsing. Each runs on the threadpool (under an
+# admission limit where the endpoint has one), so cache lookups, catalog
+# fingerprint checks and database reads never block the event loop.
+
+def products_page(page: int, page_size: int, search: Optional[str], sort: str, order: str,
+                  fields, include, started: float):
+    """Body of GET /api/products"""
+    if (not search and fields is None and not include and sort == "id" and order == "asc"
+            and page_size == PAGE_SIZE and page <= PAGE_CACHE.pages):
+        body = PAGE_CACHE.lookup(db, products_key(page))
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    centers = DISTRIBUTION_CENTERS.current(db) if include else None
+    if not search:
+        result = db.get_all_products(page, page_size, sort, order, fields)
+        return product_list_response(result, fields, centers)
+
+    fingerprint, empty = EMPTY_SEARCHES.lookup(db, ("plain", search))
+    if empty is not None:
+        SEARCH_LOG.record(db, "/api/products", search, page, started, result_count=0)
+        return product_list_response(dict(empty, page=page, page_size=page_size), fields, centers)
+
+    key = query_key("products", search=search, page=page, page_size=page_size,
+                    sort=sort, order=order, fields=fields, include=include or None,
+                    centers=centers.checksum if include else None)
+    version, body, total_count = RESULT_CACHE.get(db, key)
+    if body is None:
+        result = db.search_products(search, page, page_size, sort, order, fields)
+        EMPTY_SEARCHES.add(fingerprint, ("plain", search), result)
+        body = response_body(product_list_response(result, fields, centers))
+        total_count = result["total_count"]
+        RESULT_CACHE.put(db, version, key, body, total_count)
+    SEARCH_LOG.record(db, "/api/products", search, page, started, result_count=total_count)
+    return Response(content=body, media_type="application/json")
+
+def search_page(search: str, page: int, page_size: int, fuzzy: bool, fields, include, started: float):
+    """Body of GET /api/products/search"""
+    centers = DISTRIBUTION_CENTERS.current(db) if include else None
+    search_key = ("fuzzy" if fuzzy else "plain", search)
+    fingerprint, empty = EMPTY_SEARCHES.lookup(db, search_key)
+    if empty is not None:
+        SEARCH_LOG.record(db, "/api/products/search", search, page, started, result_count=0)
+        return product_list_response(dict(empty, page=page, page_size=page_size), fields, centers)
+
+    key = query_key("search", search=search, page=page, page_size=page_size, fuzzy=fuzzy,
+                    fields=fields, include=include or None, centers=centers.checksum if include else None)
+    version, body, total_count = RESULT_CACHE.get(db, key)
+    if body is None:
+        if fuzzy:
+            result = fuzzy_search_products(search, page, page_size, fields)
+        else:
+            result = db.search_products(search, page, page_size, fields=fields)
+        EMPTY_SEARCHES.add(fingerprint, search_key, result)
+        body = response_body(product_list_response(result, fields, centers))
+        total_count = result["total_count"]
+        RESULT_CACHE.put(db, version, key, body, total_count)
+
+    SEARCH_LOG.record(db, "/api/products/search", search, page, started, result_count=total_count)
+    return Response(content=body, media_type="application/json")
+
+def product_by_id(product_id: int, fields, include):
+    """Body of GET /api/products/{product_id}"""
+    if not PRODUCT_IDS.might_contain(db, product_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product with ID {product_id} not found"
+        )
+
+    snapshot = catalog_snapshot.current(db)
+    if snapshot is not None and fields is None and not include:
+        body = snapshot.get_json(product_id)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    if snapshot is not None and (fields is not None or include):
+        product = snapshot.get(product_id, fields)
+    else:
+        product = db.get_product_by_id(product_id, fields)
+
+    if not product:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product with ID {product_id} not found"
+        )
+
+    if include:
+        centers = DISTRIBUTION_CENTERS.current(db)
+        body = embedded_product_model(fields)(
+            **product, distribution_center=centers.get(product["distribution_center_id"])
+        )
+        return Response(content=body.model_dump_json(), media_type="application/json")
+
+    if fields is not None:
+        body = sparse_product_model(fields)(**product)
+        return Response(content=body.model_dump_json(), media_type="application/json")
+
+    return ProductResponse(**product)
 
 @app.get("/")
 async def root():
@@ -40,7 +210,14 @@ async def root():
             "GET /api/products": "List all products with pagination and department info",
             "GET /api/products/{id}": "Get a specific product by ID with department info",
             "GET /api/products/search": "Search products by name, category, brand, or department",
-            "GET /api/departments": "List all departments",
+            "GET /api/products/suggest": "Autocomplete product names, brands, categories and departments",
+            "GET /api/products/export": "Stream the full catalog as NDJSON, CSV or Parquet",
+            "GET /api/changes": "Products changed since a catalog version, for incremental sync",
+            "GET /api/stats/queries": "Execution counts and timings per named SQL statement and admission counters",
+            "GET /api/stats/searches/top": "Most frequent search queries, optionally only zero-result ones",
+            "GET /api/stats/searches/slow": "Slowest individual searches",
+            "GET /api/departments": "List all departments with product counts",
+            "GET /api/departments/{id}": "Get a department with its products",
             "GET /api/departments/{id}/products": "Get products by department ID"
         }
     }
@@ -49,7 +226,11 @@ async def root():
 async def get_products(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Number of products per page"),
-    search: Optional[str] = Query(None, description="Search term for products")
+    search: Optional[str] = Query(None, description="Search query, e.g. brand:nike price:<50"),
+    sort: SortField = Query("id", description="Sort field: id, name, price, brand or margin"),
+    order: SortOrder = Query("asc", description="Sort direction: asc or desc"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION)
 ):
     """
     Get all products with optional pagination and search.
@@ -57,25 +238,35 @@ async def get_products(
     
     - **page**: Page number (default: 1)
     - **page_size**: Number of products per page (default: 50, max: 100)
-    - **search**: Optional search term to filter products by name, category, brand, or department
+    - **search**: Optional search query to filter products by name, category, brand, or department;
+      supports phrases, field clauses (brand:nike, price:<50) and AND/OR/NOT
+    - **sort**: Sort field (default: id)
+    - **order**: Sort direction (default: asc)
+    - **fields**: Optional sparse fieldset; id is always included (default: all fields)
+    - **include**: Embed related data in each product: distribution_center (default: none)
+
+    Runs under the search or listing admission limit and gets a 503 with
+    Retry-After when it is saturated. The first pages of the default listing
+    are served pre-rendered. Search results are kept in the
+    on-disk result cache until the catalog changes, and terms that match
+    nothing are answered from memory. Searches are logged for the search
+    analytics endpoints.
     """
+    started = time.perf_counter()
+    include = parse_include(include)
+    fields = include_fields(parse_fields(fields), include)
     try:
-        if search:
-            result = db.search_products(search, page, page_size)
-        else:
-            result = db.get_all_products(page, page_size)
-        
-        # Convert to ProductResponse objects
-        products = [ProductResponse(**product) for product in result["products"]]
-        
-        return ProductListResponse(
-            products=products,
-            total_count=result["total_count"],
-            page=result["page"],
-            page_size=result["page_size"],
-            search_term=result.get("search_term")
+        return await ADMISSION_LIMITS["search" if search else "listing"].run(
+            products_page, page, page_size, search, sort, order, fields, include, started
         )
     
+    except HTTPException:
+        raise
+    except QuerySyntaxError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search query: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -84,31 +275,69 @@ async def get_products(
 
 @app.get("/api/products/search", response_model=ProductListResponse)
 async def search_products(
-    search: str = Query(..., description="Search term"),
+    search: str = Query(..., description="Search query, e.g. brand:nike price:<50"),
     page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(50, ge=1, le=100, description="Number of products per page")
+    page_size: int = Query(50, ge=1, le=100, description="Number of products per page"),
+    fuzzy: bool = Query(False, description="Tolerate typos in name, brand and category"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION)
 ):
     """
     Search products by name, category, brand, or department.
     Now includes department information after Milestone 4 refactoring.
     
-    - **search**: Search term (required)
+    - **search**: Search query (required); words must all match, "quoted phrases" match as a whole,
+      field clauses (name:, category:, brand:, department:, id:, price:, margin:, department_id:)
+      take text or n, <n, <=n, >n, >=n, a..b, and clauses combine with AND, OR, NOT, - and ( )
     - **page**: Page number (default: 1)
     - **page_size**: Number of products per page (default: 50, max: 100)
+    - **fuzzy**: Match the whole input approximately via the trigram index, best match first (default: false)
+    - **fields**: Optional sparse fieldset; id is always included (default: all fields)
+    - **include**: Embed related data in each product: distribution_center (default: none)
+
+    Runs under the search admission limit; returns 503 with Retry-After when it is saturated.
+    Results are kept in the on-disk result cache until the catalog changes,
+    and terms that match nothing are answered from memory. Searches are
+    logged for the search analytics endpoints.
     """
+    started = time.perf_counter()
+    include = parse_include(include)
+    fields = include_fields(parse_fields(fields), include)
     try:
-        result = db.search_products(search, page, page_size)
-        
-        # Convert to ProductResponse objects
-        products = [ProductResponse(**product) for product in result["products"]]
-        
-        return ProductListResponse(
-            products=products,
-            total_count=result["total_count"],
-            page=result["page"],
-            page_size=result["page_size"],
-            search_term=result.get("search_term")
+        return await ADMISSION_LIMITS["search"].run(
+            search_page, search, page, page_size, fuzzy, fields, include, started
+        )
+    
+    except HTTPException:
+        raise
+    except QuerySyntaxError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search query: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
+
+@app.get("/api/products/suggest", response_model=SuggestionListResponse)
+async def suggest_products(
+    q: str = Query(..., min_length=1, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Maximum number of suggestions")
+):
+    """
+    Autocomplete search terms from an in-memory prefix index.
+    Completions are ranked by how many products share the term.
+    
+    - **q**: Prefix typed so far (required)
+    - **limit**: Maximum number of suggestions (default: 10, max: 20)
+    """
+    try:
+        index = await run_in_threadpool(get_suggestion_index)
+        suggestions = index.suggest(q, limit)
+        
+        return SuggestionListResponse(query=q, suggestions=suggestions)
     
     except Exception as e:
         raise HTTPException(
@@ -116,24 +345,59 @@ async def search_products(
             detail=f"Internal server error: {str(e)}"
         )
 
+@app.get("/api/products/export")
+async def export_products(
+    format: Literal["ndjson", "csv", "parquet"] = Query("ndjson", description="Output format: ndjson, csv or parquet"),
+    department_id: Optional[int] = Query(None, description="Only export this department"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Stream every product in id order from a single database cursor.
+    Memory use stays constant regardless of catalog size.
+    
+    - **format**: Output format (default: ndjson)
+    - **department_id**: Optional department filter
+    - **fields**: Optional sparse fieldset; id is always included (default: all fields)
+    """
+    fields = parse_fields(fields)
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=501,
+            detail="Parquet export requires the pyarrow package"
+        )
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    batches = db.stream_products(department_id, fields, BATCH_SIZES[format])
+    chunks = ENCODERS[format](selected_fields(fields), batches)
+    
+    return StreamingResponse(
+        stream_chunks(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{extension}"'}
+    )
+
 @app.get("/api/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int):
+async def get_product(
+    product_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION)
+):
     """
     Get a specific product by ID with department information.
     Now includes department information after Milestone 4 refactoring.
     
     - **product_id**: The ID of the product to retrieve
+    - **fields**: Optional sparse fieldset; id is always included (default: all fields)
+    - **include**: Embed related data: distribution_center (default: none)
+
+    Served from the memory-mapped catalog snapshot when one matches the database.
+    Ids the product id filter rules out get a 404 without a query.
     """
+    include = parse_include(include)
+    fields = include_fields(parse_fields(fields), include)
     try:
-        product = db.get_product_by_id(product_id)
-        
-        if not product:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Product with ID {product_id} not found"
-            )
-        
-        return ProductResponse(**product)
+        # Lookups by id are cheap and not admission limited
+        return await run_in_threadpool(product_by_id, product_id, fields, include)
     
     except HTTPException:
         raise
@@ -148,19 +412,22 @@ async def get_product(product_id: int):
             detail=f"Internal server error: {str(e)}"
         )
 
-@app.get("/api/departments", response_model=DepartmentListResponse)
-async def get_departments():
+@app.get("/api/changes", response_model=ChangeFeedResponse)
+async def get_changes(
+    since: int = Query(0, ge=0, description="Catalog version the client has already applied"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes per batch")
+):
     """
-    Get all departments.
-    New endpoint added after Milestone 4 refactoring.
+    Products inserted, updated or deleted after a catalog version, oldest
+    change first. Each product appears once, with its latest change and
+    current state. Mirrors start from since=0 and pass the returned version
+    back as `since` until has_more is false.
+    
+    - **since**: Catalog version the client has already applied (default: 0)
+    - **limit**: Maximum number of changes per batch (default: 500, max: 1000)
     """
     try:
-        departments = db.get_departments()
-        
-        return DepartmentListResponse(
-            departments=[DepartmentResponse(**dept) for dept in departments],
-            total_count=len(departments)
-        )
+        return ChangeFeedResponse(**db.get_changes(since, limit))
     
     except Exception as e:
         raise HTTPException(
@@ -168,32 +435,50 @@ async def get_departments():
             detail=f"Internal server error: {str(e)}"
         )
 
-@app.get("/api/departments/{department_id}/products", response_model=ProductListResponse)
-async def get_products_by_department(
-    department_id: int,
-    page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(50, ge=1, le=100, description="Number of products per page")
+@app.get("/api/stats/queries")
+async def get_query_stats():
+    """
+    Execution counts and timings per named SQL statement since startup,
+    slowest total first. Statement names are the keys of queries.QUERIES.
+    Admission counters per endpoint group are listed alongside.
+    """
+    return {
+        "statements": db.get_query_stats(),
+        "admission": {name: limit.snapshot() for name, limit in ADMISSION_LIMITS.items()}
+    }
+
+@app.get("/api/stats/searches/top")
+async def get_top_searches(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of queries"),
+    zero_results: bool = Query(False, description="Only count searches that found nothing")
 ):
     """
-    Get products by department ID with pagination.
-    New endpoint added after Milestone 4 refactoring.
+    Most frequent search queries from the search log, with their latency
+    and how often they found nothing.
     
-    - **department_id**: The ID of the department
-    - **page**: Page number (default: 1)
-    - **page_size**: Number of products per page (default: 50, max: 100)
+    - **limit**: Maximum number of queries (default: 20, max: 100)
+    - **zero_results**: Only count searches that found nothing (default: false)
     """
     try:
-        result = db.get_products_by_department(department_id, page, page_size)
-        
-        # Convert to ProductResponse objects
-        products = [ProductResponse(**product) for product in result["products"]]
-        
-        return ProductListResponse(
-            products=products,
-            total_count=result["total_count"],
-            page=result["page"],
-            page_size=result["page_size"]
+        return {"queries": SEARCH_LOG.top_queries(db, limit, zero_results)}
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
+
+@app.get("/api/stats/searches/slow")
+async def get_slow_searches(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of searches")
+):
+    """
+    Slowest individual searches from the search log, slowest first.
+    
+    - **limit**: Maximum number of searches (default: 20, max: 100)
+    """
+    try:
+        return {"searches": SEARCH_LOG.slow_queries(db, limit)}
     
     except Exception as e:
         raise HTTPException(
@@ -202,6 +487,8 @@ async def get_products_by_department(
         )
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
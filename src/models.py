@@ -1,6 +1,11 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, create_model
+from typing import Optional, List, Literal, Tuple
 from datetime import datetime
+from functools import lru_cache
+
+# Sort options for product listings (mapped to indexed SQL in database.SORT_COLUMNS)
+SortField = Literal["id", "name", "price", "brand", "margin"]
+SortOrder = Literal["asc", "desc"]
 
 class DepartmentBase(BaseModel):
     id: int
@@ -20,6 +25,12 @@ class ProductBase(BaseModel):
     department_id: Optional[int] = None
     department_name: Optional[str] = None
 
+class DistributionCenterResponse(BaseModel):
+    id: int
+    name: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
 class ProductResponse(ProductBase):
     class Config:
         from_attributes = True
@@ -29,15 +40,85 @@ class ProductListResponse(BaseModel):
     total_count: int
     page: Optional[int] = None
     page_size: Optional[int] = None
+    total_pages: Optional[int] = None
     search_term: Optional[str] = None
 
+@lru_cache(maxsize=128)
+def sparse_product_model(fields: Tuple[str, ...]):
+    """Product model restricted to a sparse fieldset (id is always included)"""
+    definitions = {
+        name: (info.annotation, info.default if not info.is_required() else ...)
+        for name, info in ProductBase.model_fields.items()
+        if name == "id" or name in fields
+    }
+    return create_model(f"ProductFields_{'_'.join(definitions)}", **definitions)
+
+@lru_cache(maxsize=128)
+def sparse_product_list_model(fields: Tuple[str, ...]):
+    """ProductListResponse whose products carry only a sparse fieldset"""
+    return create_model(
+        f"ProductListFields_{'_'.join(fields)}",
+        products=(List[sparse_product_model(fields)], ...),
+        total_count=(int, ...),
+        page=(Optional[int], None),
+        page_size=(Optional[int], None),
+        total_pages=(Optional[int], None),
+        search_term=(Optional[str], None)
+    )
+
+@lru_cache(maxsize=128)
+def embedded_product_model(fields: Optional[Tuple[str, ...]]):
+    """Product model (every field, or a sparse fieldset) with its distribution center embedded"""
+    base = ProductBase if fields is None else sparse_product_model(fields)
+    return create_model(
+        f"{base.__name__}_DistributionCenter",
+        __base__=base,
+        distribution_center=(Optional[DistributionCenterResponse], None)
+    )
+
+@lru_cache(maxsize=128)
+def embedded_product_list_model(fields: Optional[Tuple[str, ...]]):
+    """Product list response whose products embed their distribution center"""
+    return create_model(
+        f"ProductList_{'_'.join(fields or ('all',))}_DistributionCenter",
+        products=(List[embedded_product_model(fields)], ...),
+        total_count=(int, ...),
+        page=(Optional[int], None),
+        page_size=(Optional[int], None),
+        total_pages=(Optional[int], None),
+        search_term=(Optional[str], None)
+    )
+
 class DepartmentResponse(DepartmentBase):
+    product_count: int = 0
+
     class Config:
         from_attributes = True
 
-class DepartmentListResponse(BaseModel):
-    departments: List[DepartmentResponse]
-    total_count: int
+class DepartmentDetailResponse(DepartmentResponse):
+    products: List[ProductResponse]
+
+class Suggestion(BaseModel):
+    text: str
+    kind: str  # product, brand, category or department
+    weight: int
+
+class SuggestionListResponse(BaseModel):
+    query: str
+    suggestions: List[Suggestion]
+
+class ProductChange(BaseModel):
+    version: int
+    op: Literal["insert", "update", "delete"]
+    product_id: int
+    product: Optional[ProductResponse] = None  # current state; None for deletes
+
+class ChangeFeedResponse(BaseModel):
+    since: int
+    version: int  # pass as `since` to fetch the next batch
+    latest_version: int
+    has_more: bool
+    changes: List[ProductChange]
 
 class ErrorResponse(BaseModel):
     error: str
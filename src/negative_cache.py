@@ -0,0 +1,173 @@
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from database import ReadModelMissing
+
+# Answers for requests that find nothing. Crawlers probe ids that do not exist
+# and repeat searches that match no product; both are settled here without a
+# connection or a query.
+FALSE_POSITIVE_RATE = 0.01
+HEADROOM = 2  # ids a rebuilt filter is sized for, per id in the catalog
+MIN_CAPACITY = 1024
+MAX_EMPTY_SEARCHES = 10000
+
+_MASK = 2 ** 64 - 1
+_GOLDEN = 0x9E3779B97F4A7C15  # Fibonacci hashing multiplier
+
+class BloomFilter:
+    """
+    Set of integers that can answer "certainly absent" or "maybe present".
+    Sized for `capacity` keys at `error_rate` false positives; it never gives
+    a false negative, however full it gets.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int):
+        # Double hashing: two halves of one 64-bit mix give every probe
+        mixed = (key * _GOLDEN) & _MASK
+        first, step = mixed >> 32, (mixed & 0xFFFFFFFF) | 1
+        return [(first + probe * step) % self.size for probe in range(self.hashes)]
+
+    def add(self, key: int):
+        bits = self._bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[int]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: int) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class ProductIdFilter:
+    """
+    Bloom filter of the product ids in the catalog. Whenever the database file
+    changes it takes in the ids inserted since its catalog version from the
+    change feed; a swapped-in file or a filter past its capacity is rebuilt on
+    a background thread. While there is no filter every id may exist, so
+    requests fall through to the database.
+    """
+
+    def __init__(self, error_rate: float = FALSE_POSITIVE_RATE):
+        self.error_rate = error_rate
+        self.fingerprint = None
+        self._bloom: Optional[BloomFilter] = None
+        self._source = None  # file the filter was built from
+        self._version = 0
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def might_contain(self, db, product_id: int) -> bool:
+        """False only if no product has this id"""
+        fingerprint = (db.db_path, db.get_catalog_fingerprint())
+        if self.fingerprint != fingerprint:
+            self._sync(db)
+            self.fingerprint = fingerprint
+        bloom = self._bloom
+        return bloom is None or product_id in bloom
+
+    def _sync(self, db):
+        with self._lock:
+            if self._bloom is None or self._source != os.path.realpath(db.db_path):
+                self._bloom = None
+                self._rebuild_in_background(db)
+                return
+            version, product_ids = db.get_present_product_ids(self._version)
+            if version < self._version:
+                # Not the catalog the filter was built from
+                self._bloom = None
+                self._rebuild_in_background(db)
+                return
+            self._bloom.update(product_ids)
+            self._version = version
+            if self._bloom.count > self._bloom.capacity:
+                # Still exact about absence, only less selective; keep serving it meanwhile
+                self._rebuild_in_background(db)
+
+    def _rebuild_in_background(self, db):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._rebuild, args=(db,), daemon=True)
+        self._worker.start()
+
+    def _rebuild(self, db):
+        try:
+            source = os.path.realpath(db.db_path)
+            version = db.get_catalog_version()
+            product_ids = array("q")
+            for batch in db.stream_products(fields=("id",), batch_size=5000):
+                product_ids.extend(row[0] for row in batch)
+        except (sqlite3.Error, ReadModelMissing):
+            # Busy, gone or not yet built; the filter stays off and the next
+            # catalog change schedules another attempt
+            return
+        bloom = BloomFilter(max(MIN_CAPACITY, HEADROOM * len(product_ids)), self.error_rate)
+        bloom.update(product_ids)
+        with self._lock:
+            self._bloom, self._source, self._version = bloom, source, version
+            # Catch up on writes made during the build at the next lookup
+            self.fingerprint = None
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running background rebuild finishes"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+class EmptySearchCache:
+    """
+    Bounded LRU of searches known to match no product, with the empty result
+    each returned. Dropped whenever the database file changes.
+    """
+
+    def __init__(self, max_entries: int = MAX_EMPTY_SEARCHES):
+        self.max_entries = max_entries
+        self.fingerprint = None
+        self._results: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def lookup(self, db, key: tuple) -> Tuple[tuple, Optional[dict]]:
+        """(database fingerprint, stored empty result or None); pass the fingerprint back to add()"""
+        fingerprint = (db.db_path, db.get_catalog_fingerprint())
+        with self._lock:
+            if self.fingerprint != fingerprint:
+                self._results.clear()
+                self.fingerprint = fingerprint
+                return fingerprint, None
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return fingerprint, result
+
+    def add(self, fingerprint: tuple, key: tuple, result: dict):
+        """Remember a search result if it matched nothing and the database is unchanged since `fingerprint`"""
+        if result["total_count"]:
+            return
+        with self._lock:
+            if self.fingerprint != fingerprint:
+                return
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+# Shared by the product lookup and search handlers
+PRODUCT_IDS = ProductIdFilter()
+EMPTY_SEARCHES = EmptySearchCache()
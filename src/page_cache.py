@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+# The first pages of the default listings, pre-rendered as response bytes.
+# Only the default shape is stored: all fields, default page size and sort.
+# They live in a SQLite file beside the database, tagged with the catalog
+# version they were rendered from: a write to the catalog file would change
+# its fingerprint and invalidate every cache keyed on it.
+PRECOMPUTED_PAGES = 5
+PAGE_SIZE = 50
+DEPARTMENT_SORT = "name"  # default sort of /api/departments/{id}/products
+
+def products_key(page: int) -> str:
+    return f"products:{page}"
+
+def department_key(department_id: int, page: int) -> str:
+    return f"department:{department_id}:{page}"
+
+def pages_path(db_path) -> Path:
+    """Stored pages of a database; follows the live symlink so each version has its own"""
+    return Path(os.path.realpath(db_path)).with_suffix(".pages")
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS listing_pages (
+            key TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            body BLOB NOT NULL
+        )
+    """)
+    return conn
+
+def load_pages(db_path, version: int) -> Dict[str, bytes]:
+    """Stored pages rendered from catalog version `version` (none if they are older)"""
+    path = pages_path(db_path)
+    if not path.exists():
+        return {}
+    conn = _connect(path)
+    try:
+        return {key: bytes(body) for key, body in conn.execute(
+            "SELECT key, body FROM listing_pages WHERE version = ?", (version,)
+        )}
+    finally:
+        conn.close()
+
+def render_listing_pages(db, pages: int = PRECOMPUTED_PAGES) -> Dict[str, bytes]:
+    """
+    Render the first `pages` pages of the global and per-department listings.
+    A page whose rows do not fit the response model is left out; requests
+    for it fail the same way they would without the store.
+    """
+    from pydantic import ValidationError
+    from responses import product_list_response
+
+    rendered = {}
+
+    def render(key, result):
+        try:
+            rendered[key] = product_list_response(result, None).model_dump_json().encode()
+        except ValidationError:
+            pass
+
+    for page in range(1, pages + 1):
+        result = db.get_all_products(page, PAGE_SIZE)
+        render(products_key(page), result)
+        if page >= result["total_pages"]:
+            break
+    try:
+        departments = db.get_departments()
+    except sqlite3.OperationalError:
+        departments = []  # ingested but not migrated yet
+    for department in departments:
+        for page in range(1, pages + 1):
+            result = db.get_products_by_department(department["id"], page, PAGE_SIZE, DEPARTMENT_SORT)
+            render(department_key(department["id"], page), result)
+            if page >= result["total_pages"]:
+                break
+    return rendered
+
+def precompute_listing_pages(db_path, pages: int = PRECOMPUTED_PAGES) -> int:
+    """
+    Render the hot listing pages and replace the stored set. The catalog is
+    only read: if its version moved on while rendering, the pages may mix
+    two versions and nothing is stored. Returns the number of pages stored.
+    """
+    from database import DatabaseManager
+    from queries import QueryStats
+
+    db = DatabaseManager(str(db_path), stats=QueryStats())
+    try:
+        version = db.get_catalog_version()
+        rendered = render_listing_pages(db, pages)
+        if db.get_catalog_version() != version:
+            return 0
+    finally:
+        db.close_connections()
+
+    conn = _connect(pages_path(db_path))
+    try:
+        with conn:
+            conn.execute("DELETE FROM listing_pages")
+            conn.executemany(
+                "INSERT INTO listing_pages (key, version, body) VALUES (?, ?, ?)",
+                [(key, version, body) for key, body in rendered.items()]
+            )
+        return len(rendered)
+    finally:
+        conn.close()
+
+class PageCache:
+    """
+    In-process copy of the stored listing pages, reloaded whenever the database
+    file changes. If none were rendered from the current catalog version, they
+    are re-rendered on a background thread; until they land, requests fall
+    through to the database.
+    """
+
+    def __init__(self, pages: int = PRECOMPUTED_PAGES):
+        self.pages = pages
+        self._pages: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._pages)
+
+    def lookup(self, db, key: str) -> Optional[bytes]:
+        """Stored response body for `key`, or None if it must be rendered per request"""
+        fingerprint = (db.db_path, db.get_catalog_fingerprint())
+        if self.fingerprint != fingerprint:
+            if not self.load(db):
+                self.refresh_in_background(db.db_path)
+            self.fingerprint = fingerprint
+        return self._pages.get(key)
+
+    def load(self, db) -> bool:
+        """Load the pages of the current catalog version. Returns False if there are none and they need rendering."""
+        self._pages = load_pages(db.db_path, db.get_catalog_version())
+        return bool(self._pages)
+
+    def refresh_in_background(self, db_path):
+        """Re-render the stored pages on a daemon thread, one job at a time"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._refresh, args=(db_path,), daemon=True)
+            self._worker.start()
+
+    def _refresh(self, db_path):
+        try:
+            if precompute_listing_pages(db_path, self.pages):
+                self.fingerprint = None  # the next lookup loads the new pages
+        except sqlite3.Error:
+            # Busy or gone; the next catalog change schedules another attempt
+            pass
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running background render finishes"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+# Shared by the product and department handlers
+PAGE_CACHE = PageCache()
@@ -0,0 +1,200 @@
+import csv
+import io
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Rejection reasons reported by validate_chunk, in the order they are checked
+REJECT_REASONS = (
+    "missing_name",
+    "invalid_price",
+    "invalid_cost",
+    "cost_above_price",
+    "unknown_department",
+    "unknown_distribution_center",
+)
+
+# SQLite types of the product feed columns. The products table is created from
+# the CSV header with these, so its schema does not depend on how pandas typed
+# whichever chunk came back first; other columns are stored as TEXT.
+COLUMN_TYPES = {
+    "id": "INTEGER",
+    "cost": "REAL",
+    "category": "TEXT",
+    "name": "TEXT",
+    "brand": "TEXT",
+    "retail_price": "REAL",
+    "department": "TEXT",
+    "sku": "TEXT",
+    "distribution_center_id": "INTEGER",
+}
+
+def read_header(csv_path) -> List[str]:
+    """Column names from the first line of a CSV file"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+def split_on_lines(csv_path, n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file (after its header) into roughly equal byte ranges that
+    start and end on line boundaries. Assumes no quoted field spans lines,
+    which holds for the product feeds.
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+        step = max(1, (size - data_start) // max(1, n_chunks))
+        boundaries = [data_start]
+        while boundaries[-1] < size:
+            f.seek(min(size, boundaries[-1] + step))
+            f.readline()  # advance to the start of the next line
+            boundaries.append(min(size, f.tell()))
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def parse_and_validate_chunk(csv_path, start: int, end: int, header: List[str],
+                             departments: Optional[Set[str]] = None,
+                             distribution_centers: Optional[Set[int]] = None):
+    """
+    Parse one byte range of the CSV and validate it in vectorised passes.
+    Runs in a worker process; returns (valid rows as a DataFrame, rejected
+    counts). DataFrames pickle as whole column buffers, so handing them back
+    to the writer is cheap.
+    """
+    import pandas as pd
+
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=header)
+    return validate_chunk(df, departments, distribution_centers)
+
+def validate_chunk(df, departments: Optional[Set[str]] = None,
+                   distribution_centers: Optional[Set[int]] = None):
+    """Split a DataFrame into its valid rows and per-reason rejection counts"""
+    import pandas as pd
+
+    checks = {}
+    if "name" in df:
+        checks["missing_name"] = df["name"].isna() | (df["name"].astype(str).str.strip() == "")
+    if "retail_price" in df:
+        price = pd.to_numeric(df["retail_price"], errors="coerce")
+        checks["invalid_price"] = price.isna() | (price < 0)
+    if "cost" in df:
+        cost = pd.to_numeric(df["cost"], errors="coerce")
+        checks["invalid_cost"] = cost.notna() & (cost < 0) | (df["cost"].notna() & cost.isna())
+        if "retail_price" in df:
+            checks["cost_above_price"] = cost > price
+    if departments is not None and "department" in df:
+        checks["unknown_department"] = df["department"].notna() & ~df["department"].isin(departments)
+    if distribution_centers is not None and "distribution_center_id" in df:
+        dc = pd.to_numeric(df["distribution_center_id"], errors="coerce")
+        checks["unknown_distribution_center"] = df["distribution_center_id"].notna() & ~dc.isin(distribution_centers)
+
+    rejected = pd.Series(False, index=df.index)
+    counts: Dict[str, int] = {}
+    for reason in REJECT_REASONS:
+        if reason in checks:
+            # Count each row under the first reason it fails
+            mask = checks[reason].fillna(False).astype(bool) & ~rejected
+            counts[reason] = int(mask.sum())
+            rejected |= mask
+
+    return df[~rejected], counts
+
+def frame_rows(df):
+    """
+    Iterate a DataFrame as tuples of Python values (NaN -> None). Converting
+    column by column is much cheaper than converting row by row.
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        values = series.tolist()
+        missing = series.isna()
+        if missing.any():
+            values = [None if is_missing else value for value, is_missing in zip(values, missing.tolist())]
+        columns.append(values)
+    return zip(*columns)
+
+def create_products_table(conn, header: List[str]):
+    """Replace products with a table of the CSV's columns, typed by COLUMN_TYPES"""
+    columns = ", ".join(f'"{name}" {COLUMN_TYPES.get(name, "TEXT")}' for name in header)
+    conn.execute("DROP TABLE IF EXISTS products")
+    conn.execute(f"CREATE TABLE products ({columns})")
+
+def load_csv_parallel(csv_path, db_path, workers: Optional[int] = None,
+                      departments: Optional[Set[str]] = None,
+                      distribution_centers: Optional[Set[int]] = None,
+                      chunks_per_worker: int = 4):
+    """
+    Parse and validate a CSV in a process pool and write the valid rows to
+    products from this process only, in file order, in one transaction.
+    Returns (rows written, rejected counts by reason). Raises ValueError,
+    leaving products as it was, if no row is valid.
+    """
+    workers = workers or os.cpu_count() or 1
+    header = read_header(csv_path)
+    ranges = split_on_lines(csv_path, workers * chunks_per_worker)
+
+    written = 0
+    rejected = dict.fromkeys(REJECT_REASONS, 0)
+    conn = sqlite3.connect(db_path)
+    try:
+        # Explicit, so the table replacement is rolled back with a failed load
+        conn.execute("BEGIN IMMEDIATE")
+        create_products_table(conn, header)
+        quoted = ", ".join(f'"{name}"' for name in header)
+        insert_sql = f"INSERT INTO products ({quoted}) VALUES ({', '.join('?' for _ in header)})"
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of chunks in flight so parsed rows never
+            # pile up faster than the writer can drain them
+            pending = deque()
+            remaining = iter(ranges)
+            while True:
+                while len(pending) < workers * 2:
+                    next_range = next(remaining, None)
+                    if next_range is None:
+                        break
+                    pending.append(pool.submit(parse_and_validate_chunk, str(csv_path), *next_range,
+                                               header, departments, distribution_centers))
+                if not pending:
+                    break
+                valid, counts = pending.popleft().result()
+                for reason, count in counts.items():
+                    rejected[reason] += count
+                if valid.empty:
+                    continue
+                conn.executemany(insert_sql, frame_rows(valid))
+                written += len(valid)
+        if written == 0:
+            raise ValueError(f"No valid rows in {csv_path} ({sum(rejected.values())} rejected)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return written, rejected
+
+def known_departments(db_path) -> Optional[Set[str]]:
+    """Department names already in the database, or None if there is no departments table"""
+    if not Path(db_path).exists():
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM departments")}
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+def known_distribution_centers(csv_path) -> Optional[Set[int]]:
+    """Distribution center ids from distribution_centers.csv, or None if it is missing"""
+    if not Path(csv_path).exists():
+        return None
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {int(row["id"]) for row in csv.DictReader(f)}
@@ -0,0 +1,372 @@
+import os
+import sqlite3
+import uuid
+
+# Denormalised read model for product listings: exactly the served columns, in
+# response order, with the department name copied in so reads need no join.
+# database.PRODUCT_COLUMNS reads these columns by name. department_counts keeps
+# the number of listed products per department next to it.
+# product_changes records the latest change to each listed product under a
+# monotonically increasing catalog version, for the /api/changes feed.
+# catalog_generation holds one id per change log, so the versions of a database
+# rebuilt from scratch are not mistaken for those of the one it replaced.
+# product_text is a trigram full-text index over the searched text columns
+# (see search_query), kept without a copy of the text: its content table is
+# product_listing.
+LISTING_COLUMNS = {
+    "id": "INTEGER PRIMARY KEY",
+    "name": "TEXT",
+    "category": "TEXT",
+    "brand": "TEXT",
+    "retail_price": "REAL",
+    "cost": "REAL",
+    "department": "TEXT",
+    "sku": "TEXT",
+    "distribution_center_id": "INTEGER",
+    "department_id": "INTEGER",
+    "department_name": "TEXT",
+}
+
+# Same shapes as migrate_departments.SORT_INDEXES, on the read model
+LISTING_INDEXES = {
+    "idx_listing_name": "product_listing(name)",
+    "idx_listing_retail_price": "product_listing(retail_price)",
+    "idx_listing_brand": "product_listing(brand)",
+    "idx_listing_margin": "product_listing((retail_price - cost))",
+    "idx_listing_department_name": "product_listing(department_id, name)",
+    "idx_listing_department_retail_price": "product_listing(department_id, retail_price)",
+    "idx_listing_department_brand": "product_listing(department_id, brand)",
+    "idx_listing_department_margin": "product_listing(department_id, (retail_price - cost))",
+}
+
+LISTING_TRIGGERS = (
+    "product_listing_insert",
+    "product_listing_update",
+    "product_listing_delete",
+    "product_listing_department_insert",
+    "product_listing_department_update",
+    "product_listing_department_delete",
+    "department_counts_insert",
+    "department_counts_update",
+    "department_counts_delete",
+    "product_changes_insert",
+    "product_changes_update",
+    "product_changes_delete",
+    "product_text_insert",
+    "product_text_update",
+    "product_text_delete",
+)
+
+TEXT_INDEX_COLUMNS = ("name", "category", "brand", "department_name")
+
+CHANGE_OPS = ("insert", "update", "delete")
+
+def _table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _department_link(conn):
+    """
+    (products column, departments column) joining products to departments:
+    department_id after the migration, the legacy department name on a
+    freshly ingested table, None if there is nothing to join on.
+    """
+    product_columns = _table_columns(conn, "products")
+    if not _table_columns(conn, "departments"):
+        return None
+    if "department_id" in product_columns:
+        return ("department_id", "id")
+    if "department" in product_columns:
+        return ("department", "name")
+    return None
+
+def _source_query(conn, link):
+    """SELECT producing listing rows from products (and departments, if linked)"""
+    product_columns = _table_columns(conn, "products")
+    select = []
+    for name in LISTING_COLUMNS:
+        if name == "department_id":
+            select.append("d.id" if link else "NULL")
+        elif name == "department_name":
+            select.append("d.name" if link else "NULL")
+        else:
+            select.append(f"p.{name}" if name in product_columns else "NULL")
+    join = f"LEFT JOIN departments d ON d.{link[1]} = p.{link[0]}" if link else ""
+    return f"SELECT {', '.join(select)} FROM products p {join}"
+
+def _changed(old, new):
+    """SQL condition: two listing rows differ in any served column"""
+    return " OR ".join(f"{old}.{name} IS NOT {new}.{name}" for name in LISTING_COLUMNS if name != "id")
+
+def _record_change(product_id, op):
+    """Upsert the latest change of one product under the next catalog version"""
+    return (
+        "INSERT INTO product_changes (product_id, version, op) "
+        f"SELECT {product_id}, COALESCE(MAX(version), 0) + 1, '{op}' FROM product_changes WHERE true "
+        "ON CONFLICT (product_id) DO UPDATE SET version = excluded.version, op = excluded.op"
+    )
+
+def _record_bulk_changes(conn, had_changes):
+    """
+    Record the difference between the current product_listing and
+    product_listing_new as changes, numbered in id order after the current
+    catalog version. Without an earlier change log every listed product is
+    recorded as an insert, giving a complete baseline for version 0.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS product_changes (
+            product_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes(version)")
+    if had_changes and _table_columns(conn, "product_listing"):
+        diff = f"""
+            SELECT n.id AS product_id, CASE WHEN o.id IS NULL THEN 'insert' ELSE 'update' END AS op
+            FROM product_listing_new n
+            LEFT JOIN product_listing o ON o.id = n.id
+            WHERE o.id IS NULL OR {_changed("o", "n")}
+            UNION ALL
+            SELECT o.id, 'delete' FROM product_listing o
+            WHERE o.id NOT IN (SELECT id FROM product_listing_new)
+        """
+    else:
+        diff = "SELECT id AS product_id, 'insert' AS op FROM product_listing_new"
+    base = conn.execute("SELECT COALESCE(MAX(version), 0) FROM product_changes").fetchone()[0]
+    conn.execute("CREATE TABLE IF NOT EXISTS catalog_generation (generation TEXT NOT NULL)")
+    if base == 0 or conn.execute("SELECT 1 FROM catalog_generation").fetchone() is None:
+        # Versions start over from 1
+        conn.execute("DELETE FROM catalog_generation")
+        conn.execute("INSERT INTO catalog_generation (generation) VALUES (?)", (uuid.uuid4().hex,))
+    conn.execute(f"""
+        INSERT INTO product_changes (product_id, version, op)
+        SELECT product_id, ? + ROW_NUMBER() OVER (ORDER BY product_id), op FROM ({diff}) WHERE true
+        ON CONFLICT (product_id) DO UPDATE SET version = excluded.version, op = excluded.op
+    """, (base,))
+
+def text_index_supported(conn) -> bool:
+    """Whether this SQLite has FTS5 and its trigram tokenizer (3.34+)"""
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    return conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0] == 1
+
+def _create_text_index(conn):
+    """(Re)build product_text from product_listing"""
+    conn.execute("DROP TABLE IF EXISTS product_text")
+    if not text_index_supported(conn):
+        return
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE product_text USING fts5(
+            {", ".join(TEXT_INDEX_COLUMNS)},
+            content = 'product_listing', content_rowid = 'id', tokenize = 'trigram'
+        )
+    """)
+    conn.execute("INSERT INTO product_text (product_text) VALUES ('rebuild')")
+
+def drop_listing_triggers(conn):
+    """Stop maintaining the read model row by row, e.g. before a bulk rewrite of products"""
+    for trigger in LISTING_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+def _create_triggers(conn, source, link):
+    """
+    Keep the read models in step with single-row writes to products and
+    departments. Listing rows are written with DELETE, UPDATE and INSERT
+    rather than INSERT OR REPLACE, whose implicit deletes would bypass the
+    count and change triggers; an updated product is updated in place so the
+    change feed reports it as an update.
+    """
+    columns = ", ".join(LISTING_COLUMNS)
+    insert = f"INSERT INTO product_listing ({columns}) {source} WHERE p.rowid = NEW.rowid"
+    conn.execute(f"""
+        CREATE TRIGGER product_listing_insert AFTER INSERT ON products BEGIN
+            DELETE FROM product_listing WHERE id = NEW.id;
+            {insert};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER product_listing_update AFTER UPDATE ON products BEGIN
+            DELETE FROM product_listing WHERE id = OLD.id AND OLD.id IS NOT NEW.id;
+            UPDATE product_listing SET ({columns}) = ({source} WHERE p.rowid = NEW.rowid) WHERE id = NEW.id;
+            {insert} AND NOT EXISTS (SELECT 1 FROM product_listing WHERE id = NEW.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER product_listing_delete AFTER DELETE ON products BEGIN
+            DELETE FROM product_listing WHERE id = OLD.id;
+        END
+    """)
+
+    # Per-department counts follow the listing's department_id
+    increment = (
+        "INSERT INTO department_counts (department_id, product_count) "
+        "SELECT NEW.department_id, 1 WHERE NEW.department_id IS NOT NULL "
+        "ON CONFLICT (department_id) DO UPDATE SET product_count = product_count + 1"
+    )
+    decrement = "UPDATE department_counts SET product_count = product_count - 1 WHERE department_id = OLD.department_id"
+    conn.execute(f"""
+        CREATE TRIGGER department_counts_insert AFTER INSERT ON product_listing
+        WHEN NEW.department_id IS NOT NULL BEGIN
+            {increment};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER department_counts_delete AFTER DELETE ON product_listing
+        WHEN OLD.department_id IS NOT NULL BEGIN
+            {decrement};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER department_counts_update AFTER UPDATE OF department_id ON product_listing
+        WHEN OLD.department_id IS NOT NEW.department_id BEGIN
+            {decrement};
+            {increment};
+        END
+    """)
+
+    # Change feed: the latest operation per product, at the next catalog version
+    conn.execute(f"""
+        CREATE TRIGGER product_changes_insert AFTER INSERT ON product_listing BEGIN
+            {_record_change("NEW.id", "insert")};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER product_changes_update AFTER UPDATE ON product_listing
+        WHEN {_changed("OLD", "NEW")} BEGIN
+            {_record_change("NEW.id", "update")};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER product_changes_delete AFTER DELETE ON product_listing BEGIN
+            {_record_change("OLD.id", "delete")};
+        END
+    """)
+
+    # The text index reads its content from the listing, so it is told the old
+    # values of a row to remove them
+    if text_index_supported(conn):
+        columns = ", ".join(TEXT_INDEX_COLUMNS)
+        new_values = ", ".join(f"NEW.{name}" for name in TEXT_INDEX_COLUMNS)
+        old_values = ", ".join(f"OLD.{name}" for name in TEXT_INDEX_COLUMNS)
+        add = f"INSERT INTO product_text (rowid, {columns}) VALUES (NEW.id, {new_values})"
+        remove = f"INSERT INTO product_text (product_text, rowid, {columns}) VALUES ('delete', OLD.id, {old_values})"
+        text_changed = " OR ".join(f"OLD.{name} IS NOT NEW.{name}" for name in ("id",) + TEXT_INDEX_COLUMNS)
+        conn.execute(f"""
+            CREATE TRIGGER product_text_insert AFTER INSERT ON product_listing BEGIN
+                {add};
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER product_text_update AFTER UPDATE ON product_listing
+            WHEN {text_changed} BEGIN
+                {remove};
+                {add};
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER product_text_delete AFTER DELETE ON product_listing BEGIN
+                {remove};
+            END
+        """)
+
+    if not link:
+        return
+    product_column, department_column = link
+    detach = "UPDATE product_listing SET department_id = NULL, department_name = NULL WHERE department_id = OLD.id"
+    attach = (
+        "UPDATE product_listing SET department_id = NEW.id, department_name = NEW.name "
+        f"WHERE id IN (SELECT id FROM products WHERE {product_column} = NEW.{department_column})"
+    )
+    conn.execute(f"""
+        CREATE TRIGGER product_listing_department_insert AFTER INSERT ON departments BEGIN
+            INSERT OR IGNORE INTO department_counts (department_id, product_count) VALUES (NEW.id, 0);
+            {attach};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER product_listing_department_update AFTER UPDATE ON departments BEGIN
+            {detach};
+            DELETE FROM department_counts WHERE department_id = OLD.id;
+            INSERT OR IGNORE INTO department_counts (department_id, product_count) VALUES (NEW.id, 0);
+            {attach};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER product_listing_department_delete AFTER DELETE ON departments BEGIN
+            {detach};
+            DELETE FROM department_counts WHERE department_id = OLD.id;
+        END
+    """)
+
+def refresh_product_listing(conn) -> int:
+    """
+    Rebuild product_listing and department_counts from products and
+    departments in one transaction, record the rows that changed in
+    product_changes, and (re)install the triggers that maintain them.
+    Readers keep seeing the old tables until the rebuild commits. Returns
+    the number of listed products.
+    """
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        drop_listing_triggers(conn)
+        link = _department_link(conn)
+        source = _source_query(conn, link)
+        definition = ", ".join(f"{name} {sql_type}" for name, sql_type in LISTING_COLUMNS.items())
+        conn.execute("DROP TABLE IF EXISTS product_listing_new")
+        conn.execute(f"CREATE TABLE product_listing_new ({definition})")
+        conn.execute(f"INSERT OR REPLACE INTO product_listing_new {source} ORDER BY p.rowid")
+        _record_bulk_changes(conn, had_changes=bool(_table_columns(conn, "product_changes")))
+        conn.execute("DROP TABLE IF EXISTS product_listing")
+        conn.execute("ALTER TABLE product_listing_new RENAME TO product_listing")
+        for index_name, index_definition in LISTING_INDEXES.items():
+            conn.execute(f"CREATE INDEX {index_name} ON {index_definition}")
+        _create_text_index(conn)
+
+        # Every department gets a row, including those with no products
+        conn.execute("DROP TABLE IF EXISTS department_counts")
+        conn.execute("CREATE TABLE department_counts (department_id INTEGER PRIMARY KEY, product_count INTEGER NOT NULL)")
+        if _table_columns(conn, "departments"):
+            conn.execute("""
+                INSERT INTO department_counts (department_id, product_count)
+                SELECT d.id, COUNT(p.id)
+                FROM departments d
+                LEFT JOIN product_listing p ON p.department_id = d.id
+                GROUP BY d.id
+            """)
+
+        _create_triggers(conn, source, link)
+        conn.execute("ANALYZE product_listing")
+        count = conn.execute("SELECT COUNT(*) FROM product_listing").fetchone()[0]
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+
+def build_missing_listing(db_path) -> bool:
+    """
+    Build the read model of a database created before it existed, once, when
+    the API starts; requests never build it. Returns whether it was built.
+    """
+    path = os.path.realpath(db_path)
+    if not os.path.exists(path):
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        if listing_exists(conn) or not _table_columns(conn, "products"):
+            return False
+        refresh_product_listing(conn)
+        return True
+    finally:
+        conn.close()
+
+def listing_exists(conn) -> bool:
+    tables = ["product_listing", "department_counts", "product_changes"]
+    if text_index_supported(conn):
+        tables.append("product_text")
+    query = (
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' "
+        f"AND name IN ({', '.join('?' for _ in tables)})"
+    )
+    return conn.execute(query, tables).fetchone()[0] == len(tables)
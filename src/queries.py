@@ -0,0 +1,150 @@
+import threading
+from typing import Dict
+
+# Every SQL statement DatabaseManager runs, by name. Placeholders in braces are
+# filled from whitelisted values only (select_list, order_by_clause, a run of
+# "?" markers), so each rendering is a fixed text that sqlite3's per-connection
+# statement cache can keep prepared.
+QUERIES = {
+    "products.count": "SELECT COUNT(*) FROM product_listing",
+    "products.page": """
+        SELECT {columns}
+        FROM product_listing p
+        {order_by}
+        LIMIT ? OFFSET ?
+    """,
+    "products.by_id": """
+        SELECT {columns}
+        FROM product_listing p
+        WHERE p.id = ?
+    """,
+    "products.by_ids": """
+        SELECT {columns}
+        FROM product_listing p
+        WHERE p.id IN ({placeholders})
+    """,
+    "products.stream": """
+        SELECT {columns}
+        FROM product_listing p
+        ORDER BY p.id
+    """,
+    "products.stream_department": """
+        SELECT {columns}
+        FROM product_listing p
+        WHERE p.department_id = ?
+        ORDER BY p.id
+    """,
+    # Search conditions come from search_query.plan_query: id sets selected
+    # through indexes, intersected as the query says
+    "products.search_count": "SELECT COUNT(*) FROM product_listing p WHERE {condition}",
+    "products.search_page": """
+        SELECT {columns}
+        FROM product_listing p
+        WHERE {condition}
+        {order_by}
+        LIMIT ? OFFSET ?
+    """,
+    "listing.text_index": "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_text'",
+    # Departments walk the UNIQUE index on departments.name; counts are one
+    # primary-key lookup per department
+    "departments.list": """
+        SELECT d.id, d.name, COALESCE(c.product_count, 0) as product_count
+        FROM departments d
+        LEFT JOIN department_counts c ON c.department_id = d.id
+        ORDER BY d.name
+    """,
+    "departments.by_id": """
+        SELECT d.id, d.name, COALESCE(c.product_count, 0) as product_count
+        FROM departments d
+        LEFT JOIN department_counts c ON c.department_id = d.id
+        WHERE d.id = ?
+    """,
+    "departments.product_count": """
+        SELECT product_count FROM department_counts
+        WHERE department_id = ?
+    """,
+    "departments.products_page": """
+        SELECT {columns}
+        FROM product_listing p
+        WHERE p.department_id = ?
+        {order_by}
+        LIMIT ? OFFSET ?
+    """,
+    "suggest.terms": """
+        SELECT name, 'product', COUNT(*) FROM product_listing WHERE name IS NOT NULL GROUP BY name
+        UNION ALL
+        SELECT brand, 'brand', COUNT(*) FROM product_listing WHERE brand IS NOT NULL GROUP BY brand
+        UNION ALL
+        SELECT category, 'category', COUNT(*) FROM product_listing WHERE category IS NOT NULL GROUP BY category
+        UNION ALL
+        SELECT d.name, 'department', COALESCE(c.product_count, 0)
+        FROM departments d
+        LEFT JOIN department_counts c ON c.department_id = d.id
+    """,
+    "fuzzy.documents": "SELECT id, name, brand, category FROM product_listing",
+    # Change feed: one row per changed product, walking the unique version index
+    "changes.latest": "SELECT COALESCE(MAX(version), 0) FROM product_changes",
+    "changes.page": """
+        SELECT c.version, c.op, c.product_id, {columns}
+        FROM product_changes c
+        LEFT JOIN product_listing p ON p.id = c.product_id
+        WHERE c.version > ?
+        ORDER BY c.version
+        LIMIT ?
+    """,
+    "changes.present_ids": "SELECT product_id FROM product_changes WHERE version > ? AND op <> 'delete'",
+    # Read models built before generations were recorded have no table
+    "changes.generation_exists": "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_generation'",
+    "changes.generation": "SELECT generation FROM catalog_generation",
+    # Reference data loaded at ingest; databases built before it have no table
+    "distribution_centers.exists": "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'distribution_centers'",
+    "distribution_centers.list": "SELECT id, name, latitude, longitude FROM distribution_centers ORDER BY id",
+}
+
+_rendered: Dict[tuple, str] = {}
+# Search conditions are shaped by user input, so the memo is bounded
+MAX_RENDERED = 4096
+
+def render(name: str, **params) -> str:
+    """SQL text of a named statement; identical inputs return the identical string"""
+    key = (name, tuple(sorted(params.items())))
+    sql = _rendered.get(key)
+    if sql is None:
+        sql = QUERIES[name].format(**params) if params else QUERIES[name]
+        if len(_rendered) >= MAX_RENDERED:
+            _rendered.clear()
+        _rendered[key] = sql
+    return sql
+
+class QueryStats:
+    """Execution counts and timings per named statement (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float, rows: int):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {"calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0}
+            elapsed_ms = seconds * 1000
+            stats["calls"] += 1
+            stats["rows"] += rows
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-statement stats, slowest total first"""
+        with self._lock:
+            items = [(name, dict(stats)) for name, stats in self._stats.items()]
+        for _, stats in items:
+            stats["mean_ms"] = stats["total_ms"] / stats["calls"]
+        return dict(sorted(items, key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+# Shared by every DatabaseManager in the process
+QUERY_STATS = QueryStats()
@@ -0,0 +1,64 @@
+import sys
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+# Compact in-memory product rows. A dict per product repeats every key and
+# holds its own copy of each brand, category and department string; records
+# keep one shared field tuple and one copy of each repeated string. They are
+# for caches that keep products in process; request results stay dict(row),
+# which is cheaper to build for rows that are serialised and dropped.
+
+# Served product fields, in database.PRODUCT_COLUMNS order
+PRODUCT_FIELDS = (
+    "id", "name", "category", "brand", "retail_price", "cost", "department",
+    "sku", "distribution_center_id", "department_id", "department_name",
+)
+
+# Low-cardinality columns whose values are shared between products
+INTERNED_FIELDS = frozenset({"category", "brand", "department", "department_name"})
+
+def intern_value(value):
+    """One shared copy of a repeated string value, released once no record holds it"""
+    return sys.intern(value) if type(value) is str else value
+
+class ProductRecord(Mapping):
+    """
+    One product row in __slots__, readable as a mapping (record["name"],
+    ProductResponse(**record), dict(record)) or by attribute. Sparse rows
+    carry only their selected fields.
+    """
+
+    __slots__ = ("_fields",) + PRODUCT_FIELDS
+
+    def __init__(self, fields: Tuple[str, ...], values: Iterable):
+        self._fields = fields
+        for name, value in zip(fields, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        if name not in self._fields:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return f"ProductRecord({dict(self)!r})"
+
+def product_records(rows: Sequence) -> List[ProductRecord]:
+    """ProductRecords from sqlite3.Row results, sharing one field tuple and the repeated strings"""
+    if not rows:
+        return []
+    fields = tuple(rows[0].keys())
+    interned = [position for position, name in enumerate(fields) if name in INTERNED_FIELDS]
+    records = []
+    for row in rows:
+        values = list(row)
+        for position in interned:
+            values[position] = intern_value(values[position])
+        records.append(ProductRecord(fields, values))
+    return records
@@ -0,0 +1,89 @@
+from fastapi import HTTPException, Response
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from models import ProductResponse, ProductListResponse, embedded_product_list_model, sparse_product_list_model
+from database import PRODUCT_COLUMNS
+
+# Request parsing and response building shared by the product and department routes
+
+FIELDS_DESCRIPTION = "Comma-separated product fields to return, e.g. id,name,retail_price"
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a sparse fieldset into model order; None means every field"""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(requested - set(PRODUCT_COLUMNS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown product fields: {', '.join(unknown)}"
+        )
+    return tuple(name for name in PRODUCT_COLUMNS if name == "id" or name in requested)
+
+INCLUDES = ("distribution_center",)
+INCLUDE_DESCRIPTION = "Related data to embed in each product: distribution_center"
+
+def parse_include(include: Optional[str]) -> Tuple[str, ...]:
+    """Parse the related data to embed; empty means none"""
+    if not include:
+        return ()
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sorted(requested - set(INCLUDES))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(unknown)}"
+        )
+    return tuple(name for name in INCLUDES if name in requested)
+
+def include_fields(fields: Optional[Tuple[str, ...]], include: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """Widen a sparse fieldset to the columns the embedded data is looked up by"""
+    if fields is None or "distribution_center" not in include:
+        return fields
+    return parse_fields(",".join(fields + ("distribution_center_id",)))
+
+def embed_distribution_centers(products: Iterable, centers: Dict[int, Dict[str, Any]]) -> list:
+    """Products with their distribution center (None when unknown) from the in-memory map"""
+    return [dict(product, distribution_center=centers.get(product["distribution_center_id"])) for product in products]
+
+def product_list_response(result, fields: Optional[Tuple[str, ...]],
+                          centers: Optional[Dict[int, Dict[str, Any]]] = None):
+    """
+    Build a product list response, serialising only the requested fields.
+    Given the distribution center map, each product embeds its center.
+    """
+    if centers is not None:
+        body = embedded_product_list_model(fields)(
+            products=embed_distribution_centers(result["products"], centers),
+            total_count=result["total_count"],
+            page=result["page"],
+            page_size=result["page_size"],
+            total_pages=result.get("total_pages"),
+            search_term=result.get("search_term")
+        )
+        return Response(content=body.model_dump_json(), media_type="application/json")
+    
+    if fields is None:
+        # Convert to ProductResponse objects
+        products = [ProductResponse(**product) for product in result["products"]]
+        
+        return ProductListResponse(
+            products=products,
+            total_count=result["total_count"],
+            page=result["page"],
+            page_size=result["page_size"],
+            total_pages=result.get("total_pages"),
+            search_term=result.get("search_term")
+        )
+    
+    # Sparse responses bypass response_model, which would demand every field
+    body = sparse_product_list_model(fields)(
+        products=result["products"],
+        total_count=result["total_count"],
+        page=result["page"],
+        page_size=result["page_size"],
+        total_pages=result.get("total_pages"),
+        search_term=result.get("search_term")
+    )
+    return Response(content=body.model_dump_json(), media_type="application/json")
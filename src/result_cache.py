@@ -0,0 +1,156 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Response
+
+# Rendered responses kept in a SQLite file beside the live database path, so
+# they survive restarts and deploys and are shared by every worker process.
+# Entries are keyed on the catalog generation and version and the normalised
+# query; a catalog write moves the version on and a rebuilt database gets a new
+# generation, so stale entries are never served. Each entry
+# also keeps the total_count of its product list, for the search log.
+MAX_BYTES = 256 * 1024 * 1024
+EVICT_EVERY = 64  # puts between size checks
+EVICT_TO = 0.9  # fraction of MAX_BYTES left after an eviction
+TOUCH_INTERVAL = 60.0  # seconds between last_used updates of one entry
+
+def cache_path(db_path) -> Path:
+    """Cache file of a database. Follows the live path, not the version behind it."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.name}.results")
+
+def query_key(endpoint: str, **params) -> str:
+    """Normalised query: endpoint plus validated parameters in name order"""
+    params = {name: ",".join(value) if isinstance(value, tuple) else value
+              for name, value in params.items() if value is not None}
+    return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+def response_body(response) -> bytes:
+    """JSON bytes of a handler result (a response model or a ready Response)"""
+    if isinstance(response, Response):
+        return response.body
+    return response.model_dump_json().encode()
+
+class ResultCache:
+    """Size-bounded, LRU-evicted store of response bodies for one process"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path = None
+        self._fingerprint = None
+        self._version = None
+        self._puts = 0
+
+    def _connect(self, db) -> sqlite3.Connection:
+        path = cache_path(db.db_path)
+        if self._path != path:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            # WAL lets worker processes read while one of them writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA mmap_size={self.max_bytes}")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            if columns and not {"generation", "total_count"} <= columns:
+                self._conn.execute("DROP TABLE results")  # written by an older release
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    generation TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    total_count INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used)")
+            self._path = path
+            self._fingerprint = None
+        return self._conn
+
+    def catalog_version(self, db) -> Tuple[str, int]:
+        """Current (catalog generation, version), re-read only when the database file changes"""
+        with self._lock:
+            conn = self._connect(db)
+            fingerprint = (db.db_path, db.get_catalog_fingerprint())
+            if self._fingerprint != fingerprint:
+                version = (db.get_catalog_generation(), db.get_catalog_version())
+                if version != self._version:
+                    conn.execute("DELETE FROM results WHERE generation <> ? OR version < ?", version)
+                self._fingerprint, self._version = fingerprint, version
+            return self._version
+
+    def get(self, db, key: str) -> Tuple[Tuple[str, int], Optional[bytes], Optional[int]]:
+        """
+        ((catalog generation, version), cached body or None, its total_count
+        or None); pass the version back to put()
+        """
+        version = self.catalog_version(db)
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT body, total_count, last_used FROM results WHERE key = ? AND generation = ? AND version = ?",
+                    (key, *version)
+                ).fetchone()
+                if row is None:
+                    return version, None, None
+                now = time.time()
+                if now - row[2] > TOUCH_INTERVAL:
+                    self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error:
+                return version, None, None  # a busy or damaged cache is a miss
+            return version, row[0], row[1]
+
+    def put(self, db, version: Tuple[str, int], key: str, body: bytes, total_count: int):
+        """
+        Store a body computed at `version` with the total_count of its product
+        list, evicting least recently used entries when over budget
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect(db)
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, generation, version, body, total_count, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, *version, body, total_count, len(body), time.time())
+                )
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 0:
+                    self._evict(conn)
+            except sqlite3.Error:
+                pass  # the response is served either way
+
+    def evict(self, db):
+        with self._lock:
+            self._evict(self._connect(db))
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Keep the most recently used entries that fit in EVICT_TO of the budget
+        conn.execute("""
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept FROM results
+                ) WHERE kept > ?
+            )
+        """, (int(self.max_bytes * EVICT_TO),))
+
+    def size(self, db) -> int:
+        """Bytes currently stored"""
+        with self._lock:
+            return self._connect(db).execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+# Shared by the search and department listing handlers
+RESULT_CACHE = ResultCache()
@@ -0,0 +1,142 @@
+import atexit
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Search analytics. Handlers append one tuple per search to an in-memory ring
+# buffer (a deque append, no I/O and no lock on the request path); a daemon
+# thread drains it in batches into a SQLite file beside the database. The log
+# lives in its own file because a write to the catalog file would change its
+# fingerprint and invalidate every cache keyed on it.
+RING_SIZE = 10000  # entries held before the oldest are dropped
+FLUSH_BATCH = 500
+FLUSH_INTERVAL = 1.0  # seconds between flushes of a partial batch
+MAX_ROWS = 1_000_000  # rows kept in the log table, newest first
+
+def log_path(db_path) -> Path:
+    """Search log file of a database, beside the live path"""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.name}.searches")
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_log (
+            id INTEGER PRIMARY KEY,
+            logged_at REAL NOT NULL,
+            endpoint TEXT NOT NULL,
+            query TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            latency_ms REAL NOT NULL,
+            result_count INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_log_query ON search_log(query)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_log_latency ON search_log(latency_ms)")
+    return conn
+
+class SearchLog:
+    """Ring buffer of search calls with a background writer"""
+
+    def __init__(self, ring_size: int = RING_SIZE):
+        self._entries = deque(maxlen=ring_size)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._connections: Dict[Path, sqlite3.Connection] = {}
+        self.dropped = 0
+
+    def record(self, db, endpoint: str, query: str, page: int, started: float,
+               result_count: Optional[int] = None):
+        """Log one search that began at perf_counter() time `started`, with its result count"""
+        latency_ms = (time.perf_counter() - started) * 1000
+        if len(self._entries) == self._entries.maxlen:
+            self.dropped += 1
+        self._entries.append((db.db_path, time.time(), endpoint, query, page, latency_ms, result_count))
+        if self._worker is None:
+            self._start()
+        elif len(self._entries) >= FLUSH_BATCH:
+            self._wake.set()
+
+    def _start(self):
+        with self._flush_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Busy or unwritable; the entries are lost, the next batch is tried again
+                pass
+
+    def flush(self):
+        """Write every buffered entry to its database's log"""
+        with self._flush_lock:
+            while self._entries:
+                batches: Dict[str, List[tuple]] = {}
+                for _ in range(min(FLUSH_BATCH, len(self._entries))):
+                    db_path, logged_at, endpoint, query, page, latency_ms, result_count = self._entries.popleft()
+                    batches.setdefault(db_path, []).append((logged_at, endpoint, query, page, latency_ms, result_count))
+                for db_path, rows in batches.items():
+                    conn = self._connection(log_path(db_path))
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO search_log (logged_at, endpoint, query, page, latency_ms, result_count) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            rows
+                        )
+                        conn.execute("DELETE FROM search_log WHERE id <= (SELECT MAX(id) FROM search_log) - ?", (MAX_ROWS,))
+
+    def _connection(self, path: Path) -> sqlite3.Connection:
+        conn = self._connections.get(path)
+        if conn is None:
+            conn = self._connections[path] = _connect(path)
+        return conn
+
+    def top_queries(self, db, limit: int = 20, zero_results: bool = False) -> List[Dict[str, Any]]:
+        """Most frequent queries, optionally only those that found nothing"""
+        self.flush()
+        with self._flush_lock:
+            rows = self._connection(log_path(db.db_path)).execute(f"""
+                SELECT query, COUNT(*), AVG(latency_ms), MAX(latency_ms), SUM(result_count = 0), MAX(logged_at)
+                FROM search_log
+                {"WHERE result_count = 0" if zero_results else ""}
+                GROUP BY query
+                ORDER BY COUNT(*) DESC, query
+                LIMIT ?
+            """, (limit,)).fetchall()
+        return [
+            {"query": query, "count": count, "avg_latency_ms": round(average, 3), "max_latency_ms": round(slowest, 3),
+             "zero_result_count": zero_count or 0, "last_seen": last_seen}
+            for query, count, average, slowest, zero_count, last_seen in rows
+        ]
+
+    def slow_queries(self, db, limit: int = 20) -> List[Dict[str, Any]]:
+        """Slowest individual searches, slowest first"""
+        self.flush()
+        with self._flush_lock:
+            rows = self._connection(log_path(db.db_path)).execute("""
+                SELECT query, endpoint, page, latency_ms, result_count, logged_at
+                FROM search_log
+                ORDER BY latency_ms DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+        return [
+            {"query": query, "endpoint": endpoint, "page": page, "latency_ms": round(latency_ms, 3),
+             "result_count": result_count, "logged_at": logged_at}
+            for query, endpoint, page, latency_ms, result_count, logged_at in rows
+        ]
+
+# Shared by the search handlers and the analytics endpoints
+SEARCH_LOG = SearchLog()
@@ -0,0 +1,264 @@
+import re
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+# Search query language:
+#
+#   nike shoes                   every word must match name, category, brand or department
+#   "running shoes"              a phrase, matched as one substring
+#   brand:nike category:shoes    text fields: name, category, brand, department
+#   price:<50  price:10..50      numeric fields: id, price, margin, department_id
+#                                (n, <n, <=n, >n, >=n, a..b)
+#   a OR b  NOT a  -a  ( )       adjacent clauses are ANDed; AND binds tighter than OR
+#
+# Text matches are case-insensitive substrings, as before the language existed.
+# Plans select product ids through indexes where one applies: numeric clauses
+# use the listing's B-tree indexes (the rowid for id), text clauses the trigram
+# index product_text. AND, OR and NOT become INTERSECT, UNION and EXCEPT of
+# those id sets, so a multi-clause query is an index intersection. Clauses no
+# index can answer (text shorter than a trigram) filter the rows instead.
+
+class QuerySyntaxError(ValueError):
+    """Search input that is not a valid query"""
+
+Text = namedtuple("Text", "field value")  # field None: any searched column
+Compare = namedtuple("Compare", "field op value")  # op "between": value is (low, high)
+And = namedtuple("And", "clauses")
+Or = namedtuple("Or", "clauses")
+Not = namedtuple("Not", "clause")
+
+# Query field -> product_listing column
+TEXT_FIELDS = {
+    "name": "name",
+    "category": "category",
+    "brand": "brand",
+    "department": "department_name",
+}
+# Query field -> (indexed expression, value type)
+NUMERIC_FIELDS = {
+    "id": ("id", int),
+    "price": ("retail_price", float),
+    "margin": ("(retail_price - cost)", float),
+    "department_id": ("department_id", int),
+}
+OPERATORS = ("AND", "OR", "NOT")
+MAX_CLAUSES = 16
+MIN_INDEXED_LENGTH = 3  # the trigram index cannot look up shorter text
+
+_TOKEN = re.compile(r'\s*(?:(?P<paren>[()])|"(?P<phrase>[^"]*)"?|(?P<word>(?:[^\s()"]|"[^"]*"?)+))')
+_COMPARISON = re.compile(r"(?P<op><=|>=|<|>|=)?(?P<value>[^.<>=]+(?:\.[^.<>=]+)?)$")
+
+def _number(field: str, value: str):
+    try:
+        return NUMERIC_FIELDS[field][1](value)
+    except ValueError:
+        raise QuerySyntaxError(f"{field} needs a number, got {value!r}") from None
+
+def _clause(word: str):
+    """Parse one bare word: a negation, a field clause or plain text"""
+    if word.startswith("-") and len(word) > 1:
+        return Not(_clause(word[1:]))
+    field, separator, value = word.partition(":")
+    field = field.lower()
+    if not separator or (field not in TEXT_FIELDS and field not in NUMERIC_FIELDS):
+        return Text(None, word)
+    if value.startswith('"'):
+        value = value[1:-1] if value.endswith('"') and len(value) > 1 else value[1:]
+    if not value:
+        raise QuerySyntaxError(f"{field}: needs a value")
+    if field in TEXT_FIELDS:
+        return Text(field, value)
+
+    low, dots, high = value.partition("..")
+    if dots:
+        return Compare(field, "between", (_number(field, low), _number(field, high)))
+    match = _COMPARISON.match(value)
+    if match is None:
+        raise QuerySyntaxError(f"{field} needs a number or a comparison, got {value!r}")
+    return Compare(field, match.group("op") or "=", _number(field, match.group("value")))
+
+def _tokens(query: str) -> List[tuple]:
+    tokens = []
+    position = 0
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None or match.end() == position:
+            break
+        position = match.end()
+        if match.group("paren"):
+            tokens.append((match.group("paren"), None))
+        elif match.group("phrase") is not None:
+            if match.group("phrase").strip():
+                tokens.append(("clause", Text(None, match.group("phrase"))))
+        elif match.group("word") in OPERATORS:
+            tokens.append((match.group("word"), None))
+        elif match.group("word"):
+            tokens.append(("clause", _clause(match.group("word"))))
+    return tokens
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]):
+        self.tokens = tokens
+        self.position = 0
+        self.clauses = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self) -> tuple:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        clauses = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            clauses.append(self.parse_and())
+        return clauses[0] if len(clauses) == 1 else Or(tuple(clauses))
+
+    def parse_and(self):
+        clauses = [self.parse_unary()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            clauses.append(self.parse_unary())
+        return clauses[0] if len(clauses) == 1 else And(tuple(clauses))
+
+    def parse_unary(self):
+        kind = self.peek()
+        if kind is None:
+            raise QuerySyntaxError("query ends where a clause was expected")
+        kind, clause = self.take()
+        if kind == "NOT":
+            return Not(self.parse_unary())
+        if kind == "(":
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise QuerySyntaxError("missing closing parenthesis")
+            self.take()
+            return node
+        if kind != "clause":
+            raise QuerySyntaxError(f"unexpected {kind}")
+        self.clauses += 1
+        if self.clauses > MAX_CLAUSES:
+            raise QuerySyntaxError(f"at most {MAX_CLAUSES} clauses are allowed")
+        return clause
+
+def parse_query(query: str):
+    """Syntax tree of a search query; None for a blank one"""
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise QuerySyntaxError(f"unexpected {parser.peek()}")
+    return node
+
+# A plan: `ids` selects matching ids through indexes, `where` filters rows of
+# product_listing p; both apply when both are set
+Plan = namedtuple("Plan", "ids ids_params where where_params compound")
+
+def _condition(plan: Plan) -> Tuple[str, list]:
+    parts, params = [], []
+    if plan.ids is not None:
+        parts.append(f"p.id IN ({plan.ids})")
+        params += plan.ids_params
+    if plan.where is not None:
+        parts.append(plan.where)
+        params += plan.where_params
+    return " AND ".join(parts) or "1", params
+
+def _member(plan: Plan) -> str:
+    """Compound select member; nested compounds go in a subquery"""
+    return f"SELECT id FROM ({plan.ids})" if plan.compound else plan.ids
+
+def _escape_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+def _plan_text(node: Text, text_index: bool) -> Plan:
+    if text_index and len(node.value) >= MIN_INDEXED_LENGTH:
+        phrase = _escape_phrase(node.value)
+        if node.field is not None:
+            phrase = f"{TEXT_FIELDS[node.field]} : {phrase}"
+        return Plan("SELECT rowid AS id FROM product_text WHERE product_text MATCH ?", [phrase], None, [], False)
+    columns = [TEXT_FIELDS[node.field]] if node.field is not None else list(TEXT_FIELDS.values())
+    pattern = f"%{node.value}%"
+    where = " OR ".join(f"p.{column} LIKE ?" for column in columns)
+    return Plan(None, [], f"({where})", [pattern] * len(columns), False)
+
+def _plan_compare(node: Compare) -> Plan:
+    expression = NUMERIC_FIELDS[node.field][0]
+    if node.op == "between":
+        return Plan(f"SELECT id FROM product_listing WHERE {expression} BETWEEN ? AND ?", list(node.value), None, [], False)
+    return Plan(f"SELECT id FROM product_listing WHERE {expression} {node.op} ?", [node.value], None, [], False)
+
+def _negate(plan: Plan) -> Plan:
+    if plan.where is None:
+        return Plan(None, [], f"p.id NOT IN ({plan.ids})", plan.ids_params, False)
+    condition, params = _condition(plan)
+    # IS NOT 1: a clause that is NULL for a row (a NULL column) does not match it, so its negation does
+    return Plan(None, [], f"({condition}) IS NOT 1", params, False)
+
+def _plan_and(nodes, text_index: bool) -> Plan:
+    included, excluded, filters = [], [], []
+    for node in nodes:
+        if isinstance(node, Not):
+            inner = _plan(node.clause, text_index)
+            if inner.where is None:
+                excluded.append(inner)  # an EXCEPT arm once there is a set to subtract from
+                continue
+            plan = _negate(inner)
+        else:
+            plan = _plan(node, text_index)
+        if plan.ids is not None:
+            included.append(plan)
+        if plan.where is not None:
+            filters.append(plan)
+
+    ids, ids_params = None, []
+    if included:
+        ids = " INTERSECT ".join(_member(plan) for plan in included)
+        ids_params = [param for plan in included for param in plan.ids_params]
+        if excluded:
+            ids += "".join(f" EXCEPT {_member(plan)}" for plan in excluded)
+            ids_params += [param for plan in excluded for param in plan.ids_params]
+    else:
+        filters += [_negate(plan) for plan in excluded]
+
+    where = " AND ".join(plan.where for plan in filters) or None
+    where_params = [param for plan in filters for param in plan.where_params]
+    compound = ids is not None and (len(included) + len(excluded) > 1 or included[0].compound)
+    return Plan(ids, ids_params, where, where_params, compound)
+
+def _plan(node, text_index: bool) -> Plan:
+    if isinstance(node, Text):
+        return _plan_text(node, text_index)
+    if isinstance(node, Compare):
+        return _plan_compare(node)
+    if isinstance(node, And):
+        return _plan_and(node.clauses, text_index)
+    if isinstance(node, Or):
+        plans = [_plan(clause, text_index) for clause in node.clauses]
+        if all(plan.where is None for plan in plans):
+            ids = " UNION ".join(_member(plan) for plan in plans)
+            return Plan(ids, [param for plan in plans for param in plan.ids_params], None, [], True)
+        conditions = [_condition(plan) for plan in plans]
+        where = " OR ".join(f"({condition})" for condition, _ in conditions)
+        return Plan(None, [], f"({where})", [param for _, params in conditions for param in params], False)
+    if isinstance(node, Not):
+        return _negate(_plan(node.clause, text_index))
+    raise TypeError(f"not a query node: {node!r}")
+
+def plan_query(query: str, text_index: bool = True) -> Tuple[str, list]:
+    """
+    SQL condition on product_listing p selecting the products a search query
+    matches, and its parameters. `text_index` says whether product_text exists.
+    Raises QuerySyntaxError for malformed input, and for input that is blank
+    once parsed rather than matching the whole catalog.
+    """
+    node = parse_query(query)
+    if node is None:
+        raise QuerySyntaxError("empty query")
+    return _condition(_plan(node, text_index))
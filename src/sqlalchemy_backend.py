@@ -0,0 +1,185 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from database import POOL_SIZE, PROGRESS_STEPS, STATEMENT_CACHE_SIZE, DatabaseManager, QueryTimeout, _deadline, select_list
+from queries import MAX_RENDERED, QueryStats, render
+
+# DatabaseManager on SQLAlchemy Core. It runs the same named statements from
+# queries.QUERIES and returns the same rows, through an engine instead of the
+# hand-rolled sqlite3 pool:
+#
+#   - engine pooling (QueuePool: POOL_SIZE idle connections, overflow unbounded),
+#   - compiled-statement caching (one text() construct per statement text,
+#     compiled once per engine in its query cache),
+#   - server-side cursors for streaming where the dialect has them.
+#
+# With no URL it serves the SQLite file at db_path and follows db_path like
+# DatabaseManager (a swapped-in version gets a fresh engine). With a URL the
+# statements go to that database, whose schema must include the read model
+# that product_listing builds on SQLite; db_path then only places local files
+# (caches, logs). Database errors surface as the driver's own exceptions, as
+# they do from DatabaseManager.
+
+def _named_params(sql: str) -> Tuple[str, int]:
+    """Rewrite ? placeholders outside string literals as :p0, :p1, ...; returns the SQL and the count"""
+    parts = sql.split("'")
+    count = 0
+    for index in range(0, len(parts), 2):  # even parts are outside literals
+        pieces = parts[index].split("?")
+        rewritten = pieces[0]
+        for piece in pieces[1:]:
+            rewritten += f":p{count}{piece}"
+            count += 1
+        parts[index] = rewritten
+    return "'".join(parts), count
+
+@lru_cache(maxsize=MAX_RENDERED)
+def statement(sql: str):
+    """Cached text() construct of a registry statement; the engine caches its compiled form"""
+    return text(_named_params(sql)[0])
+
+@lru_cache(maxsize=128)
+def _row_type(keys: Tuple[str, ...]):
+    """Tuple subclass read like sqlite3.Row: by position, by column name and through keys()"""
+    positions = {key: position for position, key in enumerate(keys)}
+
+    class Row(tuple):
+        __slots__ = ()
+
+        def keys(self):
+            return list(keys)
+
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                return tuple.__getitem__(self, positions[key])
+            return tuple.__getitem__(self, key)
+
+    return Row
+
+class SQLAlchemyDatabaseManager(DatabaseManager):
+    """DatabaseManager whose connections, statements and cursors come from SQLAlchemy Core"""
+
+    def __init__(self, db_path: str = "database/ecommerce.db", stats: Optional[QueryStats] = None,
+                 url: Optional[str] = None, pool_size: int = POOL_SIZE, **engine_options):
+        super().__init__(db_path, stats)
+        self.url = url
+        self.pool_size = pool_size
+        self.engine_options = engine_options
+        self._engines: Dict[str, Engine] = {}
+
+    def _create_engine(self, url) -> Engine:
+        options = {"pool_size": self.pool_size, "max_overflow": -1, "query_cache_size": STATEMENT_CACHE_SIZE}
+        if url.startswith("sqlite"):
+            # Pooled connections may be handed to export worker threads
+            options["connect_args"] = {"check_same_thread": False, "cached_statements": STATEMENT_CACHE_SIZE}
+        options.update(self.engine_options)
+        return create_engine(url, **options)
+
+    def _engine(self) -> Tuple[str, Engine]:
+        """
+        Engine for the current database: the configured URL, or the file
+        behind db_path. A new file behind db_path (see db_swap.promote)
+        replaces the engines of older versions.
+        """
+        key = self.url or os.path.realpath(self.db_path)
+        engine = self._engines.get(key)
+        if engine is not None:
+            return key, engine
+        with self._pools_lock:
+            stale = []
+            engine = self._engines.get(key)
+            if engine is None:
+                stale = list(self._engines.values())
+                engine = self._create_engine(self.url or f"sqlite:///{key}")
+                self._engines = {key: engine}
+        for stale_engine in stale:
+            stale_engine.dispose()
+        return key, engine
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine()[1]
+
+    def close_connections(self):
+        """Close every idle pooled connection"""
+        for engine in list(self._engines.values()):
+            engine.dispose()
+
+    def get_catalog_fingerprint(self):
+        """Cheap token that changes whenever the catalog is written (the catalog version for a URL)"""
+        if self.url is None:
+            return super().get_catalog_fingerprint()
+        return ("version", self.get_catalog_version())
+
+    @contextmanager
+    def get_connection(self):
+        """
+        Context manager for a pooled SQLAlchemy connection. Inside
+        statement_timeout, SQLite statements are aborted past the deadline.
+        """
+        key, engine = self._engine()
+        deadline = _deadline.get()
+        conn = engine.connect()
+        driver_connection = conn.connection.driver_connection
+        sqlite = engine.dialect.name == "sqlite"
+        try:
+            if sqlite and deadline is not None:
+                driver_connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+            if sqlite:
+                self._check_listing(key, driver_connection)
+            yield conn
+        except DBAPIError as e:
+            if sqlite and deadline is not None and time.monotonic() > deadline:
+                raise QueryTimeout(str(e.orig)) from e.orig
+            raise e.orig from None
+        finally:
+            if sqlite and deadline is not None:
+                driver_connection.set_progress_handler(None, 0)
+            conn.close()
+
+    def _fetch(self, conn, name: str, params=(), one: bool = False, **sql_params):
+        """Run a named statement from the registry, recording its execution time"""
+        start = time.perf_counter()
+        result = conn.execute(statement(render(name, **sql_params)), {f"p{i}": value for i, value in enumerate(params)})
+        row_type = _row_type(tuple(result.keys()))
+        if one:
+            row = result.fetchone()
+            result.close()
+            rows = 1 if row is not None else 0
+            fetched = row_type(row) if row is not None else None
+        else:
+            fetched = [row_type(row) for row in result]
+            rows = len(fetched)
+        self.stats.record(name, time.perf_counter() - start, rows)
+        return fetched
+
+    def stream_products(self, department_id: Optional[int] = None, fields: Optional[List[str]] = None,
+                        batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Yield every product (optionally one department) in id order as batches
+        of tuples, from a server-side cursor where the dialect has one.
+        """
+        columns = select_list(fields)
+        if department_id is not None:
+            name, params = "products.stream_department", {"p0": department_id}
+        else:
+            name, params = "products.stream", {}
+
+        start = time.perf_counter()
+        rows = 0
+        try:
+            with self.get_connection() as conn:
+                streaming = conn.execution_options(stream_results=True, yield_per=batch_size)
+                result = streaming.execute(statement(render(name, columns=columns)), params)
+                for partition in result.partitions(batch_size):
+                    rows += len(partition)
+                    yield [tuple(row) for row in partition]
+        finally:
+            self.stats.record(name, time.perf_counter() - start, rows)
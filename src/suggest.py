@@ -0,0 +1,214 @@
+import heapq
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import ReadModelMissing
+
+# Separates the normalised term from its kind inside a sort key, and sorts
+# before every printable character so "nike" stays ahead of "nike air".
+_KIND_SEPARATOR = "\x00"
+_PREFIX_END = "\uffff"
+
+def normalize(term: str) -> str:
+    """Normalise a term for prefix matching"""
+    return " ".join(term.lower().split())
+
+class SuggestionIndex:
+    """
+    In-memory prefix index for search autocomplete.
+
+    Terms are kept in a sorted list, so every term that starts with a prefix
+    sits in one contiguous slice found with two bisects. The top completions
+    for short prefixes, whose slices cover a large part of the catalog, are
+    precomputed and kept up to date as terms change. Longer prefixes match
+    small slices that are ranked on demand.
+    """
+
+    def __init__(self, max_cached_prefix: int = 3, cache_size: int = 20):
+        self.max_cached_prefix = max_cached_prefix
+        self.cache_size = cache_size
+        self._keys: List[str] = []
+        self._entries: Dict[str, Tuple[str, str, int]] = {}  # key -> (text, kind, weight)
+        self._top: Dict[str, List[str]] = {}  # short prefix -> keys ordered by weight
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(term: str, kind: str) -> str:
+        return f"{normalize(term)}{_KIND_SEPARATOR}{kind}"
+
+    def _rank(self, key: str):
+        return (-self._entries[key][2], key)
+
+    def _cached_prefixes(self, key: str):
+        norm = key.split(_KIND_SEPARATOR, 1)[0]
+        return [norm[:n] for n in range(1, min(len(norm), self.max_cached_prefix) + 1)]
+
+    def copy(self) -> "SuggestionIndex":
+        """Independent index with the same contents, to sync while this one serves"""
+        index = SuggestionIndex(self.max_cached_prefix, self.cache_size)
+        index._keys = list(self._keys)
+        index._entries = dict(self._entries)
+        index._top = {prefix: list(keys) for prefix, keys in self._top.items()}
+        index.fingerprint = self.fingerprint
+        return index
+
+    def build(self, entries: Iterable[Tuple[str, str, int]]):
+        """Replace the index contents with (term, kind, weight) entries"""
+        self._entries = {}
+        for term, kind, weight in entries:
+            if not term or not normalize(term):
+                continue
+            key = self._key(term, kind)
+            text, _, current = self._entries.get(key, (term, kind, 0))
+            self._entries[key] = (text, kind, current + weight)
+        self._keys = sorted(self._entries)
+
+        prefixes = set()
+        for key in self._keys:
+            prefixes.update(self._cached_prefixes(key))
+        self._top = {prefix: self._scan(prefix, self.cache_size) for prefix in prefixes}
+
+    def add(self, term: str, kind: str, weight: int = 1):
+        """Add weight to a term, inserting it if it is new"""
+        if not term or not normalize(term):
+            return
+        key = self._key(term, kind)
+        if key in self._entries:
+            text, _, current = self._entries[key]
+            self._entries[key] = (text, kind, current + weight)
+        else:
+            self._entries[key] = (term, kind, weight)
+            insort(self._keys, key)
+        for prefix in self._cached_prefixes(key):
+            top = self._top.setdefault(prefix, [])
+            if key not in top:
+                top.append(key)
+            top.sort(key=self._rank)
+            del top[self.cache_size:]
+
+    def remove(self, term: str, kind: str, weight: Optional[int] = None):
+        """Subtract weight from a term, dropping it when no weight is left"""
+        key = self._key(term, kind)
+        if key not in self._entries:
+            return
+        text, _, current = self._entries[key]
+        remaining = 0 if weight is None else current - weight
+        if remaining > 0:
+            self._entries[key] = (text, kind, remaining)
+        else:
+            del self._entries[key]
+            del self._keys[bisect_left(self._keys, key)]
+        for prefix in self._cached_prefixes(key):
+            if key in self._top.get(prefix, ()):
+                # A lower-ranked term may now belong in the cached list
+                top = self._scan(prefix, self.cache_size)
+                if top:
+                    self._top[prefix] = top
+                else:
+                    del self._top[prefix]
+
+    def sync(self, entries: Iterable[Tuple[str, str, int]]) -> int:
+        """
+        Bring the index in line with a fresh set of entries, touching only the
+        terms whose weight changed. Returns the number of terms updated.
+        """
+        fresh: Dict[str, Tuple[str, str, int]] = {}
+        for term, kind, weight in entries:
+            if not term or not normalize(term):
+                continue
+            key = self._key(term, kind)
+            text, _, current = fresh.get(key, (term, kind, 0))
+            fresh[key] = (text, kind, current + weight)
+
+        changed = 0
+        for key in [k for k in self._entries if k not in fresh]:
+            text, kind, _ = self._entries[key]
+            self.remove(text, kind)
+            changed += 1
+        for key, (text, kind, weight) in fresh.items():
+            current = self._entries.get(key, (text, kind, 0))[2]
+            if weight > current:
+                self.add(text, kind, weight - current)
+                changed += 1
+            elif weight < current:
+                self.remove(text, kind, current - weight)
+                changed += 1
+        return changed
+
+    def _scan(self, norm_prefix: str, limit: int) -> List[str]:
+        lo = bisect_left(self._keys, norm_prefix)
+        hi = bisect_left(self._keys, norm_prefix + _PREFIX_END, lo)
+        return heapq.nsmallest(limit, self._keys[lo:hi], key=self._rank)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, object]]:
+        """Return up to `limit` completions of `prefix`, most popular first"""
+        norm_prefix = normalize(prefix)
+        if not norm_prefix:
+            return []
+        cached = self._top.get(norm_prefix) if len(norm_prefix) <= self.max_cached_prefix else None
+        if cached is not None and limit <= self.cache_size:
+            keys = cached[:limit]
+        elif len(norm_prefix) <= self.max_cached_prefix and limit <= self.cache_size:
+            keys = []  # no cached list means no term starts with this prefix
+        else:
+            keys = self._scan(norm_prefix, limit)
+
+        suggestions = []
+        for key in keys:
+            text, kind, weight = self._entries[key]
+            suggestions.append({"text": text, "kind": kind, "weight": weight})
+        return suggestions
+
+class LiveSuggestionIndex:
+    """
+    The autocomplete index of a database, kept in step with the catalog. The
+    first lookup builds it; after a catalog change the previous index keeps
+    serving while a background thread syncs a copy, which replaces it with one
+    assignment once ready.
+    """
+
+    def __init__(self):
+        self.index = SuggestionIndex()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def current(self, db) -> SuggestionIndex:
+        """The latest ready index; blocks only for the first build"""
+        fingerprint = db.get_catalog_fingerprint()
+        if self.index.fingerprint != fingerprint:
+            with self._lock:
+                if self.index.fingerprint is None:
+                    self._refresh(db, fingerprint)  # nothing to serve yet
+                elif self.index.fingerprint != fingerprint and not (self._worker and self._worker.is_alive()):
+                    self._worker = threading.Thread(target=self._refresh_quietly, args=(db, fingerprint), daemon=True)
+                    self._worker.start()
+        return self.index
+
+    def _refresh(self, db, fingerprint):
+        terms = db.get_suggestion_terms()
+        if self.index.fingerprint is None:
+            index = SuggestionIndex()
+            index.build(terms)
+        else:
+            index = self.index.copy()
+            index.sync(terms)
+        index.fingerprint = fingerprint
+        self.index = index
+
+    def _refresh_quietly(self, db, fingerprint):
+        try:
+            self._refresh(db, fingerprint)
+        except (sqlite3.Error, ReadModelMissing):
+            # Busy, gone or not yet built; the next lookup after a change tries again
+            pass
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running background sync finishes"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
@@ -12,6 +12,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from main import app
 from database import DatabaseManager
+from product_listing import refresh_product_listing
 
 @pytest.fixture
 def test_db():
@@ -22,9 +23,14 @@ def test_db():
     
     yield temp_db.name
     
-    # Cleanup
-    if os.path.exists(temp_db.name):
-        os.unlink(temp_db.name)
+    # Cleanup, including the result cache, search log and pre-rendered pages kept beside the database
+    from search_log import SEARCH_LOG
+    SEARCH_LOG.flush()
+    sidecars = [f"{temp_db.name}.{name}{suffix}" for name in ("results", "searches") for suffix in ("", "-wal", "-shm")]
+    sidecars.append(str(Path(temp_db.name).with_suffix(".pages")))
+    for path in [temp_db.name] + sidecars:
+        if os.path.exists(path):
+            os.unlink(path)
 
 @pytest.fixture
 def test_db_manager(test_db):
@@ -42,6 +48,14 @@ def client(test_db):
     with TestClient(app) as test_client:
         yield test_client
     
+    # Let background page renders, filter builds and suggestion syncs finish before the database is removed
+    from page_cache import PAGE_CACHE
+    from negative_cache import PRODUCT_IDS
+    from main import suggestion_index
+    PAGE_CACHE.wait()
+    PRODUCT_IDS.wait()
+    suggestion_index.wait()
+    
     # Restore original database path
     db.db_path = original_db_path
 
@@ -109,6 +123,51 @@ def setup_test_data(test_db, sample_products):
         ))
     
     conn.commit()
+    refresh_product_listing(conn)  # as ingest does; the API never builds the read model
+    conn.close()
+    
+    return sample_products 
+
+@pytest.fixture
+def setup_migrated_data(test_db, sample_products):
+    """Setup test data using the post-Milestone 4 schema (departments table + department_id)"""
+    conn = sqlite3.connect(test_db)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS departments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            category TEXT,
+            brand TEXT,
+            retail_price REAL,
+            cost REAL,
+            department TEXT,
+            sku TEXT,
+            distribution_center_id INTEGER,
+            department_id INTEGER
+        )
+    """)
+    
+    for product in sample_products:
+        cursor.execute("INSERT OR IGNORE INTO departments (name) VALUES (?)", (product["department"],))
+        cursor.execute("""
+            INSERT INTO products (id, name, category, brand, retail_price, cost, department, sku, distribution_center_id, department_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT id FROM departments WHERE name = ?))
+        """, (
+            product["id"], product["name"], product["category"], product["brand"],
+            product["retail_price"], product["cost"], product["department"],
+            product["sku"], product["distribution_center_id"], product["department"]
+        ))
+    
+    conn.commit()
+    refresh_product_listing(conn)
     conn.close()
     
-    return sample_products 
\ No newline at end of file
+    return sample_products
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException, status
+
+from admission import ADMISSION_LIMITS, AdmissionLimit
+from database import DatabaseManager, QueryTimeout, statement_timeout
+from queries import QueryStats
+
+RUNAWAY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+def run_together(limit, count, func):
+    """Start `count` calls under `limit` at once; return results and 503s in order"""
+    async def call():
+        try:
+            return await limit.run(func)
+        except HTTPException as e:
+            return e
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(count)))
+
+    return asyncio.run(main())
+
+class TestStatementTimeout:
+    """Test the progress-handler statement deadline"""
+
+    def test_runaway_statement_is_aborted(self, test_db, setup_migrated_data):
+        """Statements past the deadline raise QueryTimeout"""
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        start = time.monotonic()
+        with pytest.raises(QueryTimeout):
+            with statement_timeout(0.05):
+                with manager.get_connection() as conn:
+                    conn.execute(RUNAWAY).fetchone()
+        assert time.monotonic() - start < 2
+
+        # The pooled connection comes back without the handler
+        with manager.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM product_listing").fetchone()[0] == 2
+        manager.close_connections()
+
+class TestAdmissionLimit:
+    """Test concurrency limits, queue budgets and shedding"""
+
+    def test_full_queue_is_shed_immediately(self):
+        """With no queue, callers beyond the limit get a 503 with Retry-After"""
+        limit = AdmissionLimit("search", max_concurrent=1, max_queue=0, queue_timeout=5, statement_timeout=None)
+        results = run_together(limit, 2, lambda: time.sleep(0.2) or "done")
+
+        assert results[0] == "done"
+        assert results[1].status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert results[1].headers == {"Retry-After": "1"}
+        assert limit.snapshot()["rejected"] == 1
+
+    def test_queue_time_budget(self):
+        """Queued callers give up after queue_timeout"""
+        limit = AdmissionLimit("listing", max_concurrent=1, max_queue=4, queue_timeout=0.05, statement_timeout=None)
+        results = run_together(limit, 2, lambda: time.sleep(0.3) or "done")
+
+        assert results[0] == "done"
+        assert results[1].status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_queued_caller_is_admitted(self):
+        """Callers within the queue budget run once a slot frees up"""
+        limit = AdmissionLimit("listing", max_concurrent=1, max_queue=4, queue_timeout=5, statement_timeout=None)
+
+        assert run_together(limit, 3, lambda: time.sleep(0.02) or "done") == ["done"] * 3
+        assert limit.snapshot()["admitted"] == 3
+
+    def test_slow_statement_becomes_503(self, test_db, setup_migrated_data):
+        """Statements aborted by the deadline are reported as 503"""
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        limit = AdmissionLimit("search", max_concurrent=1, max_queue=0, queue_timeout=1, statement_timeout=0.05)
+
+        def runaway():
+            with manager.get_connection() as conn:
+                return conn.execute(RUNAWAY).fetchone()
+
+        [result] = run_together(limit, 1, runaway)
+        assert result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert limit.snapshot()["timed_out"] == 1
+        manager.close_connections()
+
+    def test_endpoint_sheds_but_lookups_still_work(self, client, setup_migrated_data, monkeypatch):
+        """A saturated search limit returns 503 while lookups by id are unaffected"""
+        monkeypatch.setitem(
+            ADMISSION_LIMITS, "search",
+            AdmissionLimit("search", max_concurrent=0, max_queue=0, queue_timeout=0.01, statement_timeout=None)
+        )
+
+        response = client.get("/api/products/search?search=Test")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+        assert client.get("/api/products/1").status_code == status.HTTP_200_OK
+        assert client.get("/api/stats/queries").json()["admission"]["search"]["rejected"] == 1
+
+    def test_handlers_keep_io_off_the_event_loop(self, client, setup_migrated_data, monkeypatch):
+        """Cache lookups and catalog checks run on the threadpool with the query"""
+        import main
+        from distribution_centers import DISTRIBUTION_CENTERS
+        from negative_cache import EMPTY_SEARCHES, PRODUCT_IDS
+        from page_cache import PAGE_CACHE
+        from result_cache import RESULT_CACHE
+        calls = []
+
+        def recorded(target, name):
+            original = getattr(target, name)
+            def call(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append((name, "event loop"))
+                except RuntimeError:
+                    calls.append((name, "threadpool"))
+                return original(*args, **kwargs)
+            monkeypatch.setattr(target, name, call)
+
+        for target, name in [(RESULT_CACHE, "get"), (RESULT_CACHE, "put"), (PAGE_CACHE, "lookup"),
+                             (EMPTY_SEARCHES, "lookup"), (PRODUCT_IDS, "might_contain"),
+                             (main.catalog_snapshot, "current"), (DISTRIBUTION_CENTERS, "current")]:
+            recorded(target, name)
+        for url in ("/api/products", "/api/products?search=Test&include=distribution_center",
+                    "/api/products/search?search=Test", "/api/products/1?include=distribution_center",
+                    "/api/departments/1/products"):
+            assert client.get(url).status_code == status.HTTP_200_OK
+
+        assert {name for name, _ in calls} == {"get", "put", "lookup", "might_contain", "current"}
+        assert {where for _, where in calls} == {"threadpool"}
+
+    def test_limit_covers_pre_rendered_pages(self, client, setup_migrated_data, monkeypatch):
+        """A saturated listing limit sheds the whole handler, cache lookups included"""
+        from page_cache import PAGE_CACHE
+        monkeypatch.setitem(
+            ADMISSION_LIMITS, "listing",
+            AdmissionLimit("listing", max_concurrent=0, max_queue=0, queue_timeout=0.01, statement_timeout=None)
+        )
+        monkeypatch.setattr(PAGE_CACHE, "lookup", lambda *args: pytest.fail("looked up outside the limit"))
+
+        assert client.get("/api/products").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert client.get("/api/departments/1/products").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
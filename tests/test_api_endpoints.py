@@ -3,6 +3,8 @@ from fastapi.testclient import TestClient
 from fastapi import status
 import sqlite3
 
+from product_listing import refresh_product_listing
+
 class TestRootEndpoint:
     """Test the root endpoint"""
     
@@ -268,6 +270,7 @@ class TestEdgeCases:
             )
         """)
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         response = client.get("/api/products")
@@ -0,0 +1,80 @@
+import json
+import sqlite3
+
+import pytest
+from fastapi import status
+
+from catalog_snapshot import FLAG_DENSE, CatalogSnapshot, build_snapshot, snapshot_path
+from database import DatabaseManager
+from queries import QueryStats
+
+@pytest.fixture
+def manager(test_db, setup_migrated_data):
+    manager = DatabaseManager(test_db, stats=QueryStats())
+    yield manager
+    manager.close_connections()
+    snapshot_path(test_db).unlink(missing_ok=True)
+
+def execute(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+class TestCatalogSnapshot:
+    """Test the memory-mapped catalog snapshot"""
+
+    def test_lookups_match_the_database(self, manager, test_db):
+        """Records and JSON blobs round-trip every field"""
+        execute(test_db, "UPDATE products SET brand = NULL WHERE id = 2")
+        assert build_snapshot(manager) == 2
+        snapshot = CatalogSnapshot(snapshot_path(test_db))
+
+        assert snapshot.flags & FLAG_DENSE
+        for product_id in (1, 2):
+            expected = manager.get_product_by_id(product_id)
+            assert snapshot.get(product_id) == expected
+            assert json.loads(snapshot.get_json(product_id)) == expected
+        assert snapshot.get(2, ("name",)) == {"id": 2, "name": "Test Product 2"}
+        assert snapshot.get(3) is None and snapshot.get_json(0) is None
+        snapshot.close()
+
+    def test_sparse_ids_use_binary_search(self, manager, test_db):
+        """Widely spread ids fall back to the sorted id index"""
+        execute(test_db, "UPDATE products SET id = 10000000 WHERE id = 2")
+        build_snapshot(manager)
+        snapshot = CatalogSnapshot(snapshot_path(test_db))
+
+        assert not snapshot.flags & FLAG_DENSE
+        assert snapshot.get(10000000)["name"] == "Test Product 2"
+        assert 1 in snapshot and 2 not in snapshot
+        snapshot.close()
+
+    def test_api_serves_from_snapshot(self, client, manager, monkeypatch):
+        """Lookups by id skip the database while the snapshot is current"""
+        expected = dict(manager.get_product_by_id(1))
+        build_snapshot(manager)
+
+        from main import db
+        monkeypatch.setattr(db, "get_product_by_id", lambda *args: pytest.fail("database was queried"))
+        response = client.get("/api/products/1")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == expected
+        assert client.get("/api/products/1?fields=sku").json() == {"id": 1, "sku": "TEST001"}
+
+    def test_stale_snapshot_is_ignored(self, client, manager, test_db):
+        """A catalog write after the build sends lookups back to the database"""
+        build_snapshot(manager)
+        assert client.get("/api/products/1").json()["name"] == "Test Product 1"
+
+        execute(test_db, "UPDATE products SET name = 'Renamed' WHERE id = 1")
+        assert client.get("/api/products/1").json()["name"] == "Renamed"
+
+    def test_snapshot_built_while_serving_is_picked_up(self, client, manager, monkeypatch):
+        """A snapshot written after the first lookup is mapped without a catalog write"""
+        assert client.get("/api/products/1").json()["name"] == "Test Product 1"
+        build_snapshot(manager)
+
+        from main import db
+        monkeypatch.setattr(db, "get_product_by_id", lambda *args: pytest.fail("database was queried"))
+        assert client.get("/api/products/1").json()["name"] == "Test Product 1"
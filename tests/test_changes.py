@@ -0,0 +1,77 @@
+import sqlite3
+
+from fastapi import status
+
+def execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+class TestChangeFeed:
+    """Test the catalog change feed"""
+
+    def test_baseline_lists_every_product(self, client, setup_migrated_data):
+        """A mirror starting from version 0 receives the whole catalog as inserts"""
+        response = client.get("/api/changes")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [(c["version"], c["op"], c["product_id"]) for c in data["changes"]] == [(1, "insert", 1), (2, "insert", 2)]
+        assert data["changes"][0]["product"]["department_name"] == "Test Department"
+        assert data["version"] == data["latest_version"] == 2
+        assert data["has_more"] is False
+
+    def test_only_changes_after_since(self, client, setup_migrated_data, test_db):
+        """Inserts, updates and deletes after a version are returned once each"""
+        version = client.get("/api/changes").json()["version"]
+
+        execute(test_db, "UPDATE products SET retail_price = 19.99 WHERE id = 1")
+        execute(test_db, "DELETE FROM products WHERE id = 2")
+        execute(test_db, """
+            INSERT INTO products (id, name, category, brand, retail_price, cost, department, sku, distribution_center_id, department_id)
+            VALUES (3, 'Test Product 3', 'Test Category', 'Test Brand', 9.99, 4.0, 'Test Department', 'TEST003', 1, 1)
+        """)
+        execute(test_db, "UPDATE products SET sku = 'TEST003B' WHERE id = 3")
+
+        data = client.get(f"/api/changes?since={version}").json()
+        changes = {c["product_id"]: c for c in data["changes"]}
+        assert set(changes) == {1, 2, 3}
+        assert changes[1]["op"] == "update"
+        assert changes[1]["product"]["retail_price"] == 19.99
+        assert changes[2]["op"] == "delete"
+        assert changes[2]["product"] is None
+        assert changes[3]["product"]["sku"] == "TEST003B"
+        assert client.get(f"/api/changes?since={data['version']}").json()["changes"] == []
+
+    def test_unchanged_rows_are_not_recorded(self, client, setup_migrated_data, test_db):
+        """Writes that leave the served columns alone do not bump the version"""
+        version = client.get("/api/changes").json()["version"]
+        execute(test_db, "UPDATE products SET name = name WHERE id = 1")
+
+        assert client.get(f"/api/changes?since={version}").json()["changes"] == []
+
+    def test_batches(self, client, setup_migrated_data):
+        """Large backlogs are paged with the returned version"""
+        first = client.get("/api/changes?limit=1").json()
+        assert first["has_more"] is True
+        second = client.get(f"/api/changes?since={first['version']}&limit=1").json()
+
+        assert [c["product_id"] for c in first["changes"] + second["changes"]] == [1, 2]
+        assert second["has_more"] is False
+
+    def test_rebuild_records_differences(self, client, setup_migrated_data, test_db):
+        """A bulk rebuild (loader or migration) records only the rows it changed"""
+        from product_listing import drop_listing_triggers, refresh_product_listing
+
+        version = client.get("/api/changes").json()["version"]
+        conn = sqlite3.connect(test_db)
+        drop_listing_triggers(conn)
+        conn.execute("UPDATE products SET brand = 'Other Brand' WHERE id = 2")
+        conn.commit()
+        refresh_product_listing(conn)
+        conn.close()
+
+        changes = client.get(f"/api/changes?since={version}").json()["changes"]
+        assert [(c["op"], c["product_id"]) for c in changes] == [("update", 2)]
+        assert changes[0]["product"]["brand"] == "Other Brand"
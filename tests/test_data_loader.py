@@ -0,0 +1,75 @@
+import sqlite3
+import sys
+
+import pytest
+
+from data_loader import EcommerceDataLoader, is_columnar_file
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+feather = pytest.importorskip("pyarrow.feather")
+
+def product_table(start, count):
+    return pa.table({
+        "id": pa.array(range(start, start + count), pa.int64()),
+        "name": [f"Product {i}" for i in range(start, start + count)],
+        "retail_price": pa.array([i + 0.99 for i in range(count)], pa.float64()),
+        "department": ["Women"] * count,
+    })
+
+@pytest.fixture
+def loader(tmp_path):
+    return EcommerceDataLoader(data_dir=tmp_path, db_path=tmp_path / "db" / "ecommerce.db")
+
+class TestColumnarIngestion:
+    """Test Parquet/Arrow loading in EcommerceDataLoader"""
+    
+    def test_is_columnar_file(self):
+        assert is_columnar_file("products.parquet")
+        assert is_columnar_file("products.FEATHER")
+        assert not is_columnar_file("products.csv")
+    
+    def test_missing_pyarrow_is_reported(self, loader, tmp_path, capsys, monkeypatch):
+        """Without pyarrow, columnar loads stop up front with an install hint"""
+        pq.write_table(product_table(1, 10), tmp_path / "products.parquet")
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+        assert not loader.run_complete_pipeline("products.parquet")
+        assert not loader.load_columnar_to_database(tmp_path / "products.parquet")
+        output = capsys.readouterr().out
+        assert output.count("requires pyarrow; install it with: pip install pyarrow") == 2
+        assert "Columnar Structure Analysis" not in output
+        assert not loader.db_path.exists()
+
+    def test_pipeline_loads_parquet_with_types(self, loader, tmp_path, capsys):
+        """run_complete_pipeline dispatches on the file suffix"""
+        pq.write_table(product_table(1, 10), tmp_path / "products.parquet")
+        
+        assert loader.run_complete_pipeline("products.parquet")
+        assert "rows/s" in capsys.readouterr().out
+        conn = sqlite3.connect(loader.db_path)
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(products)")}
+        assert columns == {"id": "INTEGER", "name": "TEXT", "retail_price": "REAL", "department": "TEXT"}
+        assert conn.execute("SELECT COUNT(*), SUM(id) FROM products").fetchone() == (10, 55)
+        assert conn.execute("SELECT COUNT(*) FROM product_listing").fetchone() == (10,)
+        conn.close()
+    
+    def test_parallel_multi_file_load(self, loader, tmp_path):
+        """Several files (mixed Parquet and Feather) are loaded by one writer"""
+        paths = []
+        for part in range(5):
+            path = tmp_path / f"products-{part}.{'parquet' if part % 2 else 'feather'}"
+            table = product_table(part * 100, 100)
+            if part % 2:
+                pq.write_table(table, path)
+            else:
+                feather.write_feather(table, path)
+            paths.append(path)
+        
+        assert loader.load_files_to_database(paths, workers=2)
+        conn = sqlite3.connect(loader.db_path)
+        assert conn.execute("SELECT COUNT(DISTINCT id), MIN(id), MAX(id) FROM products").fetchone() == (500, 0, 499)
+        conn.close()
+    
+    def test_no_files(self, loader):
+        assert not loader.run_columnar_pipeline([])
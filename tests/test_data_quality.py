@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import pytest
+
+from data_quality import build_report, format_summary
+
+@pytest.fixture
+def quality_db(tmp_path):
+    """Migrated schema with one of each data-quality problem"""
+    db_path = tmp_path / "ecommerce.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    conn.execute("INSERT INTO departments VALUES (1, 'Men'), (2, 'Women')")
+    conn.execute("""
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY, cost REAL, category TEXT, name TEXT, brand TEXT,
+            retail_price REAL, department TEXT, sku TEXT, distribution_center_id INTEGER,
+            department_id INTEGER
+        )
+    """)
+    rows = [
+        (1, 10.0, "Jeans", "Good", "A", 20.0, "Men", "SKU1", 1, 1),
+        (2, 12.0, "Jeans", "Good", None, 30.0, "Women", "SKU2", 2, 2),
+        (3, 40.0, "Jeans", "Loss", "A", 30.0, "Women", "SKU3", 1, 2),    # cost above price
+        (4, 10.0, "Jeans", "Dup", "A", 20.0, "Men", "SKU1", 1, 1),       # duplicate sku
+        (5, 10.0, "Jeans", "Orphan", "A", 20.0, "Men", "SKU5", 1, 9),    # unknown department_id
+        (6, 10.0, "Jeans", "Unmapped", "A", 20.0, "Kids", "SKU6", 1, None),
+        (7, 10.0, "Jeans", "Far", "A", 20.0, "Men", "SKU7", 99, 1),      # unknown distribution center
+    ]
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    dc_csv = tmp_path / "distribution_centers.csv"
+    dc_csv.write_text("id,name,latitude,longitude\n1,Memphis TN,35.1,-90.0\n2,Chicago IL,41.8,-87.6\n")
+    return db_path, dc_csv
+
+class TestDataQualityReport:
+    """Test the data-quality report"""
+
+    def test_counts_each_problem(self, quality_db):
+        """Every seeded problem is counted once"""
+        report = build_report(*quality_db)
+
+        assert report["row_count"] == 7
+        assert report["duplicates"] == {"sku": 1}
+        assert report["anomalies"]["cost_above_price"] == 1
+        assert report["anomalies"]["negative_price"] == 0
+        assert report["orphans"] == {"department_id": 1, "unmapped_department": 1, "distribution_center_id": 1}
+        assert report["null_rates"]["brand"] == pytest.approx(1 / 7)
+        assert report["departments"] == {"Men": 3, "Women": 2}
+        assert len(report["issues"]) == 5
+        assert report["ok"] is False
+
+    def test_parallel_ranges_match_single_scan(self, quality_db):
+        """Splitting the scan across threads merges to the same report"""
+        single = build_report(*quality_db, workers=1)
+        split = build_report(*quality_db, workers=3)
+
+        for section in ("null_rates", "duplicates", "anomalies", "orphans", "distributions", "departments"):
+            assert split[section] == single[section]
+
+    def test_distributions(self, quality_db):
+        """Price, cost and margin moments come from the same pass"""
+        stats = build_report(*quality_db)["distributions"]
+
+        assert stats["retail_price"]["count"] == 7
+        assert stats["retail_price"]["min"] == 20.0
+        assert stats["retail_price"]["max"] == 30.0
+        assert stats["margin"]["min"] == -10.0
+        assert stats["cost"]["mean"] == pytest.approx(102 / 7)
+
+    def test_quantiles_use_price_index(self, quality_db):
+        """Quantiles are reported when an index can serve them"""
+        db_path, dc_csv = quality_db
+        assert "p50" not in build_report(db_path, dc_csv)["distributions"]["retail_price"]
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE INDEX idx_products_retail_price ON products (retail_price)")
+        conn.commit()
+        conn.close()
+        stats = build_report(db_path, dc_csv)["distributions"]["retail_price"]
+        assert stats["p50"] == 20.0
+        assert stats["p99"] == 30.0
+
+    def test_report_is_json_serialisable(self, quality_db):
+        """The report can be dumped as JSON and summarised"""
+        report = build_report(*quality_db)
+
+        assert json.loads(json.dumps(report))["row_count"] == 7
+        assert "cost_above_price" in format_summary(report)
+
+    def test_empty_distribution_centers_table(self, quality_db):
+        """With no centers loaded, every product referencing one is an orphan"""
+        db_path, dc_csv = quality_db
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE distribution_centers (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+        conn.execute("UPDATE products SET distribution_center_id = NULL WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        assert build_report(db_path, dc_csv)["orphans"]["distribution_center_id"] == 6
+
+    def test_clean_pre_migration_table(self, tmp_path):
+        """Checks for missing columns and tables are skipped"""
+        db_path = tmp_path / "raw.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE products (id INTEGER, name TEXT, retail_price REAL, department TEXT)")
+        conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?)", [(1, "A", 5.0, "Men"), (2, "B", 6.0, "Women")])
+        conn.commit()
+        conn.close()
+
+        report = build_report(db_path, None)
+        assert report["ok"] is True
+        assert report["duplicates"] == {"id": 0}
+        assert report["orphans"] == {}
+        assert report["departments"] == {"Men": 1, "Women": 1}
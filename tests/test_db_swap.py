@@ -0,0 +1,95 @@
+import os
+import sqlite3
+
+import pytest
+
+from data_loader import EcommerceDataLoader
+from database import DatabaseManager
+from db_swap import build_then_swap, list_versions, live_version
+from product_listing import refresh_product_listing
+from queries import QueryStats
+
+def write_catalog(path, names):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("DELETE FROM products")
+    conn.executemany("INSERT INTO products (name) VALUES (?)", [(name,) for name in names])
+    conn.commit()
+    refresh_product_listing(conn)
+    conn.close()
+
+def product_names(manager):
+    with manager.get_connection() as conn:
+        return [row["name"] for row in conn.execute("SELECT name FROM product_listing ORDER BY id")]
+
+@pytest.fixture
+def live_db(tmp_path):
+    path = tmp_path / "ecommerce.db"
+    write_catalog(path, ["Blue"])
+    return path
+
+class TestBuildThenSwap:
+    """Test blue/green promotion of database files"""
+
+    def test_promote_swaps_the_live_file(self, live_db):
+        """The live path points at the new build; the manager drains the old version"""
+        manager = DatabaseManager(str(live_db), stats=QueryStats())
+        assert product_names(manager) == ["Blue"]
+        old_pool = manager._pools[str(live_version(live_db))]
+
+        with build_then_swap(live_db) as build_path:
+            write_catalog(build_path, ["Green"])
+
+        assert os.path.islink(live_db)
+        assert live_version(live_db) == build_path
+        assert product_names(manager) == ["Green"]
+        assert list(manager._pools) == [str(build_path)]
+        assert old_pool.empty()
+        manager.close_connections()
+
+    def test_readers_keep_their_version(self, live_db):
+        """A connection opened before the swap keeps reading the old file"""
+        reader = sqlite3.connect(live_db)
+
+        with build_then_swap(live_db) as build_path:
+            write_catalog(build_path, ["Green"])
+
+        assert reader.execute("SELECT name FROM products").fetchall() == [("Blue",)]
+        reader.close()
+
+    def test_failed_build_is_discarded(self, live_db):
+        """An exception leaves the live file untouched and removes the build"""
+        with pytest.raises(RuntimeError):
+            with build_then_swap(live_db) as build_path:
+                write_catalog(build_path, ["Green"])
+                raise RuntimeError("load failed")
+
+        assert not os.path.islink(live_db)
+        assert not build_path.exists()
+
+    def test_old_versions_are_pruned(self, live_db):
+        """Only the live version and the one before it are kept"""
+        for name in ("Green", "Blue", "Green"):
+            with build_then_swap(live_db) as build_path:
+                write_catalog(build_path, [name])
+
+        versions = list_versions(live_db)
+        assert len(versions) == 2
+        assert versions[-1] == live_version(live_db)
+
+    def test_loader_promotes_only_successful_runs(self, live_db, tmp_path):
+        """The loader's swap mode runs a pipeline on a build file"""
+        loader = EcommerceDataLoader(data_dir=tmp_path, db_path=live_db)
+
+        def pipeline(names, ok):
+            write_catalog(loader.db_path, names)
+            return ok
+
+        assert not loader.run_with_swap(pipeline, ["Red"], False)
+        assert loader.db_path == live_db
+        assert not os.path.islink(live_db)
+
+        assert loader.run_with_swap(pipeline, ["Green"], True)
+        conn = sqlite3.connect(live_db)
+        assert conn.execute("SELECT name FROM products").fetchall() == [("Green",)]
+        conn.close()
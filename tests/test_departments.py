@@ -0,0 +1,90 @@
+import sqlite3
+
+from fastapi import status
+from fastapi.routing import APIRoute
+
+from main import app
+from departments import router
+from page_cache import PAGE_SIZE
+
+class TestDepartmentRoutes:
+    """Test the consolidated department endpoints"""
+
+    def test_each_path_is_served_once(self):
+        """Department paths live only in the departments router"""
+        app_paths = [route.path for route in app.routes if isinstance(route, APIRoute)]
+        router_paths = [route.path for route in router.routes]
+
+        assert not [path for path in app_paths if path.startswith("/api/departments")]
+        assert sorted(router_paths) == [
+            "/departments",
+            "/departments/{department_id}",
+            "/departments/{department_id}/products",
+        ]
+
+    def test_list_departments(self, client, setup_migrated_data):
+        """Departments come back as a list with product counts"""
+        response = client.get("/api/departments")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"id": 1, "name": "Test Department", "product_count": 2}]
+
+    def test_get_department(self, client, setup_migrated_data):
+        """Department detail carries its products by name"""
+        response = client.get("/api/departments/1")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["product_count"] == 2
+        assert [p["name"] for p in data["products"]] == ["Test Product 1", "Test Product 2"]
+        assert data["products"][0]["department_name"] == "Test Department"
+
+    def test_get_department_returns_the_first_page(self, client, setup_migrated_data, test_db):
+        """Large departments report their full count but embed only the first page"""
+        conn = sqlite3.connect(test_db)
+        conn.executemany(
+            "INSERT INTO products (id, name, category, department_id) VALUES (?, ?, 'Jeans', 1)",
+            [(i, f"Extra {i:03d}") for i in range(3, 3 + PAGE_SIZE)]
+        )
+        conn.commit()
+        conn.close()
+
+        data = client.get("/api/departments/1").json()
+        assert data["product_count"] == PAGE_SIZE + 2
+        assert len(data["products"]) == PAGE_SIZE
+        assert data["products"][0]["name"] == "Extra 003"
+
+    def test_routes_share_the_api_manager(self):
+        """One connection pool and one set of query stats serve every route"""
+        import departments
+        import main
+        assert departments.db is main.db
+
+    def test_get_department_not_found(self, client, setup_migrated_data):
+        """Unknown departments return 404"""
+        response = client.get("/api/departments/999")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_department_products(self, client, setup_migrated_data):
+        """Department listings are paginated product lists sorted by name by default"""
+        response = client.get("/api/departments/1/products?page_size=1")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_count"] == 2
+        assert data["total_pages"] == 2
+        assert [p["name"] for p in data["products"]] == ["Test Product 1"]
+
+    def test_department_products_validation(self, client, setup_migrated_data):
+        """Paging is validated like the other product listings"""
+        response = client.get("/api/departments/1/products?page_size=1000")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_department_products_sparse(self, client, setup_migrated_data):
+        """Department listings accept a sparse fieldset"""
+        response = client.get("/api/departments/1/products?fields=name")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.json()["products"][0]) == {"id", "name"}
@@ -0,0 +1,103 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi import status
+
+from distribution_centers import load_distribution_centers
+
+CENTERS_CSV = Path(__file__).resolve().parent.parent / "data" / "distribution_centers.csv"
+MEMPHIS = {"id": 1, "name": "Memphis TN", "latitude": 35.1174, "longitude": -89.9711}
+
+def fail(*args, **kwargs):
+    raise AssertionError("the database was queried")
+
+@pytest.fixture
+def setup_centers(test_db, setup_migrated_data):
+    """Migrated sample data plus the distribution centers, as loaded at ingest"""
+    conn = sqlite3.connect(test_db)
+    with conn:
+        load_distribution_centers(conn, CENTERS_CSV)
+    conn.close()
+    return setup_migrated_data
+
+class TestLoadDistributionCenters:
+    """Test loading distribution_centers.csv into its table"""
+
+    def test_replaces_rows(self, test_db):
+        """Loading twice leaves one row per center"""
+        conn = sqlite3.connect(test_db)
+        assert load_distribution_centers(conn, CENTERS_CSV) == 10
+        assert load_distribution_centers(conn, CENTERS_CSV) == 10
+        assert conn.execute("SELECT * FROM distribution_centers WHERE id = 1").fetchone() == tuple(MEMPHIS.values())
+        assert conn.execute("SELECT COUNT(*) FROM distribution_centers").fetchone() == (10,)
+        conn.close()
+
+    def test_missing_csv(self, test_db, tmp_path):
+        conn = sqlite3.connect(test_db)
+        assert load_distribution_centers(conn, tmp_path / "distribution_centers.csv") is None
+        conn.close()
+
+class TestIncludeDistributionCenter:
+    """Test embedding distribution centers in product responses"""
+
+    def test_product_list(self, client, setup_centers):
+        response = client.get("/api/products?include=distribution_center")
+        assert response.status_code == status.HTTP_200_OK
+        products = response.json()["products"]
+        assert len(products) == 2
+        assert all(product["distribution_center"] == MEMPHIS for product in products)
+
+    def test_default_response_unchanged(self, client, setup_centers):
+        """Without include, products carry only the distribution center id"""
+        product = client.get("/api/products").json()["products"][0]
+        assert "distribution_center" not in product
+        assert product["distribution_center_id"] == 1
+
+    def test_sparse_fields(self, client, setup_centers):
+        """A sparse fieldset gains the id the center is looked up by"""
+        response = client.get("/api/products/search?search=Test&fields=name&include=distribution_center")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["products"][0] == {
+            "id": 1, "name": "Test Product 1", "distribution_center_id": 1, "distribution_center": MEMPHIS
+        }
+
+    def test_single_product_and_department(self, client, setup_centers):
+        product = client.get("/api/products/2?include=distribution_center").json()
+        assert product["sku"] == "TEST002"
+        assert product["distribution_center"] == MEMPHIS
+
+        products = client.get("/api/departments/1/products?include=distribution_center").json()["products"]
+        assert [product["distribution_center"] for product in products] == [MEMPHIS, MEMPHIS]
+
+    def test_centers_are_memoised(self, client, setup_centers, monkeypatch):
+        """Centers are read once per catalog version, not per request or product"""
+        from main import db
+        client.get("/api/products?include=distribution_center")
+
+        monkeypatch.setattr(db, "get_distribution_centers", fail)
+        response = client.get("/api/products?include=distribution_center&page_size=1")
+        assert response.json()["products"][0]["distribution_center"] == MEMPHIS
+
+    def test_database_without_centers(self, client, setup_migrated_data):
+        """Databases loaded before the table existed embed null"""
+        response = client.get("/api/products/1?include=distribution_center")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["distribution_center"] is None
+
+    def test_unknown_include(self, client, setup_centers):
+        response = client.get("/api/products?include=warehouse")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Unknown include: warehouse"
+
+    def test_cached_responses_follow_center_edits(self, client, setup_centers, test_db):
+        """Reloading the centers without a product change does not serve cached embeds of the old ones"""
+        url = "/api/products/search?search=Test&include=distribution_center"
+        assert client.get(url).json()["products"][0]["distribution_center"]["name"] == "Memphis TN"
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("UPDATE distribution_centers SET name = 'Memphis, TN' WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        assert client.get(url).json()["products"][0]["distribution_center"]["name"] == "Memphis, TN"
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+import pytest
+from fastapi import status
+
+class TestExportEndpoint:
+    """Test the streaming /api/products/export endpoint"""
+    
+    def test_export_ndjson(self, client, setup_migrated_data):
+        """Default format is one JSON object per line"""
+        response = client.get("/api/products/export")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert 'filename="products.ndjson"' in response.headers["content-disposition"]
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [1, 2]
+        assert rows[0]["department_name"] == "Test Department"
+    
+    def test_export_csv_sparse(self, client, setup_migrated_data):
+        """CSV export has a header row and honours fields"""
+        response = client.get("/api/products/export?format=csv&fields=name,retail_price")
+        
+        assert response.status_code == status.HTTP_200_OK
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows == [["id", "name", "retail_price"], ["1", "Test Product 1", "29.99"], ["2", "Test Product 2", "49.99"]]
+    
+    def test_export_department_filter(self, client, setup_migrated_data):
+        """Filtering by an unknown department exports nothing"""
+        response = client.get("/api/products/export?department_id=99")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text == ""
+    
+    def test_export_parquet(self, client, setup_migrated_data):
+        """Parquet export round-trips typed columns"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        response = client.get("/api/products/export?format=parquet")
+        
+        assert response.status_code == status.HTTP_200_OK
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows == 2
+        assert table.column("retail_price").to_pylist() == [29.99, 49.99]
+    
+    def test_export_invalid_format(self, client):
+        """Unknown formats are rejected"""
+        response = client.get("/api/products/export?format=xml")
+        
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+class TestStreamProducts:
+    """Test DatabaseManager.stream_products"""
+    
+    def test_stream_products_batches(self, test_db_manager, setup_migrated_data):
+        """Rows arrive in id order in batches of the requested size"""
+        batches = list(test_db_manager.stream_products(batch_size=1, fields=["name"]))
+        
+        assert batches == [[(1, "Test Product 1")], [(2, "Test Product 2")]]
@@ -0,0 +1,84 @@
+import pytest
+from fastapi import status
+
+from fuzzy import TrigramIndex, edit_distance, trigrams
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.build([
+        (1, "Nike Running Shoes", "Nike", "Shoes"),
+        (2, "Adidas Track Jacket", "Adidas", "Outerwear & Coats"),
+        (3, "Levi's Denim Jacket", "Levi's", "Outerwear & Coats"),
+        (4, "Adidas T-Shirt", "Adidas", "Tops & Tees"),
+    ])
+    return index
+
+class TestTrigramIndex:
+    """Test the typo-tolerant trigram index"""
+    
+    def test_helpers(self):
+        """Trigrams are padded and edit distance counts single edits"""
+        assert trigrams("ab") == {"  a", " ab", "ab "}
+        assert edit_distance("jaket", "jacket") == 1
+        assert edit_distance("addidas", "adidas") == 1
+    
+    def test_misspelt_brand(self, index):
+        """A doubled letter still finds the brand"""
+        assert index.search("addidas") == [2, 4]
+    
+    def test_misspelt_word_ranks_closer_matches_first(self, index):
+        """Every query word must match; closer matches rank higher"""
+        assert index.search("jaket") == [2, 3]
+        assert index.search("addidas jaket") == [2]
+    
+    def test_no_match(self, index):
+        """Unrelated queries return nothing"""
+        assert index.search("xylophone") == []
+        assert index.search("!!") == []
+
+class TestFuzzySearchEndpoint:
+    """Test fuzzy=true on /api/products/search"""
+    
+    def test_fuzzy_search(self, client, setup_migrated_data):
+        """A misspelt query matches with fuzzy=true only"""
+        response = client.get("/api/products/search?search=Tesst%20Prodct%202")
+        assert response.json()["total_count"] == 0
+        
+        response = client.get("/api/products/search?search=Tesst%20Prodct%202&fuzzy=true")
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_count"] == 1
+        assert data["products"][0]["id"] == 2
+        assert data["products"][0]["department_name"] == "Test Department"
+    
+    def test_fuzzy_search_pagination(self, client, setup_migrated_data):
+        """Only the requested page is returned"""
+        response = client.get("/api/products/search?search=tesst%20prodct&fuzzy=true&page=2&page_size=1")
+        data = response.json()
+        assert data["total_count"] == 2
+        assert [p["id"] for p in data["products"]] == [2]
+    
+    def test_rebuild_publishes_a_new_index(self, client, setup_migrated_data, monkeypatch):
+        """Concurrent lookups after a catalog change build one new index; the old one is never mutated"""
+        import threading
+        import main
+        
+        client.get("/api/products/search?search=test&fuzzy=true")
+        old_index = main.fuzzy_index
+        old_words = old_index.similar_words("tesst")
+        
+        builds = []
+        documents = main.db.get_fuzzy_documents
+        monkeypatch.setattr(main.db, "get_fuzzy_documents", lambda: builds.append(1) or documents())
+        monkeypatch.setattr(main.db, "get_catalog_fingerprint", lambda: "changed")
+        threads = [threading.Thread(target=main.get_fuzzy_index) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(builds) == 1
+        assert main.fuzzy_index is not old_index
+        assert main.fuzzy_index.fingerprint == "changed"
+        assert old_index.similar_words("tesst") == old_words
@@ -3,6 +3,8 @@ import sqlite3
 from fastapi.testclient import TestClient
 from fastapi import status
 
+from product_listing import refresh_product_listing
+
 class TestIntegrationWorkflow:
     """Integration tests for complete API workflow"""
     
@@ -45,6 +47,7 @@ class TestIntegrationWorkflow:
         """, test_products)
         
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         # Test 1: Get all products
@@ -121,6 +124,7 @@ class TestIntegrationWorkflow:
         """, test_products)
         
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         # Test pagination: page 1
@@ -181,6 +185,7 @@ class TestIntegrationWorkflow:
         """)
         
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         # Test 1: Valid product ID
@@ -242,6 +247,7 @@ class TestIntegrationWorkflow:
         """)
         
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         # Test 1: Get product by ID
@@ -313,6 +319,7 @@ class TestPerformanceWorkflow:
         """, test_products)
         
         conn.commit()
+        refresh_product_listing(conn)
         conn.close()
         
         # Test performance with large dataset
@@ -0,0 +1,116 @@
+import sqlite3
+
+from fastapi import status
+
+from negative_cache import PRODUCT_IDS, BloomFilter, EmptySearchCache
+
+def fail(*args, **kwargs):
+    raise AssertionError("the database was queried")
+
+class TestBloomFilter:
+    """Test the Bloom filter behind the product id filter"""
+
+    def test_no_false_negatives(self):
+        """Every added key is reported present, even past capacity"""
+        bloom = BloomFilter(1000)
+        bloom.update(range(0, 5000, 3))
+        assert all(key in bloom for key in range(0, 5000, 3))
+
+    def test_false_positive_rate(self):
+        """Absent keys are rejected at about the configured rate"""
+        bloom = BloomFilter(10000, error_rate=0.01)
+        bloom.update(range(10000))
+        false_positives = sum(key in bloom for key in range(10000, 110000))
+        assert false_positives < 2000
+
+class TestProductIdFilter:
+    """Test answering lookups of missing products without a query"""
+
+    def test_missing_id_is_answered_without_a_query(self, client, setup_migrated_data, monkeypatch):
+        """Once the filter is built, unknown ids get a 404 straight from it"""
+        from main import db
+        client.get("/api/products/999")
+        PRODUCT_IDS.wait()
+
+        monkeypatch.setattr(db, "get_product_by_id", fail)
+        response = client.get("/api/products/999")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Product with ID 999 not found"
+
+    def test_inserted_product_is_found(self, client, setup_migrated_data, test_db):
+        """Ids inserted after the build come in through the change feed"""
+        client.get("/api/products/999")
+        PRODUCT_IDS.wait()
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("""
+            INSERT INTO products (id, name, category, brand, retail_price, cost, department, sku,
+                                  distribution_center_id, department_id)
+            SELECT 999, name, category, brand, retail_price, cost, department, 'SKU999',
+                   distribution_center_id, department_id
+            FROM products WHERE id = 1
+        """)
+        conn.commit()
+        conn.close()
+
+        response = client.get("/api/products/999")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == 999
+
+    def test_failed_rebuild_leaves_the_filter_off(self, test_db, monkeypatch):
+        """A database without the read model stops the build quietly; every id is looked up"""
+        import threading
+        from database import DatabaseManager
+        from negative_cache import ProductIdFilter
+        from queries import QueryStats
+        errors = []
+        monkeypatch.setattr(threading, "excepthook", errors.append)
+        conn = sqlite3.connect(test_db)
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        product_ids = ProductIdFilter()
+        assert product_ids.might_contain(manager, 1)
+        product_ids.wait()
+        assert errors == []
+        assert product_ids.might_contain(manager, 12345)
+        manager.close_connections()
+
+class TestEmptySearchCache:
+    """Test answering searches that match nothing from memory"""
+
+    def test_empty_search_is_answered_without_a_query(self, client, setup_migrated_data, monkeypatch):
+        """A repeated search with no matches skips the database, whatever the page"""
+        from main import db
+        first = client.get("/api/products/search?search=nomatch")
+        assert first.json()["total_count"] == 0
+
+        monkeypatch.setattr(db, "search_products", fail)
+        response = client.get("/api/products/search?search=nomatch&page=2&page_size=10")
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body["products"] == []
+        assert body["page"] == 2
+        assert body["page_size"] == 10
+
+    def test_bounded_and_cleared_on_change(self, setup_migrated_data, test_db_manager, test_db):
+        """Least recently used entries go first, and a database write drops them all"""
+        cache = EmptySearchCache(max_entries=2)
+        empty = {"products": [], "total_count": 0, "page": 1, "page_size": 50}
+        for term in ("a", "b", "c"):
+            fingerprint, _ = cache.lookup(test_db_manager, term)
+            cache.add(fingerprint, term, empty)
+        assert cache.lookup(test_db_manager, "a")[1] is None
+        assert cache.lookup(test_db_manager, "c")[1] == empty
+
+        fingerprint, _ = cache.lookup(test_db_manager, "d")
+        cache.add(fingerprint, "d", {"products": [{}], "total_count": 1, "page": 1, "page_size": 50})
+        assert cache.lookup(test_db_manager, "d")[1] is None
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("UPDATE products SET name = 'Renamed' WHERE id = 1")
+        conn.commit()
+        conn.close()
+        assert cache.lookup(test_db_manager, "c")[1] is None
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+from fastapi import status
+
+from page_cache import PAGE_CACHE, department_key, pages_path, precompute_listing_pages, products_key
+from responses import product_list_response
+
+def stored_pages(db_path):
+    conn = sqlite3.connect(pages_path(db_path))
+    try:
+        return dict(conn.execute("SELECT key, body FROM listing_pages"))
+    finally:
+        conn.close()
+
+class TestPrecomputedPages:
+    """Test the pre-rendered hot listing pages"""
+
+    def test_precompute_matches_the_api(self, client, setup_migrated_data, test_db):
+        """Stored pages carry the same JSON the handlers render"""
+        from main import db
+        expected_products = product_list_response(db.get_all_products(1, 50), None).model_dump()
+        expected_department = product_list_response(db.get_products_by_department(1, 1, 50, "name"), None).model_dump()
+
+        assert precompute_listing_pages(test_db) == 2
+        pages = stored_pages(test_db)
+        assert json.loads(pages[products_key(1)]) == expected_products
+        assert json.loads(pages[department_key(1, 1)]) == expected_department
+        assert client.get("/api/departments/1/products").json() == expected_department
+
+    def test_handlers_serve_stored_bytes(self, client, setup_migrated_data, test_db):
+        """Default-shaped requests return the stored body as is"""
+        precompute_listing_pages(test_db)
+        conn = sqlite3.connect(pages_path(test_db))
+        conn.execute("UPDATE listing_pages SET body = ? WHERE key = ?", (b'{"marker": 1}', products_key(1)))
+        conn.commit()
+        conn.close()
+
+        response = client.get("/api/products")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"marker": 1}
+
+        # Any other shape is rendered per request
+        assert client.get("/api/products?page_size=10").json()["total_count"] == 2
+
+    def test_rendering_leaves_the_catalog_file_alone(self, client, setup_migrated_data, test_db):
+        """Background renders write only the sidecar, so caches keyed on the catalog fingerprint survive"""
+        from main import db
+        fingerprint = db.get_catalog_fingerprint()
+
+        client.get("/api/products")
+        PAGE_CACHE.wait()
+        assert stored_pages(test_db)
+        assert db.get_catalog_fingerprint() == fingerprint
+
+    def test_catalog_write_invalidates_and_rerenders(self, client, setup_migrated_data, test_db):
+        """Pages of an older catalog version are never served; the next request re-renders them in the background"""
+        precompute_listing_pages(test_db)
+        assert client.get("/api/products").json()["products"][0]["name"] == "Test Product 1"
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("UPDATE products SET name = 'Renamed' WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        response = client.get("/api/products")
+        assert response.json()["products"][0]["name"] == "Renamed"
+        PAGE_CACHE.wait()
+        assert json.loads(stored_pages(test_db)[products_key(1)])["products"][0]["name"] == "Renamed"
+        assert client.get("/api/products").json()["products"][0]["name"] == "Renamed"
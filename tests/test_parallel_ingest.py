@@ -0,0 +1,79 @@
+import sqlite3
+import pytest
+
+from parallel_ingest import load_csv_parallel, split_on_lines
+
+pytest.importorskip("pandas")
+
+HEADER = "id,cost,category,name,brand,retail_price,department,sku,distribution_center_id\n"
+
+@pytest.fixture
+def products_csv(tmp_path):
+    lines = [HEADER]
+    for i in range(1, 201):
+        lines.append(f"{i},10.5,Jeans,Product {i},Brand,25.0,Women,SKU{i},{i % 10 + 1}\n")
+    lines += [
+        "201,10,Jeans,,Brand,25.0,Women,SKU201,1\n",           # missing name
+        "202,10,Jeans,Product 202,Brand,-1,Women,SKU202,1\n",  # negative price
+        "203,30,Jeans,Product 203,Brand,25.0,Women,SKU203,1\n",  # cost above price
+        "204,10,Jeans,Product 204,Brand,25.0,Kids,SKU204,1\n",   # unknown department
+        "205,10,Jeans,Product 205,Brand,25.0,Women,SKU205,99\n",  # unknown distribution center
+    ]
+    path = tmp_path / "products.csv"
+    path.write_text("".join(lines))
+    return path
+
+class TestParallelIngest:
+    """Test the process-pool CSV parser and validator"""
+    
+    def test_split_on_lines(self, products_csv):
+        """Chunks cover the data exactly once and end on newlines"""
+        data = products_csv.read_bytes()
+        ranges = split_on_lines(products_csv, 7)
+        
+        assert ranges[0][0] == len(HEADER)
+        assert ranges[-1][1] == len(data)
+        for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+            assert end == next_start
+            assert data[end - 1:end] == b"\n"
+    
+    def test_load_csv_parallel(self, products_csv, tmp_path):
+        """Valid rows are written in file order; invalid ones are counted by reason"""
+        db_path = tmp_path / "ecommerce.db"
+        written, rejected = load_csv_parallel(
+            products_csv, db_path, workers=2,
+            departments={"Men", "Women"}, distribution_centers=set(range(1, 11))
+        )
+        
+        assert written == 200
+        assert rejected == {
+            "missing_name": 1, "invalid_price": 1, "invalid_cost": 0,
+            "cost_above_price": 1, "unknown_department": 1, "unknown_distribution_center": 1,
+        }
+        conn = sqlite3.connect(db_path)
+        ids = [row[0] for row in conn.execute("SELECT id FROM products ORDER BY rowid")]
+        assert ids == list(range(1, 201))
+        assert conn.execute("SELECT typeof(retail_price), typeof(name) FROM products LIMIT 1").fetchone() == ("real", "text")
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(products)")}
+        assert columns == {
+            "id": "INTEGER", "cost": "REAL", "category": "TEXT", "name": "TEXT", "brand": "TEXT",
+            "retail_price": "REAL", "department": "TEXT", "sku": "TEXT", "distribution_center_id": "INTEGER",
+        }
+        conn.close()
+    
+    def test_all_rows_rejected_fails_and_keeps_products(self, tmp_path):
+        """A load that accepts nothing raises and leaves the previous products table in place"""
+        db_path = tmp_path / "ecommerce.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO products VALUES (1, 'Kept')")
+        conn.commit()
+        conn.close()
+        csv_path = tmp_path / "products.csv"
+        csv_path.write_text(HEADER + "1,10,Jeans,,Brand,25.0,Women,SKU1,1\n2,10,Jeans,Product 2,Brand,-1,Women,SKU2,1\n")
+        
+        with pytest.raises(ValueError, match="No valid rows"):
+            load_csv_parallel(csv_path, db_path, workers=1)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT * FROM products").fetchall() == [(1, "Kept")]
+        conn.close()
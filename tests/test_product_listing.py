@@ -0,0 +1,176 @@
+import sqlite3
+import pytest
+
+from database import SORT_COLUMNS, DatabaseManager, ReadModelMissing, order_by_clause
+from product_listing import LISTING_COLUMNS, drop_listing_triggers, refresh_product_listing
+from queries import QueryStats
+
+def listing_rows(conn):
+    return conn.execute("SELECT id, department_id, department_name, name FROM product_listing ORDER BY id").fetchall()
+
+class TestProductListing:
+    """Test the denormalised product_listing read table"""
+
+    def test_refresh_copies_served_columns(self, test_db, setup_migrated_data):
+        """The listing holds the served columns in order, department name included"""
+        conn = sqlite3.connect(test_db)
+        assert refresh_product_listing(conn) == 2
+
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(product_listing)")]
+        assert columns == list(LISTING_COLUMNS)
+        assert listing_rows(conn) == [(1, 1, "Test Department", "Test Product 1"),
+                                      (2, 1, "Test Department", "Test Product 2")]
+        conn.close()
+
+    def test_refresh_matches_departments_by_name_before_migration(self, test_db, setup_test_data):
+        """A freshly ingested products table is joined on the legacy department name"""
+        conn = sqlite3.connect(test_db)
+        conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+        conn.execute("INSERT INTO departments (id, name) VALUES (7, 'Test Department')")
+        conn.commit()
+        refresh_product_listing(conn)
+
+        assert [row[1:3] for row in listing_rows(conn)] == [(7, "Test Department")] * 2
+        conn.close()
+
+    def test_triggers_follow_product_writes(self, test_db, setup_migrated_data):
+        """Single-row inserts, updates and deletes reach the listing"""
+        conn = sqlite3.connect(test_db)
+        refresh_product_listing(conn)
+
+        conn.execute("INSERT INTO products (id, name, department_id) VALUES (3, 'New', 1)")
+        conn.execute("UPDATE products SET name = 'Renamed' WHERE id = 1")
+        conn.execute("DELETE FROM products WHERE id = 2")
+        conn.commit()
+
+        assert listing_rows(conn) == [(1, 1, "Test Department", "Renamed"),
+                                      (3, 1, "Test Department", "New")]
+        conn.close()
+
+    def test_triggers_follow_department_writes(self, test_db, setup_migrated_data):
+        """Renaming or deleting a department updates its listed products"""
+        conn = sqlite3.connect(test_db)
+        refresh_product_listing(conn)
+
+        conn.execute("UPDATE departments SET name = 'Renamed Department' WHERE id = 1")
+        conn.commit()
+        assert {row[2] for row in listing_rows(conn)} == {"Renamed Department"}
+
+        conn.execute("DELETE FROM departments WHERE id = 1")
+        conn.commit()
+        assert {row[1:3] for row in listing_rows(conn)} == {(None, None)}
+        conn.close()
+
+    @pytest.mark.parametrize("sort", list(SORT_COLUMNS))
+    def test_listing_queries_need_no_join_or_sort(self, test_db, setup_migrated_data, sort):
+        """Listing reads touch one table and walk an index for every sort"""
+        conn = sqlite3.connect(test_db)
+        conn.executemany(
+            "INSERT INTO products (name, brand, retail_price, cost, department_id) VALUES (?, ?, ?, ?, ?)",
+            [(f"Product {i}", f"Brand {i % 50}", i % 97, i % 13, i % 2 + 1) for i in range(5000)]
+        )
+        refresh_product_listing(conn)
+        for where in ("", "WHERE p.department_id = 1"):
+            query = f"SELECT p.id, p.department_name FROM product_listing p {where} {order_by_clause(sort, 'desc')} LIMIT 10"
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+            assert "TEMP B-TREE" not in plan
+            assert "departments" not in plan
+        conn.close()
+
+    def test_readers_never_build_the_read_model(self, test_db):
+        """A database without the read model fails clearly instead of being rebuilt by a request"""
+        conn = sqlite3.connect(test_db)
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        with pytest.raises(ReadModelMissing, match="migrate_departments.py"):
+            manager.get_all_products()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert tables == {"products"}
+
+        refresh_product_listing(conn)
+        assert manager.get_all_products()["total_count"] == 0
+        manager.close_connections()
+        conn.close()
+
+    def test_api_startup_builds_a_missing_read_model(self, test_db, setup_test_data):
+        """A database from before the read model is upgraded once when the API starts"""
+        from fastapi.testclient import TestClient
+        from main import app, db
+        conn = sqlite3.connect(test_db)
+        drop_listing_triggers(conn)
+        conn.execute("DROP TABLE product_listing")
+        conn.commit()
+
+        original_db_path, db.db_path = db.db_path, test_db
+        try:
+            with TestClient(app) as client:
+                assert [row[3] for row in listing_rows(conn)] == ["Test Product 1", "Test Product 2"]
+                assert client.get("/api/products").json()["total_count"] == 2
+        finally:
+            db.db_path = original_db_path
+        conn.close()
+
+    def test_migration_without_departments_keeps_triggers(self, test_db, setup_test_data):
+        """A migration with nothing to migrate leaves the listing maintained"""
+        from migrate_departments import migrate
+        conn = sqlite3.connect(test_db)
+        conn.execute("UPDATE products SET department = NULL")
+        conn.commit()
+        refresh_product_listing(conn)
+
+        migrate(test_db)
+        conn.execute("INSERT INTO products (id, name) VALUES (3, 'New')")
+        conn.commit()
+        assert listing_rows(conn)[-1] == (3, None, None, "New")
+        conn.close()
+
+class TestDepartmentCounts:
+    """Test the materialised per-department product counts"""
+
+    def counts(self, conn):
+        return dict(conn.execute("SELECT department_id, product_count FROM department_counts"))
+
+    def test_refresh_counts_every_department(self, test_db, setup_migrated_data):
+        """Departments without products get a zero count"""
+        conn = sqlite3.connect(test_db)
+        conn.execute("INSERT INTO departments (id, name) VALUES (2, 'Empty Department')")
+        refresh_product_listing(conn)
+
+        assert self.counts(conn) == {1: 2, 2: 0}
+        conn.close()
+
+    def test_triggers_keep_counts_current(self, test_db, setup_migrated_data):
+        """Product and department writes adjust the counts incrementally"""
+        conn = sqlite3.connect(test_db)
+        refresh_product_listing(conn)
+
+        conn.execute("INSERT INTO departments (id, name) VALUES (2, 'Second')")
+        conn.execute("INSERT INTO products (id, name, department_id) VALUES (3, 'New', 2)")
+        conn.execute("UPDATE products SET department_id = 2 WHERE id = 1")
+        conn.execute("DELETE FROM products WHERE id = 2")
+        conn.commit()
+        assert self.counts(conn) == {1: 0, 2: 2}
+
+        conn.execute("DELETE FROM departments WHERE id = 2")
+        conn.execute("INSERT INTO departments (id, name) VALUES (2, 'Second again')")
+        conn.commit()
+        assert self.counts(conn) == {1: 0, 2: 2}
+        conn.close()
+
+    def test_departments_endpoint_reads_counts(self, client, test_db, setup_migrated_data):
+        """The department list reports the maintained counts"""
+        response = client.get("/api/departments")
+        assert response.status_code == 200
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("INSERT INTO products (id, name, category, department_id) VALUES (3, 'New', 'Jeans', 1)")
+        conn.commit()
+        conn.close()
+
+        response = client.get("/api/departments/1")
+        assert response.status_code == 200
+        assert response.json()["product_count"] == 3
+        assert len(response.json()["products"]) == 3
+
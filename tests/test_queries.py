@@ -0,0 +1,69 @@
+import pytest
+from fastapi import status
+
+from database import DatabaseManager
+from queries import QUERIES, QueryStats, render
+
+class TestQueryRegistry:
+    """Test the named statement registry"""
+
+    def test_render_returns_the_same_text(self):
+        """Identical inputs map to one string, so the statement cache hits"""
+        first = render("products.page", columns="p.id", order_by="ORDER BY p.id ASC")
+        second = render("products.page", order_by="ORDER BY p.id ASC", columns="p.id")
+
+        assert first is second
+        assert "LIMIT ? OFFSET ?" in first
+
+    def test_unknown_statement(self):
+        """Only registered statements can run"""
+        with pytest.raises(KeyError):
+            render("products.drop")
+
+    def test_stats_accumulate(self):
+        """Counts, rows and timings add up per statement"""
+        stats = QueryStats()
+        stats.record("products.count", 0.002, 1)
+        stats.record("products.count", 0.004, 1)
+        stats.record("products.by_id", 0.001, 0)
+
+        snapshot = stats.snapshot()
+        assert list(snapshot) == ["products.count", "products.by_id"]
+        assert snapshot["products.count"]["calls"] == 2
+        assert snapshot["products.count"]["rows"] == 2
+        assert snapshot["products.count"]["mean_ms"] == pytest.approx(3.0)
+        assert snapshot["products.count"]["max_ms"] == pytest.approx(4.0)
+
+class TestDatabaseManagerStatements:
+    """Test pooled connections and per-statement stats"""
+
+    def test_connections_are_reused(self, test_db, setup_migrated_data):
+        """A released connection is handed out again"""
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        with manager.get_connection() as conn:
+            first = conn
+        with manager.get_connection() as conn:
+            assert conn is first
+        manager.close_connections()
+
+    def test_methods_record_named_statements(self, test_db, setup_migrated_data):
+        """Each data-access method is attributed to its registry names"""
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        manager.get_all_products(page=1, page_size=10)
+        manager.get_all_products(page=2, page_size=10)
+        list(manager.stream_products())
+
+        stats = manager.get_query_stats()
+        assert set(stats) <= set(QUERIES)
+        assert stats["products.page"]["calls"] == 2
+        assert stats["products.count"]["calls"] == 2
+        assert stats["products.stream"]["rows"] == 2
+        manager.close_connections()
+
+    def test_stats_endpoint(self, client, setup_migrated_data):
+        """Statement stats are served by the API"""
+        client.get("/api/products/1")
+        response = client.get("/api/stats/queries")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["statements"]["products.by_id"]["calls"] >= 1
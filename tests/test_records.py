@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from database import PRODUCT_COLUMNS, DatabaseManager
+from models import ProductResponse
+from queries import QueryStats
+from records import PRODUCT_FIELDS, ProductRecord, product_records
+
+def rows(*values, fields=PRODUCT_FIELDS):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE t ({', '.join(fields)})")
+    conn.executemany(f"INSERT INTO t VALUES ({', '.join('?' for _ in fields)})", values)
+    return conn.execute("SELECT * FROM t ORDER BY rowid").fetchall()
+
+PRODUCT = (1, "Tee", "Tops", "Acme", 19.99, 8.5, "Men", "SKU1", 3, 1, "Men")
+
+class TestProductRecord:
+    """Test the slotted product record"""
+
+    def test_fields_follow_product_columns(self):
+        """Record slots and the database SELECT list agree"""
+        assert PRODUCT_FIELDS == tuple(PRODUCT_COLUMNS)
+
+    def test_behaves_like_the_row_dict(self):
+        """Records compare equal to dict(row) and validate into response models"""
+        [row] = rows(PRODUCT)
+        [record] = product_records([row])
+
+        assert record == dict(row)
+        assert record["brand"] == record.brand == "Acme"
+        assert ProductResponse(**record).model_dump() == dict(row)
+        assert not hasattr(record, "__dict__")
+
+    def test_records_match_database_rows(self, test_db, setup_migrated_data):
+        """Records built from a listing query equal the dicts the API serves"""
+        manager = DatabaseManager(test_db, stats=QueryStats())
+        products = manager.get_all_products()["products"]
+        conn = sqlite3.connect(test_db)
+        conn.row_factory = sqlite3.Row
+        records = product_records(conn.execute("SELECT * FROM product_listing ORDER BY id").fetchall())
+
+        assert records == products
+        assert all(isinstance(record, ProductRecord) for record in records)
+        conn.close()
+        manager.close_connections()
+
+    def test_sparse_rows_carry_only_selected_fields(self):
+        """Unselected fields are absent, as in a sparse row dict"""
+        [record] = product_records(rows((1, "Tee"), fields=("id", "name")))
+
+        assert dict(record) == {"id": 1, "name": "Tee"}
+        with pytest.raises(KeyError):
+            record["brand"]
+
+    def test_repeated_strings_are_shared(self):
+        """Low-cardinality values are stored once across records"""
+        first, second = product_records(rows(PRODUCT, (2,) + PRODUCT[1:]))
+
+        assert first.brand is second.brand
+        assert first.department_name is second.department_name
@@ -0,0 +1,95 @@
+import sqlite3
+
+from fastapi import status
+
+from product_listing import refresh_product_listing
+from result_cache import ResultCache, cache_path, query_key
+
+class TestResultCache:
+    """Test the persistent query result cache"""
+
+    def test_entries_survive_a_restart(self, setup_migrated_data, test_db_manager, test_db):
+        """A fresh cache instance (a new worker) reads what another one stored"""
+        first = ResultCache()
+        version, body, _ = first.get(test_db_manager, "search?q=a")
+        assert body is None
+        first.put(test_db_manager, version, "search?q=a", b'{"cached": 1}', 1)
+
+        assert cache_path(test_db).exists()
+        assert ResultCache().get(test_db_manager, "search?q=a") == (version, b'{"cached": 1}', 1)
+
+    def test_catalog_write_is_a_miss(self, setup_migrated_data, test_db_manager, test_db):
+        """Entries of an older catalog version are never served"""
+        cache = ResultCache()
+        version, _, _ = cache.get(test_db_manager, "search?q=a")
+        cache.put(test_db_manager, version, "search?q=a", b"{}", 0)
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("UPDATE products SET name = 'Renamed' WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        new_version, body, _ = cache.get(test_db_manager, "search?q=a")
+        assert new_version > version
+        assert body is None
+
+    def test_rebuilt_database_is_a_miss(self, setup_migrated_data, test_db_manager, test_db):
+        """A database rebuilt from scratch reuses version numbers, not cached bodies"""
+        cache = ResultCache()
+        version, _, _ = cache.get(test_db_manager, "search?q=a")
+        cache.put(test_db_manager, version, "search?q=a", b"{}", 0)
+
+        conn = sqlite3.connect(test_db)
+        conn.execute("DROP TABLE product_changes")
+        refresh_product_listing(conn)
+        conn.close()
+
+        new_version, body, _ = ResultCache().get(test_db_manager, "search?q=a")
+        assert new_version[1] == version[1]
+        assert body is None
+
+    def test_eviction_keeps_recent_entries(self, setup_migrated_data, test_db_manager):
+        """Over budget, the least recently used entries go first"""
+        cache = ResultCache(max_bytes=300)
+        version, _, _ = cache.get(test_db_manager, "k")
+        for number in range(5):
+            cache.put(test_db_manager, version, f"k{number}", b"x" * 100, 0)
+        cache.evict(test_db_manager)
+
+        assert cache.size(test_db_manager) <= 270
+        assert cache.get(test_db_manager, "k4")[1] is not None
+        assert cache.get(test_db_manager, "k0")[1] is None
+
+    def test_cache_without_counts_is_replaced(self, setup_migrated_data, test_db_manager, test_db):
+        """A cache file written before total_count was stored starts empty"""
+        conn = sqlite3.connect(cache_path(test_db))
+        conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, version INTEGER NOT NULL, body BLOB NOT NULL, "
+                     "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("INSERT INTO results VALUES ('k', 0, x'7b7d', 2, 0)")
+        conn.commit()
+        conn.close()
+
+        cache = ResultCache()
+        version, body, _ = cache.get(test_db_manager, "k")
+        assert body is None
+        cache.put(test_db_manager, version, "k", b"{}", 3)
+        assert cache.get(test_db_manager, "k") == (version, b"{}", 3)
+
+    def test_query_key_is_normalised(self):
+        """Parameter order and unset parameters do not change the key"""
+        assert query_key("search", page=1, search="a", fields=None) == query_key("search", search="a", page=1)
+        assert query_key("search", fields=("id", "name")) == "search?fields=id%2Cname"
+
+    def test_search_is_served_from_cache(self, client, setup_migrated_data, monkeypatch):
+        """A repeated search returns the stored body without querying the catalog"""
+        from main import db
+        first = client.get("/api/products/search?search=Test")
+        assert first.status_code == status.HTTP_200_OK
+
+        def fail(*args, **kwargs):
+            raise AssertionError("search ran again")
+        monkeypatch.setattr(db, "search_products", fail)
+
+        second = client.get("/api/products/search?search=Test")
+        assert second.status_code == status.HTTP_200_OK
+        assert second.json() == first.json()
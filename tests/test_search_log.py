@@ -0,0 +1,62 @@
+from fastapi import status
+
+from search_log import SEARCH_LOG, SearchLog, log_path
+
+class TestSearchLog:
+    """Test search analytics logging"""
+
+    def test_searches_are_logged(self, client, setup_migrated_data, test_db):
+        """Both search entry points record query, page and result count, cached or not"""
+        for url in ("/api/products/search?search=Test", "/api/products/search?search=Test",
+                    "/api/products?search=Test&page=2&page_size=1", "/api/products/search?search=nomatch"):
+            assert client.get(url).status_code == status.HTTP_200_OK
+
+        response = client.get("/api/stats/searches/top")
+        assert response.status_code == status.HTTP_200_OK
+        queries = response.json()["queries"]
+        assert [(entry["query"], entry["count"]) for entry in queries] == [("Test", 3), ("nomatch", 1)]
+        assert queries[0]["zero_result_count"] == 0
+        assert log_path(test_db).exists()
+
+        zero = client.get("/api/stats/searches/top?zero_results=true").json()["queries"]
+        assert [entry["query"] for entry in zero] == ["nomatch"]
+
+    def test_slow_searches(self, client, setup_migrated_data):
+        """Individual searches come back slowest first with their details"""
+        client.get("/api/products/search?search=Test")
+        client.get("/api/products?search=Product&page=2&page_size=1")
+
+        searches = client.get("/api/stats/searches/slow?limit=5").json()["searches"]
+        assert len(searches) == 2
+        assert searches[0]["latency_ms"] >= searches[1]["latency_ms"]
+        by_query = {entry["query"]: entry for entry in searches}
+        assert by_query["Product"]["endpoint"] == "/api/products"
+        assert by_query["Product"]["page"] == 2
+        assert by_query["Product"]["result_count"] == 2
+
+    def test_ring_holds_counts_not_bodies(self, client, setup_migrated_data, monkeypatch):
+        """Computed and cached searches buffer their total_count, never the response body"""
+        import main
+        log = SearchLog()
+        log._worker = object()  # no background writer
+        monkeypatch.setattr(main, "SEARCH_LOG", log)
+        for url in ("/api/products/search?search=Test", "/api/products/search?search=Test",
+                    "/api/products?search=Test&page_size=1"):
+            assert client.get(url).status_code == status.HTTP_200_OK
+
+        assert [entry[6] for entry in log._entries] == [2, 2, 2]
+        assert not any(isinstance(value, bytes) for entry in log._entries for value in entry)
+
+    def test_ring_buffer_drops_oldest(self, test_db_manager):
+        """A full buffer drops the oldest entries rather than blocking"""
+        log = SearchLog(ring_size=2)
+        log._worker = object()  # no background writer
+        for query in ("a", "b", "c"):
+            log.record(test_db_manager, "/api/products/search", query, 1, 0.0, result_count=1)
+        assert log.dropped == 1
+        assert [entry[3] for entry in log._entries] == ["b", "c"]
+
+    def test_reports_include_buffered_entries(self, setup_migrated_data, test_db_manager):
+        """Reports flush what the background writer has not written yet"""
+        SEARCH_LOG.record(test_db_manager, "/api/products/search", "pending", 1, 0.0, result_count=0)
+        assert [entry["query"] for entry in SEARCH_LOG.top_queries(test_db_manager)] == ["pending"]
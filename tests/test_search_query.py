@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+from fastapi import status
+
+from search_query import And, Compare, Not, Or, QuerySyntaxError, Text, parse_query, plan_query
+
+QUERIES = [
+    ("Test", {1, 2}),
+    ("test product", {1, 2}),
+    ('"Product 2"', {2}),
+    ("brand:test price:<40", {1}),
+    ("price:40..60 OR id:1", {1, 2}),
+    ("-name:2 category:test", {1}),
+    ("NOT (price:>40 OR brand:nike) Test", {1}),
+    ("margin:>20 department_id:1", {2}),
+    ("department:department id:>=2", {2}),
+    ("nike shoes", set()),
+    ("P 2", {2}),
+]
+
+def matching_ids(conn, query, text_index):
+    condition, params = plan_query(query, text_index)
+    return {row[0] for row in conn.execute(f"SELECT p.id FROM product_listing p WHERE {condition}", params)}
+
+class TestQueryParser:
+    """Test parsing the search query language"""
+
+    def test_clauses_and_operators(self):
+        """Words are ANDed, AND binds tighter than OR, fields and comparisons are typed"""
+        assert parse_query("nike shoes") == And((Text(None, "nike"), Text(None, "shoes")))
+        assert parse_query('brand:"new balance" OR price:<50 id:3..9') == Or((
+            Text("brand", "new balance"),
+            And((Compare("price", "<", 50.0), Compare("id", "between", (3, 9)))),
+        ))
+        assert parse_query("-brand:nike") == Not(Text("brand", "nike"))
+        assert parse_query("http://x") == Text(None, "http://x")
+        assert parse_query("   ") is None
+
+    @pytest.mark.parametrize("query", ["nike AND", "(nike", "nike )", "price:abc", "brand:", "OR nike"])
+    def test_malformed_queries(self, query):
+        """Malformed input raises QuerySyntaxError"""
+        with pytest.raises(QuerySyntaxError):
+            parse_query(query)
+
+    @pytest.mark.parametrize("query", ["", "   ", '"', '""'])
+    def test_blank_queries_are_not_planned(self, query):
+        """A query with no clauses is an error rather than a match-everything condition"""
+        assert parse_query(query) is None
+        with pytest.raises(QuerySyntaxError, match="empty query"):
+            plan_query(query)
+
+class TestQueryPlanner:
+    """Test the SQL plans for search queries"""
+
+    @pytest.mark.parametrize("query,expected", QUERIES)
+    def test_plans_match_with_and_without_text_index(self, setup_migrated_data, test_db, query, expected):
+        """The trigram index and the LIKE fallback select the same products"""
+        conn = sqlite3.connect(test_db)
+        try:
+            assert matching_ids(conn, query, True) == expected
+            assert matching_ids(conn, query, False) == expected
+        finally:
+            conn.close()
+
+    def test_multi_clause_query_uses_indexes(self, setup_migrated_data, test_db):
+        """Each clause reads an index; the listing itself is only probed by id"""
+        condition, params = plan_query("brand:test category:test price:<40 department_id:1")
+        conn = sqlite3.connect(test_db)
+        try:
+            plan = [row[3] for row in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT p.id FROM product_listing p WHERE {condition}", params)]
+        finally:
+            conn.close()
+        assert any("INTERSECT" in step for step in plan)
+        assert not any(step.startswith("SCAN") and "VIRTUAL TABLE" not in step and "INDEX" not in step
+                       and "SUBQUERY" not in step for step in plan)
+
+    def test_text_index_follows_writes(self, setup_migrated_data, test_db):
+        """Inserted and renamed products are found by the text index"""
+        conn = sqlite3.connect(test_db)
+        try:
+            conn.execute("UPDATE products SET name = 'Trail Runner' WHERE id = 1")
+            conn.execute("""
+                INSERT INTO products (id, name, category, brand, retail_price, cost, department, sku, department_id)
+                VALUES (3, 'Road Runner', 'Shoes', 'Acme', 80, 40, 'Test Department', 'TEST003', 1)
+            """)
+            conn.commit()
+            assert matching_ids(conn, "runner", True) == {1, 3}
+            assert matching_ids(conn, "name:product", True) == {2}
+        finally:
+            conn.close()
+
+class TestSearchEndpoint:
+    """Test the query language through the search API"""
+
+    def test_field_scoped_search(self, client, setup_migrated_data):
+        """Field clauses and comparisons narrow the results"""
+        response = client.get("/api/products/search", params={"search": "brand:test price:<40"})
+        assert response.status_code == status.HTTP_200_OK
+        assert [product["id"] for product in response.json()["products"]] == [1]
+
+        response = client.get("/api/products", params={"search": "test product"})
+        assert response.json()["total_count"] == 2
+
+    def test_malformed_query_is_a_bad_request(self, client, setup_migrated_data):
+        """Syntax errors are reported as 400 with the reason"""
+        response = client.get("/api/products/search", params={"search": "price:abc"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "price" in response.json()["detail"]
+
+    @pytest.mark.parametrize("url", ["/api/products", "/api/products/search"])
+    def test_blank_query_is_a_bad_request(self, client, setup_migrated_data, url):
+        """Input that parses to nothing does not return the whole catalog"""
+        response = client.get(url, params={"search": ' "" '})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid search query: empty query"
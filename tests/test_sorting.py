@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import sys
+import pytest
+from fastapi import status
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database import SORT_COLUMNS, order_by_clause
+from migrate_departments import create_sort_indexes
+
+class TestOrderByClause:
+    """Test the whitelisted ORDER BY builder"""
+    
+    def test_order_by_clause(self):
+        """Non-id sorts get an id tie-breaker in the same direction"""
+        assert order_by_clause() == "ORDER BY p.id ASC"
+        assert order_by_clause("price", "desc") == "ORDER BY p.retail_price DESC, p.id DESC"
+    
+    def test_order_by_clause_rejects_unknown_fields(self):
+        """Only whitelisted sort keys reach the SQL"""
+        with pytest.raises(ValueError):
+            order_by_clause("cost; DROP TABLE products", "asc")
+        with pytest.raises(ValueError):
+            order_by_clause("id", "sideways")
+    
+    @pytest.mark.parametrize("sort", list(SORT_COLUMNS))
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_sorts_use_an_index(self, test_db, setup_migrated_data, sort, order):
+        """No sort option needs a temp B-tree once the sort indexes exist"""
+        conn = sqlite3.connect(test_db)
+        # Enough rows for ANALYZE to describe a realistic table
+        conn.executemany(
+            "INSERT INTO products (name, brand, retail_price, cost, department_id) VALUES (?, ?, ?, ?, ?)",
+            [(f"Product {i}", f"Brand {i % 50}", i % 97, i % 13, i % 2 + 1) for i in range(5000)]
+        )
+        create_sort_indexes(conn)
+        for where in ("", "WHERE p.department_id = 1"):
+            query = f"""
+            SELECT p.id, p.name FROM products p
+            LEFT JOIN departments d ON p.department_id = d.id
+            {where} {order_by_clause(sort, order)} LIMIT 10 OFFSET 100
+            """
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+            assert "TEMP B-TREE" not in plan
+        conn.close()
+
+class TestSortedListings:
+    """Test sort and order on the listing endpoints"""
+    
+    def test_products_sorted_by_price_desc(self, client, setup_migrated_data):
+        """Most expensive product first"""
+        response = client.get("/api/products?sort=price&order=desc")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [p["id"] for p in response.json()["products"]] == [2, 1]
+    
+    def test_products_invalid_sort(self, client, setup_migrated_data):
+        """Unknown sort fields are rejected"""
+        response = client.get("/api/products?sort=cost")
+        
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_department_products_sorted_by_margin(self, client, setup_migrated_data):
+        """Department listings accept the same sort options"""
+        response = client.get("/api/departments/1/products?sort=margin&order=desc")
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_count"] == 2
+        assert [p["id"] for p in data["products"]] == [2, 1]
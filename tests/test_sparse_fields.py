@@ -0,0 +1,60 @@
+import pytest
+from fastapi import status
+
+from database import select_list
+
+class TestSelectList:
+    """Test the sparse SELECT list builder"""
+    
+    def test_select_list_narrows_columns(self):
+        """Only requested columns are selected, id always first"""
+        assert select_list(["retail_price", "name"]) == "p.id, p.name, p.retail_price"
+        assert "p.department_name" in select_list(None)
+    
+    def test_select_list_rejects_unknown_fields(self):
+        """Field names never reach the SQL unchecked"""
+        with pytest.raises(ValueError):
+            select_list(["name", "password"])
+
+class TestSparseFieldsets:
+    """Test the fields= parameter on product endpoints"""
+    
+    def test_products_list_sparse(self, client, setup_migrated_data):
+        """List responses carry only the requested fields"""
+        response = client.get("/api/products?fields=name,retail_price")
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_count"] == 2
+        assert data["products"][0] == {"id": 1, "name": "Test Product 1", "retail_price": 29.99}
+    
+    def test_search_sparse(self, client, setup_migrated_data):
+        """Search honours fields, including fuzzy search"""
+        for url in ("/api/products/search?search=Test&fields=department_name",
+                    "/api/products/search?search=Tesst&fuzzy=true&fields=department_name"):
+            response = client.get(url)
+            
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert data["search_term"] in ("Test", "Tesst")
+            assert set(data["products"][0]) == {"id", "department_name"}
+    
+    def test_product_by_id_sparse(self, client, setup_migrated_data):
+        """Single product responses can be narrowed too"""
+        response = client.get("/api/products/2?fields=sku")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"id": 2, "sku": "TEST002"}
+    
+    def test_full_response_unchanged(self, client, setup_migrated_data):
+        """Without fields every product field is returned"""
+        response = client.get("/api/products/1")
+        
+        assert len(response.json()) == 11
+    
+    def test_unknown_field(self, client, setup_migrated_data):
+        """Unknown fields are a client error"""
+        response = client.get("/api/products?fields=name,secret")
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "secret" in response.json()["detail"]
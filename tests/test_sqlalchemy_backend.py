@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from fastapi import status
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import text
+
+from database import DatabaseManager, QueryTimeout, create_database_manager, statement_timeout
+from queries import QueryStats
+from sqlalchemy_backend import SQLAlchemyDatabaseManager, _named_params, statement
+
+RUNAWAY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+CALLS = [
+    ("get_all_products", (1, 50, "price", "desc")),
+    ("get_all_products", (1, 1, "id", "asc", ("name",))),
+    ("get_product_by_id", (2,)),
+    ("get_product_by_id", (99,)),
+    ("get_products_by_ids", ([2, 1, 99],)),
+    ("search_products", ("brand:test price:<40",)),
+    ("get_departments", ()),
+    ("get_department", (1,)),
+    ("get_products_by_department", (1, 1, 50, "name")),
+    ("get_suggestion_terms", ()),
+    ("get_fuzzy_documents", ()),
+    ("get_catalog_version", ()),
+    ("get_catalog_generation", ()),
+    ("get_present_product_ids", (0,)),
+    ("get_changes", (0, 1)),
+]
+
+@pytest.fixture
+def managers(test_db, setup_migrated_data):
+    sqlite3_manager = DatabaseManager(test_db, stats=QueryStats())
+    sqlalchemy_manager = SQLAlchemyDatabaseManager(test_db, stats=QueryStats())
+    yield sqlite3_manager, sqlalchemy_manager
+    sqlite3_manager.close_connections()
+    sqlalchemy_manager.close_connections()
+
+def plain(value):
+    """Comparable form of a manager result (records and rows become dicts and tuples)"""
+    if isinstance(value, dict) or hasattr(value, "keys"):
+        return {key: plain(value[key]) for key in value.keys()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+class TestSQLAlchemyBackend:
+    """Test the SQLAlchemy Core implementation of DatabaseManager against SQLite"""
+
+    @pytest.mark.parametrize("method,args", CALLS)
+    def test_same_results_as_sqlite3_backend(self, managers, method, args):
+        """Every read method returns what the sqlite3 backend returns"""
+        sqlite3_manager, sqlalchemy_manager = managers
+        assert plain(getattr(sqlalchemy_manager, method)(*args)) == plain(getattr(sqlite3_manager, method)(*args))
+
+    def test_streaming(self, managers):
+        """Products stream in id-ordered batches of plain tuples"""
+        sqlite3_manager, sqlalchemy_manager = managers
+        batches = list(sqlalchemy_manager.stream_products(fields=("name",), batch_size=1))
+        assert batches == list(sqlite3_manager.stream_products(fields=("name",), batch_size=1))
+        assert batches == [[(1, "Test Product 1")], [(2, "Test Product 2")]]
+        assert sqlalchemy_manager.stats.snapshot()["products.stream"]["rows"] == 2
+
+    def test_engine_pooling_and_statement_cache(self, managers):
+        """Connections come from one QueuePool; statement texts map to one cached construct"""
+        _, manager = managers
+        manager.get_all_products()
+        manager.get_all_products()
+        assert manager.engine.pool.checkedin() == 1
+        sql = "SELECT ? WHERE '?' <> ?"
+        assert _named_params(sql) == ("SELECT :p0 WHERE '?' <> :p1", 2)
+        assert statement(sql) is statement(sql)
+
+    def test_runaway_statement_is_aborted(self, managers):
+        """Statement deadlines apply as with the sqlite3 backend"""
+        _, manager = managers
+        start = time.monotonic()
+        with pytest.raises(QueryTimeout):
+            with statement_timeout(0.05):
+                with manager.get_connection() as conn:
+                    conn.execute(text(RUNAWAY)).fetchone()
+        assert time.monotonic() - start < 2
+
+    def test_api_on_sqlalchemy_backend(self, client, test_db, setup_migrated_data, monkeypatch):
+        """The API serves the same responses from either backend"""
+        import departments
+        import main
+        expected = [client.get(url).json() for url in ("/api/products?sort=name", "/api/departments/1/products?page_size=1")]
+
+        manager = create_database_manager(test_db, backend="sqlalchemy")
+        monkeypatch.setattr(main, "db", manager)
+        monkeypatch.setattr(departments, "db", manager)
+        responses = [client.get(url) for url in ("/api/products?sort=name", "/api/departments/1/products?page_size=1")]
+        assert [response.status_code for response in responses] == [status.HTTP_200_OK] * 2
+        assert [response.json() for response in responses] == expected
+        manager.close_connections()
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+def imported_modules(module):
+    """Import a module in a fresh interpreter and return the names in sys.modules"""
+    code = f"import sys; import {module}; print('\\n'.join(sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, ROOT_DIR]))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT_DIR)
+    assert result.returncode == 0, result.stderr
+    return set(result.stdout.split())
+
+class TestColdStart:
+    """Entry points must not import heavy dependencies they do not need at startup"""
+
+    def test_api_does_not_import_uvicorn_or_pandas(self):
+        modules = imported_modules("main")
+        assert "uvicorn" not in modules
+        assert "pandas" not in modules
+
+    @pytest.mark.parametrize("module", ["data_loader", "migrate_departments", "verify_products"])
+    def test_cli_scripts_do_not_import_pandas(self, module):
+        modules = imported_modules(module)
+        assert "pandas" not in modules
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+from fastapi import status
+
+from suggest import LiveSuggestionIndex, SuggestionIndex
+
+@pytest.fixture
+def index():
+    index = SuggestionIndex(max_cached_prefix=2, cache_size=3)
+    index.build([
+        ("Nike Running Shoes", "product", 1),
+        ("Nike", "brand", 40),
+        ("Nautica", "brand", 25),
+        ("Nightwear", "category", 30),
+        ("Accessories", "category", 12),
+    ])
+    return index
+
+class TestSuggestionIndex:
+    """Test the in-memory prefix index"""
+    
+    def test_suggest_ranks_by_weight(self, index):
+        """Completions come back most popular first"""
+        texts = [s["text"] for s in index.suggest("n", limit=3)]
+        assert texts == ["Nike", "Nightwear", "Nautica"]
+    
+    def test_suggest_long_prefix_is_case_insensitive(self, index):
+        """Prefixes longer than the cached length are ranked on demand"""
+        suggestions = index.suggest("NIKE R")
+        assert [s["text"] for s in suggestions] == ["Nike Running Shoes"]
+        assert suggestions[0]["kind"] == "product"
+    
+    def test_suggest_no_match(self, index):
+        """Unknown prefixes return no suggestions"""
+        assert index.suggest("zz") == []
+        assert index.suggest("   ") == []
+    
+    def test_add_updates_cached_prefixes(self, index):
+        """Incremental adds show up without a rebuild"""
+        index.add("Zara", "brand", 5)
+        index.add("Nautica", "brand", 100)
+        assert index.suggest("z")[0]["text"] == "Zara"
+        assert index.suggest("n", limit=1)[0]["text"] == "Nautica"
+    
+    def test_remove_refills_cached_prefixes(self, index):
+        """Removing a top term promotes the next best one"""
+        index.remove("Nike", "brand")
+        texts = [s["text"] for s in index.suggest("n", limit=3)]
+        assert texts == ["Nightwear", "Nautica", "Nike Running Shoes"]
+    
+    def test_sync_applies_only_changes(self, index):
+        """Sync diffs against a fresh term list"""
+        changed = index.sync([
+            ("Nike Running Shoes", "product", 1),
+            ("Nike", "brand", 41),
+            ("Nautica", "brand", 25),
+            ("Nightwear", "category", 30),
+        ])
+        assert changed == 2
+        assert len(index) == 4
+        assert index.suggest("nike", limit=1)[0]["weight"] == 41
+        assert index.suggest("acc") == []
+
+class FakeCatalog:
+    """Stands in for the database manager; term reads after the first wait for `release`"""
+
+    def __init__(self, terms):
+        self.terms = terms
+        self.fingerprint = 1
+        self.reads = 0
+        self.release = threading.Event()
+
+    def get_catalog_fingerprint(self):
+        return self.fingerprint
+
+    def get_suggestion_terms(self):
+        self.reads += 1
+        if self.reads > 1:
+            self.release.wait(5)
+        return self.terms
+
+class TestLiveSuggestionIndex:
+    """Test keeping the served index in step with the catalog"""
+
+    def test_previous_index_serves_during_a_sync(self):
+        """A catalog change is applied to a copy in the background, then published"""
+        catalog = FakeCatalog([("Nike", "brand", 40)])
+        live = LiveSuggestionIndex()
+        first = live.current(catalog)
+        assert first.suggest("n")[0]["text"] == "Nike"
+
+        catalog.terms = [("Nautica", "brand", 25)]
+        catalog.fingerprint = 2
+        assert live.current(catalog) is first
+        assert live.current(catalog).suggest("n")[0]["text"] == "Nike"
+
+        catalog.release.set()
+        live.wait()
+        assert live.current(catalog).suggest("n")[0]["text"] == "Nautica"
+        assert first.suggest("n")[0]["text"] == "Nike"
+        assert catalog.reads == 2
+
+class TestSuggestEndpoint:
+    """Test the /api/products/suggest endpoint"""
+    
+    def test_suggest_endpoint(self, client, setup_migrated_data):
+        """Suggestions cover products, brands, categories and departments"""
+        response = client.get("/api/products/suggest?q=test")
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["query"] == "test"
+        kinds = {s["kind"] for s in data["suggestions"]}
+        assert kinds == {"product", "brand", "category", "department"}
+        assert data["suggestions"][0]["weight"] == 2
+    
+    def test_suggest_endpoint_requires_query(self, client):
+        """The q parameter is required"""
+        response = client.get("/api/products/suggest")
+        
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY